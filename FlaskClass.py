@@ -1,22 +1,45 @@
+import functools
+import hashlib
 import json
 import os
+import time
+import weakref
 from datetime import timedelta
+from typing import Any, Callable
 
-from flask import Flask
-from flask_wtf.csrf import CSRFProtect
+from flask import Flask, g, request, session
+from flask_wtf.csrf import CSRFProtect, generate_csrf
+from jinja2 import BytecodeCache, FileSystemBytecodeCache, TemplateError
 
-from utility import format_number
+from logging_utility import logger
+from utility import FragmentCacheExtension, VersionedCache, format_number, fragment_cache, get_settings, product_collection, settings_document
 
 # =====================================
 # Configure the Flask app and session settings
 # =====================================
+
+# Where compiled templates are kept across restarts, changed with TEMPLATE_CACHE_DIR
+# in the server config (empty: no bytecode cache)
+DEFAULT_TEMPLATE_CACHE_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "template_cache")
+
+
 class CustomFlask(Flask):
+    # {% cache %} for fragments that are the same for every visitor
+    jinja_options = {**Flask.jinja_options, "extensions": [FragmentCacheExtension]}
+
     def __init__(self, import_name, *args, **kwargs):
         super().__init__(import_name, *args, **kwargs)
-        self.load_formats()
-        self.load_server_config()
+        # Version of the settings document the attributes below were taken from
+        self.settings_version = 0
+        self._format = "#.##0,00"
+        self.maintenance = False
+        self.refresh_settings()
         self.logger.disabled = True
         self.secret_key = "1"
+        # Bumped when the template editor saves, see cached_page()
+        self.template_version = 0
+        # Template files the page ETags are built on, see page_etag()
+        self.template_signature = self._template_signature()
 
     def __getitem__(self, key):
         return self.config[key]
@@ -30,25 +53,255 @@ class CustomFlask(Flask):
     def __repr__(self):
         return f"<CustomFlask name={self.name}, server_name={self.config.get('SERVER_NAME')} >"
 
-    def load_formats(self):
-        settings = self._read_settings_file()
+    def load_formats(self, settings: dict):
         self._format = settings.get("format", "#.##0,00")
 
-
-
-    def load_server_config(self):
-        settings = self._read_settings_file()
+    def load_server_config(self, settings: dict):
         server_config = settings.get("server_config", {})
         self.config.update(server_config)
         self.maintenance = server_config.get("maintenance", False)
 
-    def _read_settings_file(self):
-        settings_path = "data/settings.json"
-        if os.path.exists(settings_path):
-            with open(settings_path, "r", encoding="utf-8") as f:
-                return json.load(f)
-        return {}
-        
+    # Number format, maintenance flag and server config follow settings.json: they
+    # are taken again whenever the settings document was reloaded (admin panel,
+    # another worker, an edit by hand). Returns the settings version they are from,
+    # which the page cache, ETags and fragments key on.
+    def refresh_settings(self) -> int:
+        while True:
+            settings: dict | None = get_settings()
+            version: int = settings_document.version
+            # A reload between the two lines would pair old settings with the new version
+            if settings is None or settings_document.data is settings:
+                break
+        if settings is not None and version != self.settings_version:
+            self.load_formats(settings)
+            self.load_server_config(settings)
+            self.settings_version = version
+        return self.settings_version
+
+    def create_jinja_environment(self):
+        environment = super().create_jinja_environment()
+        environment.bytecode_cache = self._template_bytecode_cache()
+        return environment
+
+    # Compiled templates on disk, so a restart loads their bytecode instead of
+    # compiling every template again. Jinja checks an entry against the source of
+    # the template, an edited template is compiled once and its entry replaced.
+    def _template_bytecode_cache(self) -> BytecodeCache | None:
+        directory: str | None = self.config.get("TEMPLATE_CACHE_DIR", DEFAULT_TEMPLATE_CACHE_DIR)
+        if not directory:
+            return None
+        try:
+            os.makedirs(directory, exist_ok=True)
+            return FileSystemBytecodeCache(directory)
+        except OSError as e:
+            logger.error(f"Template bytecode cache disabled, {directory} is not usable: {e}")
+            return None
+
+    # Load every .jinja-html template (from the bytecode cache, or compiled), so
+    # the first requests after a start don't pay for it. Returns the number loaded.
+    def precompile_templates(self) -> int:
+        count: int = 0
+        for name in self.jinja_env.list_templates(extensions=["jinja-html"]):
+            try:
+                self.jinja_env.get_template(name)
+                count += 1
+            except TemplateError as e:
+                logger.error(f"Could not compile template {name}: {e}")
+        return count
+
+    # Digest of the path, size and modification time of every template file. It
+    # comes from the files, not a counter, so every worker (and the next run) has
+    # the same one for the same templates.
+    def _template_signature(self) -> str:
+        entries: list[tuple[str, int, int]] = []
+        folder: str | None = os.path.join(self.root_path, self.template_folder) if self.template_folder else None
+        if folder:
+            for root, dirs, files in os.walk(folder):
+                dirs.sort()
+                for name in sorted(files):
+                    path: str = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    entries.append((os.path.relpath(path, folder), stat.st_size, stat.st_mtime_ns))
+        return hashlib.blake2b(repr(entries).encode(), digest_size=16).hexdigest()
+
+    # Templates were edited, pages and fragments rendered from the old ones are
+    # outdated. With the name of the edited template only that one is dropped
+    # from the environment's cache: includes, imports and extends are looked up
+    # when a template renders, so the templates using it need no recompiling.
+    def templates_changed(self, name: str | None = None):
+        self.template_version += 1
+        self.template_signature = self._template_signature()
+        fragment_cache.clear()
+        cache = self.jinja_env.cache
+        if cache is None:
+            return
+        if name is None:
+            cache.clear()
+            return
+        try:
+            # Same key as Environment._load_template
+            del cache[(weakref.ref(self.jinja_env.loader), name)]
+        except KeyError:
+            pass
+
 
 app = CustomFlask(__name__, template_folder="templates", static_folder="static")
-csrf = CSRFProtect(app)
\ No newline at end of file
+csrf = CSRFProtect(app)
+
+
+# =====================================
+# Page Cache
+# =====================================
+
+# Rendered storefront pages, valid for one version of the catalog, the settings
+# and the templates
+PAGE_CACHE_SIZE: int = 512
+page_cache = VersionedCache("pages", PAGE_CACHE_SIZE)
+# Stands in for the visitor's CSRF token in a cached page
+CSRF_SENTINEL: str = "__csrf_token_sentinel__"
+# Session keys that make a page personal: cart badge, admin login, error messages
+PERSONAL_SESSION_KEYS: tuple[str, ...] = ("cart", "login", "error", "_flashes")
+# Set while the session holds any of them, so a static file server serving the
+# exported storefront (see static_export.py) hands these visitors to the app
+PERSONAL_COOKIE: str = "store_personal"
+
+
+# Keeps PERSONAL_COOKIE in step with the session. That can only change when the
+# session does, or for a marker that outlived its session.
+@app.after_request
+def mark_personal_visitors(response):
+    marked: bool = PERSONAL_COOKIE in request.cookies
+    if not session.modified and not marked:
+        return response
+    personal: bool = any(session.get(key) for key in PERSONAL_SESSION_KEYS)
+    if personal and not marked:
+        max_age: int | None = int(app.permanent_session_lifetime.total_seconds()) if session.permanent else None
+        response.set_cookie(PERSONAL_COOKIE, "1", max_age=max_age, httponly=True, samesite="Lax")
+    elif marked and not personal:
+        response.delete_cookie(PERSONAL_COOKIE)
+    return response
+
+
+# Serves a GET view from the page cache, keyed by path and query string. Visitors
+# whose session holds anything in PERSONAL_SESSION_KEYS always get a fresh page,
+# and only 200 responses are stored. The CSRF token of the visitor who rendered
+# the page is replaced by a sentinel, which every hit swaps for its own token.
+def cached_page(view):
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        if request.method != "GET" or any(session.get(key) for key in PERSONAL_SESSION_KEYS):
+            return view(*args, **kwargs)
+
+        version: tuple[int, int, int] = (product_collection.snapshot().version, app.refresh_settings(), app.template_version)
+        key: tuple = (request.path, tuple(sorted(request.args.items(multi=True))))
+        rendered: list = []
+
+        def render() -> tuple[str, str, bool] | None:
+            response = app.make_response(view(*args, **kwargs))
+            rendered.append(response)
+            if response.status_code != 200 or response.is_streamed:
+                return None
+            body: str = response.get_data(as_text=True)
+            token: str | None = g.get("csrf_token")
+            if token:
+                body = body.replace(token, CSRF_SENTINEL)
+            return body, response.mimetype, token is not None
+
+        entry: tuple[str, str, bool] | None = page_cache.get(version, key, render)
+        if rendered:
+            return rendered[0]
+        if entry is None:
+            return view(*args, **kwargs)
+
+        body, mimetype, has_token = entry
+        if has_token:
+            body = body.replace(CSRF_SENTINEL, generate_csrf())
+        return app.response_class(body, mimetype=mimetype)
+
+    return wrapper
+
+
+# =====================================
+# Conditional GET
+# =====================================
+
+# Session keys that rule out revalidating a page: admin login and one-off messages
+UNCONDITIONAL_SESSION_KEYS: tuple[str, ...] = ("login", "error", "_flashes")
+
+
+# Strong ETag of a page showing content_version, or None if the visitor's page
+# can't be revalidated. It covers everything else the page is rendered from:
+# settings, templates, path and query string, the cart (navbar badge) and the
+# visitor's CSRF token. Tokens expire after WTF_CSRF_TIME_LIMIT, so the tag also
+# changes every half of it and a revalidated page never carries an old token.
+# Only stored versions go in (storage and file signatures, not the counters of
+# this process), so every worker and the next run give the same page the same tag.
+def page_etag(content_version: Any) -> str | None:
+    if content_version is None or any(session.get(key) for key in UNCONDITIONAL_SESSION_KEYS):
+        return None
+    time_limit: int | None = app.config.get("WTF_CSRF_TIME_LIMIT", 3600)
+    token_period: int = int(time.time() // (time_limit / 2)) if time_limit else 0
+    parts: tuple = (
+        content_version, settings_signature(), app.template_signature,
+        request.path, sorted(request.args.items(multi=True)), sorted(session.get("cart", {}).items()),
+        session.get(app.config.get("WTF_CSRF_FIELD_NAME", "csrf_token")), token_period,
+    )
+    return hashlib.blake2b(repr(parts).encode(), digest_size=16).hexdigest()
+
+
+# Signature of settings.json the current settings were loaded from
+def settings_signature() -> tuple | None:
+    app.refresh_settings()
+    return settings_document.signature
+
+
+# The stored version of the catalog (its storage signature), for pages that show
+# more than one product
+def catalog_version() -> tuple | None:
+    product_collection.snapshot()
+    return product_collection.signature
+
+
+# Digest of the stored record of one product, for its product page. None for
+# unknown IDs.
+def product_version(product_id: str) -> str | None:
+    product: dict | None = product_collection.get(product_id)
+    if product is None:
+        return None
+    return hashlib.blake2b(json.dumps(product, sort_keys=True, default=str).encode(), digest_size=16).hexdigest()
+
+
+# Gives a GET view's 200 responses an ETag (see page_etag()) and answers a
+# matching If-None-Match with 304 before the view runs. version is called with
+# the view's arguments and returns the version of what the page shows. Goes
+# above cached_page, so a 304 doesn't look up the page cache either.
+def conditional_page(version: Callable[..., Any] = catalog_version):
+    def decorator(view):
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            if request.method != "GET":
+                return view(*args, **kwargs)
+
+            content_version: Any = version(*args, **kwargs)
+            etag: str | None = page_etag(content_version)
+            if etag is not None and request.if_none_match.contains(etag):
+                response = app.response_class(status=304)
+            else:
+                response = app.make_response(view(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+                # Rendering may have started the visitor's session and CSRF token
+                etag = page_etag(content_version)
+                if etag is None:
+                    return response
+
+            response.set_etag(etag)
+            response.headers["Cache-Control"] = "private, no-cache"
+            return response
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,63 @@
+import os
+import sys
+import time
+
+ROOT: str = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+# =====================================
+# Shared scaffolding of the benchmark scripts: puts the app on the import
+# path and makes the test records and timings
+# =====================================
+
+
+# A product as the admin panel saves it, fields override the defaults
+def make_product(index: int, **fields) -> dict:
+    return {
+        "id": str(index),
+        "name": f"Mizuno Driver ST-G {index}",
+        "price": 599.99 + index % 100,
+        "thumbnail": f"products/{index}/thumbnail.webp",
+        "amount": index % 20,
+        "images": [],
+        "featured": False,
+        "new_price": 0.0,
+        "raw_description": "",
+        "description": "",
+        "categories": ["Golfschläger"],
+        "tax": 20.0,
+        "availability": "Auf Lager",
+        "keyword": f"driver mizuno {index}",
+        **fields,
+    }
+
+
+# An order as the checkout saves it
+def make_order(index: int) -> dict:
+    return {
+        "id": str(1700000000 + index),
+        "email": f"kunde{index}@example.com",
+        "name": f"Kunde {index}",
+        "type": "privat",
+        "tel": "+43 1 234567",
+        "address": "Polgarstraße 24",
+        "country": "Österreich",
+        "city": "Wien",
+        "zip_code": "1220",
+        "items": [{"name": "Mizuno Driver ST-G", "quantity": 1, "unit_price": 599.99, "tax_rate": 0.2, "total": 599.99}],
+        "total_price": 599.99,
+        "old_total": 599.99,
+        "total_tax": 100.0,
+        "date": "01.01.2025",
+        "status": "offen",
+        "notiz": "",
+        "discount": 0,
+    }
+
+
+# Milliseconds per call, averaged over samples calls
+def timed(function, samples: int) -> float:
+    start = time.perf_counter()
+    for _ in range(samples):
+        function()
+    return (time.perf_counter() - start) / samples * 1000
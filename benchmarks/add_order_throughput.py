@@ -0,0 +1,49 @@
+import os
+import shutil
+import tempfile
+import threading
+import time
+
+from _common import ROOT, make_order
+
+# =====================================
+# add_order throughput under concurrent checkouts
+# python benchmarks/add_order_throughput.py
+# =====================================
+
+THREADS: int = 64
+ORDERS_PER_THREAD: int = 20
+EXISTING_ORDERS: int = 1_000
+
+
+def main():
+    with tempfile.TemporaryDirectory() as work_dir:
+        # The app works relative to the current directory (data/, logs/)
+        shutil.copytree(os.path.join(ROOT, "data"), os.path.join(work_dir, "data"))
+        os.chdir(work_dir)
+
+        from utility import add_order, get_orders, order_collection
+        order_collection.replace([make_order(i) for i in range(EXISTING_ORDERS)])
+        get_orders()
+
+        def checkout(thread: int):
+            for i in range(ORDERS_PER_THREAD):
+                add_order(make_order(EXISTING_ORDERS + thread * ORDERS_PER_THREAD + i))
+
+        threads = [threading.Thread(target=checkout, args=(thread,)) for thread in range(THREADS)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed: float = time.perf_counter() - start
+
+        order_collection.invalidate()
+        stored: int = len(get_orders())
+        total: int = THREADS * ORDERS_PER_THREAD
+        print(f"{THREADS} threads, {total} orders in {elapsed:.2f} s -> {total / elapsed:.0f} orders/s ({stored - EXISTING_ORDERS} stored)")
+        os.chdir(ROOT)
+
+
+if __name__ == "__main__":
+    main()
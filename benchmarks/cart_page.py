@@ -0,0 +1,62 @@
+from _common import make_product, timed
+
+from jinja2 import Environment
+
+from utility.pricing import PricingIndex
+from utility.records import freeze
+
+# =====================================
+# Joining a 10 item cart with its products: template scan vs. ID index
+# python benchmarks/cart_page.py
+# =====================================
+
+SAMPLES: int = 20
+CART_ITEMS: int = 10
+FORMAT: str = "#.##0,00"
+
+# What cart.jinja-html did: one selectattr scan of the catalog per cart line
+SCAN_TEMPLATE: str = """{% for product_id, quantity in cart.items() %}
+{% set product = products | selectattr("id", "equalto", product_id) | first %}
+{% if product %}{{ product.name }} {{ quantity }} {{ product.price }}{% endif %}
+{% endfor %}"""
+VIEW_TEMPLATE: str = """{% for line in lines %}
+{{ line.product.name }} {{ line.quantity }} {{ line.price_text }}
+{% endfor %}"""
+
+
+def sample_product(index: int) -> dict:
+    return make_product(index, name=f"Produkt {index}", price=10 + index % 500 + 0.99)
+
+
+# The join cart_view() does, on a given catalog instead of the product collection
+def view_lines(index: dict, prices: PricingIndex, cart: dict) -> list[dict]:
+    lines: list[dict] = []
+    for product_id, quantity in cart.items():
+        product = index.get(product_id)
+        if product is not None:
+            pricing = prices.get(product)
+            lines.append({"product": product, "quantity": quantity, "pricing": pricing,
+                          "total": pricing.effective_price * quantity, "price_text": pricing.text(FORMAT)["price"]})
+    return lines
+
+
+def main():
+    environment: Environment = Environment()
+    scan = environment.from_string(SCAN_TEMPLATE)
+    view = environment.from_string(VIEW_TEMPLATE)
+
+    print(f"{'catalog':>8} | {'template scan (ms)':>18} | {'cart view (ms)':>14}")
+    for size in (1_000, 10_000, 100_000):
+        products: tuple = tuple(freeze(sample_product(i)) for i in range(size))
+        index: dict = {product["id"]: product for product in products}
+        prices: PricingIndex = PricingIndex.build(products)
+        # Products spread over the catalog, so the scan has to go far for most of them
+        cart: dict = {str(size * (i + 1) // (CART_ITEMS + 1)): 1 + i % 3 for i in range(CART_ITEMS)}
+
+        scan_ms: float = timed(lambda: scan.render(products=products, cart=cart), SAMPLES)
+        view_ms: float = timed(lambda: view.render(lines=view_lines(index, prices, cart)), SAMPLES)
+        print(f"{size:>8} | {scan_ms:>18.2f} | {view_ms:>14.3f}")
+
+
+if __name__ == "__main__":
+    main()
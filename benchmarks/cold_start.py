@@ -0,0 +1,73 @@
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from _common import ROOT, make_product
+
+# =====================================
+# Cold start with a 50k product catalog: JSON vs. binary snapshot
+# python benchmarks/cold_start.py
+# =====================================
+
+PRODUCTS: int = 50_000
+RUNS: int = 3
+
+# Runs in a fresh interpreter: time until the first request has its products
+CHILD: str = f"""
+import sys, time
+sys.path.insert(0, {ROOT!r})
+from utility import product_collection
+start = time.perf_counter()
+product_collection.snapshot()
+print(time.perf_counter() - start)
+"""
+
+
+# A product with a long description, like the real catalog
+def sample_product(index: int) -> dict:
+    description: str = f"Produkt {index} " + "Geschmiedeter Driver mit großem Sweetspot und Carbon-Krone. " * 25
+    return make_product(index, images=[f"products/{index}/1.webp", f"products/{index}/2.webp"], featured=index % 25 == 0,
+                        raw_description=description, description=f"<p>{description}</p>", categories=["Golfschläger", "Driver"])
+
+
+def set_binary_snapshots(enabled: bool):
+    with open(os.path.join("data", "settings.json"), "r", encoding="utf-8") as file:
+        settings: dict = json.load(file)
+    settings.setdefault("storage", {})["binary_snapshots"] = enabled
+    with open(os.path.join("data", "settings.json"), "w", encoding="utf-8") as file:
+        json.dump(settings, file, indent=4, ensure_ascii=False)
+
+
+def cold_start() -> float:
+    result = subprocess.run([sys.executable, "-c", CHILD], capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    with tempfile.TemporaryDirectory() as work_dir:
+        # The app works relative to the current directory (data/, logs/)
+        shutil.copytree(os.path.join(ROOT, "data"), os.path.join(work_dir, "data"))
+        os.chdir(work_dir)
+        with open(os.path.join("data", "products.json"), "w", encoding="utf-8") as file:
+            json.dump([sample_product(i) for i in range(PRODUCTS)], file, indent=4, ensure_ascii=False)
+        size: float = os.path.getsize(os.path.join("data", "products.json")) / 1024 / 1024
+
+        set_binary_snapshots(False)
+        json_seconds: float = min(cold_start() for _ in range(RUNS))
+
+        set_binary_snapshots(True)
+        cold_start()  # writes the binary snapshot
+        binary_seconds: float = min(cold_start() for _ in range(RUNS))
+        binary_size: float = os.path.getsize(os.path.join("data", "products.bin")) / 1024 / 1024
+        os.chdir(ROOT)
+
+    print(f"{PRODUCTS} products, products.json {size:.1f} MB, products.bin {binary_size:.1f} MB")
+    print(f"json:   {json_seconds * 1000:8.1f} ms")
+    print(f"binary: {binary_seconds * 1000:8.1f} ms ({json_seconds / binary_seconds:.1f}x faster)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import os
+
+from _common import ROOT, timed
+os.chdir(ROOT)
+
+from main import app
+from FlaskClass import page_cache
+
+# =====================================
+# Revisiting a page: full GET vs. conditional GET answered with 304, for an
+# anonymous visitor (full GET is a page cache hit) and one with a cart (rendered)
+# python benchmarks/conditional_get.py
+# =====================================
+
+SAMPLES: int = 200
+PAGES: list[str] = ["/", "/produkte", "/produkte?sort=price-asc&category=Golfschläger", "/produkt/1", "/api/filter-products?page=1"]
+
+
+def main():
+    for visitor in ("anonymous", "with cart"):
+        client = app.test_client()
+        if visitor == "with cart":
+            with client.session_transaction() as session:
+                session["cart"] = {"1": 2, "2": 1}
+        print(f"\n{visitor:<50} | {'200 (ms)':>8} | {'bytes':>6} | {'304 (ms)':>8}")
+        for page in PAGES:
+            response = client.get(page)
+            etag: str = response.headers["ETag"]
+            full_ms: float = timed(lambda: client.get(page), SAMPLES)
+            not_modified_ms: float = timed(lambda: client.get(page, headers={"If-None-Match": etag}), SAMPLES)
+            assert client.get(page, headers={"If-None-Match": etag}).status_code == 304
+            print(f"{page:<50} | {full_ms:>8.2f} | {len(response.data):>6} | {not_modified_ms:>8.2f}")
+    print(f"\n{page_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import time
+
+from _common import make_product, timed
+
+from utility.facets import FacetIndex
+from utility.pricing import Pricing, PricingIndex
+from utility.records import freeze
+from utility.search import in_stock
+
+# =====================================
+# Facet filtering with counts on 100k products: bitset index vs. Python scan
+# python benchmarks/facets.py
+# =====================================
+
+PRODUCTS: int = 100_000
+SAMPLES: int = 20
+CATEGORIES: list[str] = [f"Kategorie {i}" for i in range(100)]
+CASES: list[tuple] = [
+    ("no facets", None, None, None, False, False),
+    ("two categories", [CATEGORIES[1], CATEGORIES[2]], None, None, False, False),
+    ("price range + stock", None, 100.0, 400.0, True, False),
+    ("everything", [CATEGORIES[6], CATEGORIES[42]], 50.0, 900.0, True, True),
+]
+
+
+def sample_product(index: int) -> dict:
+    return make_product(index, price=float(index * 7919 % 1000), new_price=0.0 if index % 6 else float(index * 7919 % 1000) * 0.8,
+                        amount=index % 4, categories=[CATEGORIES[index % len(CATEGORIES)], CATEGORIES[index * 31 % len(CATEGORIES)]])
+
+
+# What the facets cost without an index: one pass for the matches and the category counts
+def scan(products: tuple, categories, price_min, price_max, stock, sale) -> tuple[list, dict]:
+    matches: list = []
+    counts: dict[str, int] = {}
+    for product in products:
+        pricing: Pricing = Pricing(product)
+        price: float = pricing.effective_price
+        if price_min is not None and not price >= price_min or price_max is not None and not price <= price_max:
+            continue
+        if stock and not in_stock(product) or sale and not pricing.on_sale:
+            continue
+        for category in product["categories"]:
+            counts[category] = counts.get(category, 0) + 1
+        if not categories or any(category in categories for category in product["categories"]):
+            matches.append(product)
+    return matches, counts
+
+
+def main():
+    products: tuple = tuple(freeze(sample_product(i)) for i in range(PRODUCTS))
+    start = time.perf_counter()
+    pricing: PricingIndex = PricingIndex.build(products)
+    index: FacetIndex = FacetIndex.build(products, pricing)
+    print(f"{PRODUCTS} products, {len(CATEGORIES)} categories, index built in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    changed: list = [freeze({**products[10], "amount": 0, "categories": ["Neu"]})]
+    changed_pricing: PricingIndex = pricing.updated(products, [products[10]], changed)
+    start = time.perf_counter()
+    index.updated(products, [products[10]], changed, changed_pricing)
+    print(f"index update for one changed product: {(time.perf_counter() - start) * 1000:.1f} ms\n")
+
+    print(f"{'facets':<20} | {'hits':>6} | {'index (ms)':>10} | {'scan (ms)':>10}")
+    for name, categories, price_min, price_max, stock, sale in CASES:
+        rows, facets = index.select(categories, price_min, price_max, stock, sale)
+        assert len(rows) == len(scan(products, categories, price_min, price_max, stock, sale)[0])
+        index_ms: float = timed(lambda: index.select(categories, price_min, price_max, stock, sale), SAMPLES)
+        scan_ms: float = timed(lambda: scan(products, categories, price_min, price_max, stock, sale), SAMPLES)
+        print(f"{name:<20} | {facets['total']:>6} | {index_ms:>10.2f} | {scan_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
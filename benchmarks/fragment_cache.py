@@ -0,0 +1,39 @@
+import os
+
+from _common import ROOT, timed
+os.chdir(ROOT)
+
+from main import app
+from utility import fragment_cache
+
+# =====================================
+# Pages for a visitor with a cart (no page cache): all fragments rendered vs. cached
+# python benchmarks/fragment_cache.py
+# =====================================
+
+SAMPLES: int = 100
+PAGES: list[str] = ["/", "/produkte", "/produkt/1", "/rechtliches/agb"]
+
+
+def main():
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session["cart"] = {"1": 1}
+
+    print(f"{'page':<20} | {'rendered (ms)':>13} | {'cached (ms)':>11}")
+    for page in PAGES:
+        def uncached():
+            fragment_cache.clear()
+            client.get(page)
+
+        rendered_ms: float = timed(uncached, SAMPLES)
+        client.get(page)
+        cached_ms: float = timed(lambda: client.get(page), SAMPLES)
+        print(f"{page:<20} | {rendered_ms:>13.2f} | {cached_ms:>11.2f}")
+
+    for name, counters in fragment_cache.stats()["fragments"].items():
+        print(f"{name}: {counters}")
+
+
+if __name__ == "__main__":
+    main()
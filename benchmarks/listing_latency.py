@@ -0,0 +1,61 @@
+import time
+
+from _common import make_product, timed
+
+from utility.records import freeze
+from utility.search import FEATURED, IN_STOCK, ListingIndex
+
+# =====================================
+# Category pages and the featured strip on 100k products: listing index vs. scan
+# python benchmarks/listing_latency.py
+# =====================================
+
+PRODUCTS: int = 100_000
+SAMPLES: int = 50
+CATEGORIES: list[str] = [f"Kategorie {i}" for i in range(200)]
+
+
+def sample_product(index: int) -> dict:
+    return make_product(index, categories=[CATEGORIES[index % len(CATEGORIES)], CATEGORIES[index % 7]], featured=index % 1000 == 0,
+                        amount=index % 4)
+
+
+def scan(products: tuple, category: str | None, featured: bool, in_stock: bool) -> list:
+    return [
+        product for product in products
+        if (category is None or category in product.get("categories", []))
+        and (not featured or product.get("featured"))
+        and (not in_stock or product.get("amount", 0) > 0)
+    ]
+
+
+def main():
+    products: tuple = tuple(freeze(sample_product(i)) for i in range(PRODUCTS))
+    by_id: dict = {product["id"]: product for product in products}
+    start = time.perf_counter()
+    index: ListingIndex = ListingIndex.build(products)
+    print(f"{PRODUCTS} products, index built in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    start = time.perf_counter()
+    index.updated(products, [products[10]], [freeze({**products[10], "featured": True})])
+    print(f"index update for one changed product: {(time.perf_counter() - start) * 1000:.1f} ms\n")
+
+    cases: list[tuple] = [
+        ("featured", None, True, False),
+        ("small category", CATEGORIES[150], False, False),
+        ("category in stock", CATEGORIES[150], False, True),
+        ("large category", CATEGORIES[3], False, False),
+    ]
+    print(f"{'listing':<18} | {'hits':>6} | {'index (ms)':>10} | {'scan (ms)':>10}")
+    for name, category, featured, in_stock in cases:
+        keys: list[tuple] = ([("category", category)] if category else []) + ([FEATURED] if featured else []) + ([IN_STOCK] if in_stock else [])
+        lookup = lambda: [by_id[product_id] for product_id in index.ids(keys)]
+        hits: int = len(lookup())
+        assert hits == len(scan(products, category, featured, in_stock))
+        index_ms: float = timed(lookup, SAMPLES)
+        scan_ms: float = timed(lambda: scan(products, category, featured, in_stock), SAMPLES)
+        print(f"{name:<18} | {hits:>6} | {index_ms:>10.3f} | {scan_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+import random
+
+from _common import timed
+
+from utility.other_utils import _render_markdown, convert_markdown_to_html
+
+# =====================================
+# Converting a 100 KB product description: conversion vs. render cache hit
+# python benchmarks/markdown_render.py
+# =====================================
+
+SIZE: int = 100_000
+SAMPLES: int = 20
+LINES: list[str] = [
+    "# Mizuno Driver ST-G",
+    "Der neue **ST-G** Driver mit *verstellbaren* Gewichten für ein optimales Ballflugverhalten.",
+    "- Loft: 9° / 10,5°",
+    "- Schaft: Fujikura Ventus TR Blue",
+    "> Ein Driver für Spieler, die *alles* einstellen wollen.",
+    "{color:#c00}Nur solange der Vorrat reicht!{/color}",
+    "{align:center}Mehr Infos im [Shop](https://example.com/mizuno_st_g){/align}",
+    "Schlagfläche aus Beta-Titan, ~~1.2 mm~~ 1.1 mm dünn, `CORTECH` Technologie.",
+    "",
+    "---",
+    "Lieferumfang: Driver, Headcover und Schlüssel.",
+]
+
+
+def make_description() -> str:
+    random.seed(1)
+    lines: list[str] = []
+    size: int = 0
+    while size < SIZE:
+        line: str = random.choice(LINES)
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)
+
+
+def main():
+    description: str = make_description()
+    print(f"description: {len(description) // 1000} KB, {description.count(chr(10)) + 1} lines\n")
+    convert_markdown_to_html(description)
+    print(f"{'':<20} | {'ms':>8}")
+    print(f"{'conversion':<20} | {timed(lambda: _render_markdown(description, 'div'), SAMPLES):>8.2f}")
+    print(f"{'render cache hit':<20} | {timed(lambda: convert_markdown_to_html(description), SAMPLES):>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
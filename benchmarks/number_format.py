@@ -0,0 +1,38 @@
+import random
+
+from _common import timed
+
+from utility.other_utils import NumberFormat, format_number, number_format
+
+# =====================================
+# Cost of formatting one price with the custom_format filter's format string
+# python benchmarks/number_format.py
+# =====================================
+
+CALLS: int = 200_000
+FORMAT: str = "#.##0,00"
+
+
+# Microseconds per number, function formats all of them
+def per_call(function, numbers: list) -> float:
+    return timed(lambda: function(numbers), 1) / len(numbers) * 1000
+
+
+def main():
+    random.seed(1)
+    numbers: list[float] = [round(random.uniform(1, 50_000), 2) for _ in range(CALLS)]
+    compiled: NumberFormat = number_format(FORMAT)
+
+    print(f"{'':<32} | {'per call (µs)':>13}")
+    cases: list[tuple] = [
+        ("parse format every call", lambda values: [NumberFormat(FORMAT).format(value) for value in values]),
+        ("format_number()", lambda values: [format_number(value, FORMAT) for value in values]),
+        ("compiled NumberFormat.format()", lambda values: [compiled.format(value) for value in values]),
+        ("compiled NumberFormat.format_many()", compiled.format_many),
+    ]
+    for name, function in cases:
+        print(f"{name:<32} | {per_call(function, numbers):>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
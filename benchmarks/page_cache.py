@@ -0,0 +1,34 @@
+import os
+
+from _common import ROOT, timed
+os.chdir(ROOT)
+
+from main import app
+from FlaskClass import page_cache
+
+# =====================================
+# Storefront pages for an anonymous visitor: rendering vs. page cache hit
+# python benchmarks/page_cache.py
+# =====================================
+
+SAMPLES: int = 100
+PAGES: list[str] = ["/", "/produkte", "/produkte?sort=price-asc&category=Golfschläger", "/produkt/1", "/ueber", "/rechtliches/agb"]
+
+
+def main():
+    client = app.test_client()
+    print(f"{'page':<50} | {'render (ms)':>11} | {'hit (ms)':>8}")
+    for page in PAGES:
+        def render():
+            page_cache.clear()
+            client.get(page)
+
+        render_ms: float = timed(render, SAMPLES)
+        client.get(page)
+        hit_ms: float = timed(lambda: client.get(page), SAMPLES)
+        print(f"{page:<50} | {render_ms:>11.2f} | {hit_ms:>8.2f}")
+    print(f"\n{page_cache.stats()}")
+
+
+if __name__ == "__main__":
+    main()
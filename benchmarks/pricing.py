@@ -0,0 +1,81 @@
+import time
+
+from _common import make_product, timed
+
+from utility.other_utils import format_number
+from utility.pricing import PricingIndex
+from utility.records import freeze
+
+# =====================================
+# Prices of a product page and a cart: derived pricing fields vs. per-request math and formatting
+# python benchmarks/pricing.py
+# =====================================
+
+PRODUCTS: int = 100_000
+SAMPLES: int = 200
+PAGE_SIZE: int = 24
+CART_ITEMS: int = 20
+FORMAT: str = "#.##0,00"
+
+
+def sample_product(index: int) -> dict:
+    return make_product(index, price=100 + index % 900 + 0.99, new_price=79.99 if index % 3 == 0 else 0.0)
+
+
+# What the templates and calculate_cart did per request
+def page_per_request(products: list) -> list:
+    cards: list = []
+    for product in products:
+        price: str = format_number(product["price"], FORMAT)
+        new_price: str | None = format_number(product["new_price"], FORMAT) if product.get("new_price") else None
+        effective: float = product.get("new_price") if product.get("new_price", 0) > 0 else product.get("price", 0.0)
+        cards.append((price, new_price, effective))
+    return cards
+
+
+def cart_per_request(products: list) -> tuple[float, float]:
+    items: list = [{
+        "tax_rate": product.get("tax", 0.0) / 100,
+        "total": (product.get("new_price") if product.get("new_price", 0) > 0 else product.get("price", 0.0)) * 2,
+    } for product in products]
+    return sum(item["total"] for item in items), sum(item["total"] / (1 + item["tax_rate"]) * item["tax_rate"] for item in items)
+
+
+def page_derived(index: PricingIndex, products: list) -> list:
+    cards: list = []
+    for product in products:
+        pricing = index.get(product)
+        text: dict[str, str] = pricing.text(FORMAT)
+        cards.append((text["price"], text["new_price"] if pricing.on_sale else None, pricing.effective_price))
+    return cards
+
+
+def cart_derived(index: PricingIndex, products: list) -> tuple[float, float]:
+    prices: list = [index.get(product) for product in products]
+    return sum(pricing.effective_price * 2 for pricing in prices), sum(pricing.tax_amount * 2 for pricing in prices)
+
+
+def main():
+    products: tuple = tuple(freeze(sample_product(i)) for i in range(PRODUCTS))
+    start = time.perf_counter()
+    index: PricingIndex = PricingIndex.build(products)
+    print(f"{PRODUCTS} products, pricing computed in {(time.perf_counter() - start) * 1000:.0f} ms")
+    start = time.perf_counter()
+    index.updated(products, [products[10]], [freeze({**products[10], "new_price": 5.0})])
+    print(f"index update for one changed product: {(time.perf_counter() - start) * 1000:.1f} ms\n")
+
+    page: list = list(products[1000:1000 + PAGE_SIZE])
+    cart: list = list(products[5000:5000 + CART_ITEMS])
+    page_derived(index, page)
+    assert page_derived(index, page) == page_per_request(page)
+    total, tax = cart_derived(index, cart)
+    old_total, old_tax = cart_per_request(cart)
+    assert abs(total - old_total) < 1e-6 and abs(tax - old_tax) < 1e-6
+
+    print(f"{'':<18} | {'per request (ms)':>16} | {'derived (ms)':>12}")
+    print(f"{f'page of {PAGE_SIZE}':<18} | {timed(lambda: page_per_request(page), SAMPLES):>16.3f} | {timed(lambda: page_derived(index, page), SAMPLES):>12.3f}")
+    print(f"{f'cart of {CART_ITEMS}':<18} | {timed(lambda: cart_per_request(cart), SAMPLES):>16.3f} | {timed(lambda: cart_derived(index, cart), SAMPLES):>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
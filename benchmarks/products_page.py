@@ -0,0 +1,57 @@
+import json
+import os
+import shutil
+import tempfile
+
+from _common import ROOT, make_product, timed
+
+# =====================================
+# /produkte with a 20k product catalog: first page vs. every card in one response
+# python benchmarks/products_page.py
+# =====================================
+
+PRODUCTS: int = 20_000
+SAMPLES: int = 10
+
+
+# Milliseconds per request and the size of the response
+def timed_with_size(function) -> tuple[float, int]:
+    size: int = len(function())
+    return timed(function, SAMPLES), size
+
+
+def main():
+    with tempfile.TemporaryDirectory() as work_dir:
+        # The app works relative to the current directory (data/, logs/)
+        shutil.copytree(os.path.join(ROOT, "data"), os.path.join(work_dir, "data"))
+        os.makedirs(os.path.join(work_dir, "logs"))
+        os.chdir(work_dir)
+        with open(os.path.join("data", "products.json"), "w", encoding="utf-8") as file:
+            json.dump([make_product(i) for i in range(PRODUCTS)], file, ensure_ascii=False)
+
+        import main as app_main
+        from flask import render_template, request
+        from utility import paginate_products, product_filters
+        client = app_main.app.test_client()
+
+        def everything() -> bytes:
+            # What the page rendered before it was paginated
+            with app_main.app.test_request_context("/produkte"):
+                app_main.request_handler()
+                listing: dict = paginate_products(product_filters(request.args), 1, PRODUCTS)
+                return render_template("products.jinja-html", listing=listing).encode()
+
+        first_ms, first_size = timed_with_size(lambda: client.get("/produkte").data)
+        next_ms, next_size = timed_with_size(lambda: client.get("/api/filter-products?page=2").data)
+        all_ms, all_size = timed_with_size(everything)
+        os.chdir(ROOT)
+
+    print(f"{PRODUCTS} products")
+    print(f"{'response':<26} | {'ms':>8} | {'KB':>8}")
+    print(f"{'first page (/produkte)':<26} | {first_ms:>8.1f} | {first_size / 1024:>8.0f}")
+    print(f"{'next page (JSON)':<26} | {next_ms:>8.1f} | {next_size / 1024:>8.0f}")
+    print(f"{'all cards in one page':<26} | {all_ms:>8.1f} | {all_size / 1024:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
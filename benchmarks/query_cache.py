@@ -0,0 +1,49 @@
+from _common import make_product, timed
+
+from utility.collection import RecordList, Snapshot, VersionedCache
+from utility.data_managment import _query_products
+from utility.facets import FacetIndex
+from utility.pricing import PricingIndex
+from utility.records import freeze
+from utility.search import ListingIndex, SearchIndex, SortIndex
+
+# =====================================
+# Repeated product listings on 100k products: result cache vs. no cache
+# python benchmarks/query_cache.py
+# =====================================
+
+PRODUCTS: int = 100_000
+SAMPLES: int = 50
+CATEGORIES: list[str] = [f"Kategorie {i}" for i in range(20)]
+QUERIES: list[tuple] = [
+    ("catalog by price", (None, None, "price", True, False, False, False, None, None, None, False)),
+    ("category", (None, CATEGORIES[3], None, True, False, False, False, None, None, None, False)),
+    ("search", ("golf schlaeger", None, None, True, False, False, False, None, None, None, False)),
+    ("search by name", ("golf", CATEGORIES[3], "name", False, False, False, False, None, None, None, False)),
+]
+
+
+def sample_product(index: int) -> dict:
+    return make_product(index, name=f"Golf {'Schläger' if index % 3 else 'Ball'} {index}", keyword="golf", price=float(index % 977),
+                        categories=[CATEGORIES[index % len(CATEGORIES)]])
+
+
+def main():
+    records: tuple = tuple(freeze(sample_product(i)) for i in range(PRODUCTS))
+    pricing: PricingIndex = PricingIndex.build(records)
+    snapshot = Snapshot(RecordList.build(records),
+                        {"search": SearchIndex.build(records), "listing": ListingIndex.build(records),
+                         "sort": SortIndex.build(records, pricing), "facets": FacetIndex.build(records, pricing)}, 1)
+    cache = VersionedCache("products")
+
+    print(f"{'listing':<18} | {'uncached (ms)':>13} | {'cached (ms)':>11}")
+    for name, key in QUERIES:
+        uncached_ms: float = timed(lambda: _query_products(snapshot, *key), SAMPLES)
+        cache.get(snapshot.version, key, lambda: _query_products(snapshot, *key))
+        cached_ms: float = timed(lambda: cache.get(snapshot.version, key, lambda: _query_products(snapshot, *key)), SAMPLES)
+        print(f"{name:<18} | {uncached_ms:>13.2f} | {cached_ms:>11.4f}")
+    print(cache.stats())
+
+
+if __name__ == "__main__":
+    main()
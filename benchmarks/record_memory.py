@@ -0,0 +1,61 @@
+import gc
+import json
+import os
+import shutil
+import tempfile
+import tracemalloc
+
+from _common import ROOT, make_product
+
+# =====================================
+# Memory of a loaded 100k product catalog: dict vs. compact records
+# python benchmarks/record_memory.py
+# =====================================
+
+PRODUCTS: int = 100_000
+CATEGORIES: list[list[str]] = [["Golfschläger", "Driver"], ["Golfschläger", "Eisen"], ["Golfbälle"], ["Zubehör"]]
+
+
+def sample_product(index: int) -> dict:
+    return make_product(index, price=float(99 + index % 500), images=[f"products/{index}/1.webp", f"products/{index}/2.webp"],
+                        featured=index % 25 == 0, raw_description=f"Produkt {index}", description=f"<p>Produkt {index}</p>",
+                        categories=CATEGORIES[index % len(CATEGORIES)], keyword="golf")
+
+
+# Bytes held by the loaded snapshot of a fresh collection
+def measure(compact: bool, binary: bool) -> int:
+    from utility import Collection, get_storage
+    storage = get_storage()
+    storage.compact_records = compact
+    storage.binary_snapshots = binary
+    storage.load("products")  # makes sure the binary snapshot exists before measuring
+
+    gc.collect()
+    tracemalloc.start()
+    collection = Collection("products")
+    collection.snapshot()
+    gc.collect()
+    used: int = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return used
+
+
+def main():
+    with tempfile.TemporaryDirectory() as work_dir:
+        # The app works relative to the current directory (data/, logs/)
+        shutil.copytree(os.path.join(ROOT, "data"), os.path.join(work_dir, "data"))
+        os.chdir(work_dir)
+        with open(os.path.join("data", "products.json"), "w", encoding="utf-8") as file:
+            json.dump([sample_product(i) for i in range(PRODUCTS)], file, indent=4, ensure_ascii=False)
+
+        print(f"{PRODUCTS} products   | {'dict (MB)':>9} | {'compact (MB)':>12} | {'bytes/product':>15}")
+        for binary, label in ((False, "all fields  "), (True, "lazy fields ")):
+            dict_bytes: int = measure(False, binary)
+            compact_bytes: int = measure(True, binary)
+            print(f"{label:<17} | {dict_bytes / 1e6:>9.1f} | {compact_bytes / 1e6:>12.1f} | "
+                  f"{dict_bytes // PRODUCTS:>6} -> {compact_bytes // PRODUCTS:<6}")
+        os.chdir(ROOT)
+
+
+if __name__ == "__main__":
+    main()
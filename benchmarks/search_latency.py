@@ -0,0 +1,57 @@
+import re
+import time
+
+from _common import make_product, timed
+
+from utility.records import freeze
+from utility.search import SearchIndex
+
+# =====================================
+# Product search on 100k products: inverted index vs. regex scan
+# python benchmarks/search_latency.py
+# =====================================
+
+PRODUCTS: int = 100_000
+SAMPLES: int = 50
+BRANDS: list[str] = ["Mizuno", "Titleist", "Callaway", "TaylorMade", "Ping", "Cobra", "Wilson", "Srixon"]
+KINDS: list[str] = ["Driver", "Eisen", "Putter", "Wedge", "Golfball", "Schläger", "Golfschläger", "Handschuh", "Tasche"]
+QUERIES: list[str] = ["Mizuno 4712", "Mizuno Schläger 4712", "titleist putt", "schlaeger", "golf"]
+# Results a listing page shows
+TOP: int = 20
+
+
+def sample_product(index: int) -> dict:
+    brand: str = BRANDS[index % len(BRANDS)]
+    kind: str = KINDS[index // len(BRANDS) % len(KINDS)]
+    return make_product(index, name=f"{brand} {kind} {index}", keyword=f"{brand.lower()} {kind.lower()} golf")
+
+
+def regex_search(products: tuple, query: str) -> list:
+    pattern = re.compile(query, re.IGNORECASE)
+    return [
+        product for product in products
+        if (pattern.search(product.get("id", "")) or pattern.search(product.get("name", "")) or pattern.search(product.get("keyword", "")))
+    ]
+
+
+def main():
+    products: tuple = tuple(freeze(sample_product(i)) for i in range(PRODUCTS))
+    start = time.perf_counter()
+    index: SearchIndex = SearchIndex.build(products)
+    print(f"{PRODUCTS} products, index built in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    start = time.perf_counter()
+    index.updated(products, [products[0]], [freeze({**products[0], "name": "Mizuno Driver neu"})])
+    print(f"index update for one changed product: {(time.perf_counter() - start) * 1000:.1f} ms\n")
+
+    print(f"{'query':<20} | {'hits':>6} | {f'top {TOP} (ms)':>11} | {'all (ms)':>8} | {'regex (ms)':>10}")
+    for query in QUERIES:
+        hits: int = len(index.search(query))
+        top_ms: float = timed(lambda: index.search(query, TOP), SAMPLES)
+        all_ms: float = timed(lambda: index.search(query), SAMPLES)
+        regex_ms: float = timed(lambda: regex_search(products, query), SAMPLES)
+        print(f"{query:<20} | {hits:>6} | {top_ms:>11.3f} | {all_ms:>8.2f} | {regex_ms:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+import time
+
+from _common import make_product, timed
+
+from utility.collection import Collection
+from utility.pricing import PricingIndex
+from utility.records import freeze
+from utility.search import ListingIndex, SortIndex, sort_records
+
+# =====================================
+# Sorted product listings on 100k products: presorted orderings vs. sorted()
+# python benchmarks/sort_orders.py
+# =====================================
+
+PRODUCTS: int = 100_000
+SAMPLES: int = 20
+CATEGORIES: list[str] = [f"Kategorie {i}" for i in range(40)]
+
+
+def sample_product(index: int) -> dict:
+    return make_product(index, name=f"Golfschläger {index * 7919 % PRODUCTS}", price=float(index * 104729 % 100_000) / 100,
+                        new_price=0.0 if index % 5 else float(index % 500), categories=[CATEGORIES[index % len(CATEGORIES)], CATEGORIES[index % 3]])
+
+
+def main():
+    products: tuple = tuple(freeze(sample_product(i)) for i in range(PRODUCTS))
+    index: dict = Collection._build_index(products)
+    listing: ListingIndex = ListingIndex.build(products)
+    sort_index: SortIndex = SortIndex.build(products, PricingIndex.build(products))
+    for name in ("price", "name"):
+        start = time.perf_counter()
+        sort_index.ordering(name).rank()
+        print(f"{PRODUCTS} products, '{name}' ordering built in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    changed: list = [freeze({**products[10], "price": 1.0})]
+    changed_pricing: PricingIndex = sort_index.pricing.updated(products, [products[10]], changed)
+    start = time.perf_counter()
+    sort_index.updated(products, [products[10]], changed, changed_pricing)
+    print(f"orderings update for one changed product: {(time.perf_counter() - start) * 1000:.1f} ms\n")
+
+    cases: list[tuple] = [
+        ("catalog by price", None, "price"),
+        ("large category", ("category", CATEGORIES[0]), "price"),
+        ("small category", ("category", CATEGORIES[5]), "name"),
+    ]
+    print(f"{'listing':<18} | {'hits':>6} | {'presorted (ms)':>14} | {'sorted() (ms)':>13}")
+    for name, key, sort_by in cases:
+        ids: list[str] | None = listing.ids([key]) if key else None
+        records: list = list(products) if ids is None else [index[product_id] for product_id in ids]
+        presorted = lambda: sort_index.sort(sort_by, ids)
+        # What the query does without the index: sort the records by field value
+        resorted = lambda: sort_records([index[product_id] for product_id in ids] if ids is not None else list(products), sort_by)
+        presorted_ms: float = timed(presorted, SAMPLES)
+        resorted_ms: float = timed(resorted, SAMPLES)
+        print(f"{name:<18} | {len(records):>6} | {presorted_ms:>14.2f} | {resorted_ms:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from _common import ROOT, make_product
+
+# =====================================
+# Static storefront export of a 2k product catalog: first export vs. the
+# incremental ones (nothing changed, one product changed, one product deleted)
+# python benchmarks/static_export.py
+# =====================================
+
+PRODUCTS: int = 2_000
+CATEGORIES: tuple[str, ...] = ("Golfschläger", "Golfbälle", "Golftaschen", "Simulator")
+
+
+def sample_product(index: int) -> dict:
+    return make_product(index, featured=index % 500 == 0, description=f"Driver {index}", categories=[CATEGORIES[index % len(CATEGORIES)]])
+
+
+def main():
+    with tempfile.TemporaryDirectory() as work_dir:
+        # The app works relative to the current directory (data/, logs/)
+        shutil.copytree(os.path.join(ROOT, "data"), os.path.join(work_dir, "data"))
+        os.makedirs(os.path.join(work_dir, "logs"))
+        os.chdir(work_dir)
+        with open(os.path.join("data", "products.json"), "w", encoding="utf-8") as file:
+            json.dump([sample_product(i) for i in range(PRODUCTS)], file, ensure_ascii=False)
+
+        from main import app
+        from static_export import export_site
+        from utility import product_collection
+
+        app.config["STATIC_EXPORT_DIR"] = os.path.join(work_dir, "export")
+
+        def export(label: str, full: bool = False):
+            start = time.perf_counter()
+            summary: dict = export_site(base_url="https://shop.example/", full=full)
+            elapsed_ms: float = (time.perf_counter() - start) * 1000
+            print(f"{label:<24} | {elapsed_ms:>9.1f} | {summary['rendered']:>8} | {summary['unchanged']:>9} | {summary['removed']:>7}")
+
+        print(f"{'export':<24} | {'time (ms)':>9} | {'rendered':>8} | {'unchanged':>9} | {'removed':>7}")
+        export("first")
+        export("nothing changed")
+        record: dict = dict(product_collection.get("42"))
+        record["new_price"] = 499.99
+        product_collection.update("42", record)
+        export("one product changed")
+        product_collection.delete("43")
+        export("one product deleted")
+        export("full", full=True)
+
+
+if __name__ == "__main__":
+    main()
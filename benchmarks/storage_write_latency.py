@@ -0,0 +1,48 @@
+import os
+import tempfile
+import time
+
+from _common import make_order
+
+from utility import add_order, get_orders, order_collection
+from utility.storage import COLLECTIONS, JournalStorage, JsonStorage, SqliteStorage, set_storage
+
+# =====================================
+# Per-order write latency through add_order: JSON files vs. journal vs. SQLite (WAL)
+# python benchmarks/storage_write_latency.py
+# =====================================
+
+SIZES: list[int] = [1_000, 10_000, 100_000]
+SAMPLES: int = 10
+
+
+# Like a checkout: add_order() goes through the order collection's writer, which
+# publishes the new snapshot and waits until the batch is stored
+def measure(backend, size: int) -> float:
+    set_storage(backend)
+    order_collection.invalidate()
+    order_collection.replace([make_order(i) for i in range(size)])
+    get_orders()
+    start = time.perf_counter()
+    for i in range(SAMPLES):
+        add_order(make_order(size + i))
+    elapsed: float = time.perf_counter() - start
+    order_collection.flush()
+    return elapsed / SAMPLES * 1000
+
+
+def main():
+    print(f"{'orders':>8} | {'json (ms)':>10} | {'journal (ms)':>12} | {'sqlite (ms)':>11}")
+    for size in SIZES:
+        with tempfile.TemporaryDirectory() as data_dir:
+            for file_name in COLLECTIONS.values():
+                with open(os.path.join(data_dir, file_name), "w", encoding="utf-8") as file:
+                    file.write("[]")
+            json_ms = measure(JsonStorage(data_dir), size)
+            journal_ms = measure(JournalStorage(data_dir, ["orders"]), size)
+            sqlite_ms = measure(SqliteStorage(os.path.join(data_dir, "store.sqlite3")), size)
+        print(f"{size:>8} | {json_ms:>10.2f} | {journal_ms:>12.2f} | {sqlite_ms:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
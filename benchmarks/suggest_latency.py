@@ -0,0 +1,46 @@
+import time
+
+from _common import make_product, timed
+
+from utility.records import freeze
+from utility.search import SearchIndex, SuggestIndex
+
+# =====================================
+# Search-as-you-type on 100k products: suggestion index vs. full-text search per keystroke
+# python benchmarks/suggest_latency.py
+# =====================================
+
+PRODUCTS: int = 100_000
+SAMPLES: int = 200
+BRANDS: list[str] = ["Mizuno", "Titleist", "Callaway", "Ping", "TaylorMade", "Cobra", "Srixon", "Wilson"]
+KINDS: list[str] = ["Driver", "Eisen", "Putter", "Wedge", "Schläger", "Golfball", "Handschuh", "Tasche"]
+
+
+def sample_product(index: int) -> dict:
+    kind: str = KINDS[index // 8 % len(KINDS)]
+    return make_product(index, name=f"{BRANDS[index % len(BRANDS)]} {kind} Modell {index}", keyword=f"golf {kind.lower()} {index % 97}")
+
+
+def main():
+    products: tuple = tuple(freeze(sample_product(i)) for i in range(PRODUCTS))
+    start = time.perf_counter()
+    index: SuggestIndex = SuggestIndex.build(products)
+    index.suggest("")
+    index.suggest("a")
+    print(f"{PRODUCTS} products, {index!r} built in {(time.perf_counter() - start) * 1000:.0f} ms")
+    search: SearchIndex = SearchIndex.build(products)
+
+    start = time.perf_counter()
+    index.updated(products, [products[10]], [freeze({**products[10], "name": "Mizuno Driver ST-G"})])
+    print(f"index update for one changed product: {(time.perf_counter() - start) * 1000:.1f} ms\n")
+
+    print(f"{'typed':<22} | {'hits':>4} | {'suggest (ms)':>12} | {'search (ms)':>11}")
+    for typed in ["m", "mi", "miz", "mizuno d", "mizuno driver mo", "schla", "putter ", "golf eis", "xyz"]:
+        hits: int = len(index.suggest(typed))
+        suggest_ms: float = timed(lambda: index.suggest(typed), SAMPLES)
+        search_ms: float = timed(lambda: search.search(typed, 8), SAMPLES)
+        print(f"{typed!r:<22} | {hits:>4} | {suggest_ms:>12.4f} | {search_ms:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import os
+import tempfile
+import time
+import weakref
+
+from _common import ROOT, timed
+os.chdir(ROOT)
+
+from jinja2 import FileSystemBytecodeCache
+
+from main import app
+
+# =====================================
+# Loading templates after a restart (compiling vs. bytecode cache) and after a
+# template editor save (whole environment cache cleared vs. only the edited template)
+# python benchmarks/template_cache.py
+# =====================================
+
+SAMPLES: int = 10
+# Templates behind the home, products and product pages
+STOREFRONT: list[str] = ["index.jinja-html", "products.jinja-html", "product.jinja-html",
+                         "snippets/navbar.jinja-html", "snippets/footer.jinja-html"]
+EDITED: str = "snippets/footer.jinja-html"
+
+
+# A freshly started process: new environment, empty in-memory template cache
+def restart(bytecode_cache):
+    environment = app.create_jinja_environment()
+    environment.filters.update(app.jinja_env.filters)
+    environment.bytecode_cache = bytecode_cache
+    return environment
+
+
+def main():
+    names: list[str] = app.jinja_env.list_templates(extensions=["jinja-html"])
+    with tempfile.TemporaryDirectory() as directory:
+        bytecode_cache = FileSystemBytecodeCache(directory)
+        # Filled once, like the precompile at the first start does
+        warm = restart(bytecode_cache)
+        for name in names:
+            warm.get_template(name)
+
+        print(f"{'after a restart':<40} | {'compile (ms)':>12} | {'bytecode (ms)':>13}")
+        for label, loaded in ((f"all {len(names)} templates (precompile)", names), ("storefront pages", STOREFRONT)):
+            def load(cache):
+                environment = restart(cache)
+                for name in loaded:
+                    environment.get_template(name)
+
+            print(f"{label:<40} | {timed(lambda: load(None), SAMPLES):>12.2f} | {timed(lambda: load(bytecode_cache), SAMPLES):>13.2f}")
+
+    environment = restart(None)
+
+    def after_save(name: str | None):
+        for template in names:
+            environment.get_template(template)
+        if name is None:
+            environment.cache.clear()
+        else:
+            del environment.cache[(weakref.ref(environment.loader), name)]
+        start = time.perf_counter()
+        for template in STOREFRONT:
+            environment.get_template(template)
+        return (time.perf_counter() - start) * 1000
+
+    clear_ms: float = sum(after_save(None) for _ in range(SAMPLES)) / SAMPLES
+    targeted_ms: float = sum(after_save(EDITED) for _ in range(SAMPLES)) / SAMPLES
+    print(f"\n{'after saving ' + EDITED:<40} | {'clear all (ms)':>14} | {'targeted (ms)':>13}")
+    print(f"{'storefront pages':<40} | {clear_ms:>14.2f} | {targeted_ms:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,6 @@
 import os
 import threading
+import click
 import requests
 from datetime import datetime
 import time
@@ -9,10 +10,11 @@ from flask import render_template, url_for, make_response, request, jsonify, ses
 from flask_wtf.csrf import generate_csrf, CSRFError
 from waitress import serve
 
-from FlaskClass import app
+from FlaskClass import app, cached_page, conditional_page
 from logging_utility import logger
 from routes import blueprints
-from utility import query_products, get_settings, format_number
+from static_export import export_site
+from utility import query_products, product_filters, product_pricing, product_revision, get_settings, number_format, create_storage, read_storage_config, import_json_data
 
 load_dotenv()
 logger.debug("Environment variables have been loaded successfully.")
@@ -26,11 +28,12 @@ for route in blueprints:
 @app.template_filter("custom_format")
 def custom_format(value):
     if isinstance(value, (int, float)):
-        return format_number(value, app._format)
+        return number_format(app._format).format(value)
     return value
 
 @app.before_request
 def request_handler():
+    app.refresh_settings()
     request.query_params = dict(request.args)
     if app.maintenance and not request.path.startswith("/admin") and not request.path.startswith("/static") and not request.path.startswith("/uploads") and not session.get("login"):
         logger.warning("Maintenance mode is enabled.")
@@ -44,12 +47,19 @@ def utility_processor():
         "query_params": request.query_params, 
         "session": session,
         "query_products": query_products, 
+        "product_filters": product_filters,
+        "product_pricing": product_pricing,
+        "price_format": app._format,
+        "product_revision": product_revision,
+        "settings_version": app.settings_version,
         "get_settings": get_settings, 
         "generate_token": generate_csrf
     }
     return methods
 
 @app.route("/")
+@conditional_page()
+@cached_page
 def home():
     logger.info("Home page accessed.")
     return render_template('index.jinja-html')
@@ -79,6 +89,38 @@ def robots():
     return send_from_directory("./", "robots.txt")
 
 
+# One-shot import of the data/*.json files into another storage backend:
+# flask --app main import-json sqlite
+@app.cli.command("import-json")
+@click.argument("backend", default="sqlite")
+def import_json(backend):
+    target = create_storage({**read_storage_config(), "backend": backend})
+    imported: dict = import_json_data(target)
+    for collection, count in imported.items():
+        click.echo(f"{collection}: {count} records imported into {target.name}")
+
+
+# Fills the template bytecode cache ahead of the first start, e.g. while deploying:
+# flask --app main precompile-templates
+@app.cli.command("precompile-templates")
+def precompile_templates():
+    click.echo(f"{app.precompile_templates()} templates compiled")
+
+
+# Renders the storefront into static files, only what changed since the last export:
+# flask --app main export-site --base-url https://example.com/
+@app.cli.command("export-site")
+@click.option("--directory", default=None, help="Export directory (default: STATIC_EXPORT_DIR or export/)")
+@click.option("--base-url", default=None, help="Public URL of the shop, used for absolute links")
+@click.option("--full", is_flag=True, help="Render every page again")
+def export_static_site(directory, base_url, full):
+    summary: dict = export_site(directory, base_url, full)
+    click.echo(f"{summary['rendered']} pages rendered, {summary['unchanged']} unchanged, {summary['removed']} removed, "
+               f"{summary['assets_copied']} files copied into {summary['directory']} in {summary['seconds']} s")
+    for url in summary["failed"]:
+        click.echo(f"Failed: {url}")
+
+
 @app.errorhandler(405)
 def method_not_allowed(error):
     logger.warning(f"405 Method Not Allowed: {request.path}; {error}")
@@ -130,6 +172,10 @@ if __name__ == '__main__':
     os.chdir(os.path.dirname(__file__))
     logger.info("*" * 50)
     logger.info("Application Server started!")
+    if app.config.get("PRECOMPILE_TEMPLATES", True):
+        start = time.perf_counter()
+        count = app.precompile_templates()
+        logger.info(f"{count} templates precompiled in {(time.perf_counter() - start) * 1000:.0f} ms.")
     stay_alive()
     serve(app, port=8080, threads=64, url_scheme="https")
     #app.run(host="localhost", port=8080, debug=True)
@@ -8,7 +8,7 @@ from flask import render_template_string, request, jsonify, abort, session, Blue
 
 from FlaskClass import csrf, app
 from logging_utility import logger
-from utility import get_settings, is_valid_json, get_product_by_id, sanitize_path, get_products, convert_markdown_to_html, get_coupons, get_coupon_by_id, generate_calendar, get_events, query_events, add_product, add_coupon, get_contact_requests, get_contact_by_id, get_event_by_id, get_orders, get_order_by_id
+from utility import get_settings, is_valid_json, get_product_by_id, sanitize_path, get_products, convert_markdown_to_html, get_coupons, get_coupon_by_id, generate_calendar, query_events, add_product, add_coupon, get_contact_requests, get_contact_by_id, get_orders, get_order_by_id, modify_product, modify_coupon, modify_contact_request, modify_order, product_collection, coupon_collection, contact_collection, event_collection, settings_document, thaw
 
 admin_blueprint = Blueprint("admin", __name__, url_prefix="/admin")
 
@@ -122,16 +122,7 @@ def product(product_id: int):
         "keyword": request.form.get("keyword", "") 
     }
 
-    products: list[dict] = get_products()
-    for prod in products:
-        if prod.get("id") == str(product_id):
-            prod.update(product_data)
-            break
-
-    with open("data/products.json", "w", encoding="utf-8") as f:
-        json.dump(products, f, indent=4, ensure_ascii=False)
-    
-    get_product_by_id.cache_clear()
+    modify_product(product_id, product_data)
     logger.info(f"Product with ID {product_id} updated successfully")
     return redirect(url_for("admin.products"))
 
@@ -204,12 +195,10 @@ def categories():
         return render_template("admin/categories.jinja-html", categories=categories)
 
     categories: list = request.form.getlist("category")
-    settings: dict = get_settings()
+    settings: dict = thaw(get_settings())
     settings["categories"] = categories
 
-    get_settings.cache_clear()
-    with open("data/settings.json", "w", encoding="utf-8") as f:
-        json.dump(settings, f, indent=4, ensure_ascii=False)
+    settings_document.replace(settings)
     
     logger.info("Categories updated successfully")
     return redirect(url_for("admin.categories"))
@@ -262,16 +251,7 @@ def coupon(coupon_id: int):
         )
     }
 
-    coupons: list[dict] = get_coupons()
-    for coup in coupons:
-        if coup.get("id") == str(coupon_id):
-            coup.update(coupon_data)
-            break
-
-    with open("data/coupons.json", "w", encoding="utf-8") as f:
-        json.dump(coupons, f, indent=4, ensure_ascii=False)
-    
-    get_coupon_by_id.cache_clear()
+    modify_coupon(coupon_id, coupon_data)
     logger.info(f"Coupon with ID {coupon_id} updated successfully")
     return redirect(url_for("admin.coupons"))
 
@@ -337,19 +317,10 @@ def view_contact_request(id):
         return "Contact request not found", 404
 
     if request.method == 'POST':
-        contact['status'] = request.form['status']
-        contact['notiz'] = request.form['notiz']
-        
-        contacts = get_contact_requests()
-        for item in contacts:
-            if item['id'] == id:
-                item.update(contact)
-                break
-
-        with open("data/contact.json", "w", encoding="utf-8") as f:
-            json.dump(contacts, f, indent=4, ensure_ascii=False)
-        
-        get_contact_by_id.cache_clear()
+        modify_contact_request(id, {
+            'status': request.form['status'],
+            'notiz': request.form['notiz']
+        })
         return redirect(url_for('admin.view_contact_request', id=id))
 
     return render_template('admin/edit-contact-request.jinja-html', contact=contact)
@@ -361,19 +332,10 @@ def view_order(id):
         return "Order not found", 404
 
     if request.method == 'POST':
-        order['status'] = request.form['status']
-        order['notiz'] = request.form['notiz']
-        
-        orders = get_orders()
-        for item in orders:
-            if item['id'] == id:
-                item.update(order)
-                break
-
-        with open("data/orders.json", "w", encoding="utf-8") as f:
-            json.dump(orders, f, indent=4, ensure_ascii=False)
-        
-        get_order_by_id.cache_clear()
+        modify_order(id, {
+            'status': request.form['status'],
+            'notiz': request.form['notiz']
+        })
         return redirect(url_for('admin.view_order', id=id))
 
     return render_template('admin/edit-order.jinja-html', order=order)
@@ -441,8 +403,8 @@ def template_appearance_edit(template):
         with open(template_path, "w", encoding="utf-8") as file:
             file.write(new_content)
 
-            template = app.jinja_env.get_template(sanitize_path(template))
-            template.environment.cache.clear()
+        # Only the edited template is compiled again, on its next use
+        app.templates_changed(sanitize_path(template))
         logger.info("Template file saved successfully")
         return redirect(url_for("admin.template_appearance_edit", template=template))
     
@@ -506,40 +468,29 @@ def general_settings():
 
     if product_import:
         if is_valid_json(product_import.stream):
-            product_import.save("data/products.json")
-            get_product_by_id.cache_clear()
-            get_products.cache_clear()
+            product_collection.replace(json.load(product_import.stream))
 
     if coupon_import:
         if is_valid_json(coupon_import.stream):
-            coupon_import.save("data/coupons.json")
-            get_coupon_by_id.cache_clear()
-            get_coupons.cache_clear()
+            coupon_collection.replace(json.load(coupon_import.stream))
     
     if events_import:
         if is_valid_json(events_import.stream):
-            contacts_import.save("data/events.json")
-            get_events.cache_clear()
-            get_event_by_id.cache_clear()
+            event_collection.replace(json.load(events_import.stream))
 
     if contacts_import:
         if is_valid_json(contacts_import.stream):
-            contacts_import.save("data/contacts.json")
-            get_contact_requests.cache_clear()
-            get_contact_by_id.cache_clear()
+            contact_collection.replace(json.load(contacts_import.stream))
 
     if settings_import:
         if is_valid_json(settings_import.stream):
-            settings_import.save("data/settings.json")
+            settings_document.replace(json.load(settings_import.stream))
     else:
+        settings = thaw(settings)
         settings.update(settings_data)
+        settings_document.replace(settings)
 
-        with open("data/settings.json", "w", encoding="utf-8") as f:
-            json.dump(settings, f, indent=4, ensure_ascii=False)
-            
-        app._format = settings.get("format", "#.##0,00")
-
-    get_settings.cache_clear()
+    app.refresh_settings()
 
     logger.info("General settings updated successfully")
     return redirect(url_for("admin.general_settings"))
@@ -570,15 +521,12 @@ def server_settings():
     with open("robots.txt", "w") as file:
         file.write(request.form.get("robots_txt", "").replace("\r", ""))
 
+    settings = thaw(settings)
     settings["server_config"].update(config_data)    
 
-    with open("data/settings.json", "w", encoding="utf-8") as f:
-        json.dump(settings, f, indent=4, ensure_ascii=False)
-
-    app.update_config(config_data)
-    app.maintenance = config_data.get("maintenance", False)
+    settings_document.replace(settings)
+    app.refresh_settings()
     
-    get_settings.cache_clear()
     logger.info("Server settings updated successfully")
     return redirect(url_for("admin.server_settings"))
 
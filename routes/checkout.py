@@ -1,14 +1,16 @@
 from datetime import date, datetime
 
 from flask import request, session, Blueprint, url_for, redirect, render_template
-from utility import get_product_by_id, get_coupon_by_id, delete_coupon_json, get_orders, add_order
+
+from FlaskClass import app
+from utility import cart_view, get_coupon_by_id, delete_coupon_json, use_coupon, get_orders, add_order
 
 checkout_blueprint = Blueprint("checkout", __name__, template_folder="./templates", root_path="/")
 
 
 @checkout_blueprint.route("/cart/", methods=["GET"])
 def cart():
-    return render_template("cart.jinja-html")
+    return render_template("cart.jinja-html", cart_view=cart_view(session.get("cart", {}), app._format))
 
 
 @checkout_blueprint.route("/checkout/", methods=["GET", "POST"])
@@ -31,26 +33,34 @@ def checkout():
         "captcha_text": request.form.get("captcha-text"),
     }
 
-    items = []
-    cart: dict = session.get("cart", {})
+    cart: dict = cart_view(session.get("cart", {}))
     discount: dict = session.get("discount", {})
 
-    for product_id, quantity in cart.items():
-        product: dict = get_product_by_id(str(product_id))
-        price: float|None = product.get("new_price", None)
-        if price is None or price <= 0:
-            price: float = product.get("price", 0)
-        product_data = {
-            "name": product.get("name", ""),
-            "quantity": quantity,
-            "unit_price": price,
-            "tax_rate": product.get("tax", 20) / 100,
-            "total": price * quantity,
+    coupon_id = str(discount.get("id", None))
+
+    coupon = get_coupon_by_id(coupon_id)
+    if coupon:
+        valid_till = coupon.get("valid_till")
+
+        if valid_till and datetime.strptime(valid_till, "%Y-%m-%d") < datetime.today():
+            delete_coupon_json(coupon_id)
+        # Another checkout took the last use in the meantime
+        elif coupon.get("uses_remaining") is not None and not use_coupon(coupon_id):
+            discount = {}
+
+    items = [
+        {
+            "name": line["product"].get("name", ""),
+            "quantity": line["quantity"],
+            "unit_price": line["pricing"].effective_price,
+            "tax_rate": line["pricing"].tax_rate,
+            "total": line["total"],
         }
-        items.append(product_data)
+        for line in cart["lines"]
+    ]
 
-    subtotal = sum(item["total"] for item in items)
-    tax = sum(item["total"]/(item["tax_rate"]+1) * item["tax_rate"] for item in items)
+    subtotal = cart["total"]
+    tax = cart["tax"]
 
     old_total: float = subtotal
     discount_amount: float = 0
@@ -67,20 +77,6 @@ def checkout():
 
         discount_amount: float = old_total-subtotal
 
-    coupon_id = str(session.get("discount", {}).get("id", None))
-
-    coupon = get_coupon_by_id(coupon_id)
-    if coupon:
-        valid_till = coupon.get("valid_till")
-        uses_remaining = coupon.get("uses_remaining")
-
-        if valid_till and datetime.strptime(valid_till, "%Y-%m-%d") < datetime.today():
-            delete_coupon_json(coupon_id)
-        elif uses_remaining is not None:
-            coupon["uses_remaining"] -= 1
-            if coupon["uses_remaining"] <= 0:
-                delete_coupon_json(coupon_id)
-
     # Generate a new order ID
     orders = get_orders()
     new_order_id = f"{1700000000 + len(orders) + 1}"
@@ -8,11 +8,12 @@ from datetime import date, datetime
 
 import psutil
 from flask import request, jsonify, abort, session, Blueprint, send_file, url_for, redirect, make_response
-from flask_wtf.csrf import validate_csrf
+from flask_wtf.csrf import generate_csrf, validate_csrf
 
-from FlaskClass import app, csrf
+from FlaskClass import app, conditional_page, csrf, page_cache
 from logging_utility import logger
-from utility import sanitize_path, generate_captcha, convert_markdown_to_html, query_events, create_invoice_pdf, get_product_by_id, get_settings, get_coupon_by_id, get_products, get_coupons, get_events, add_contact_request, add_event, get_order_by_id, delete_product_json, delete_coupon_json, delete_order_json, delete_event_json
+from static_export import export_site
+from utility import sanitize_path, generate_captcha, convert_markdown_to_html, query_events, create_invoice_pdf, get_coupon_by_id, get_events, add_contact_request, add_event, get_order_by_id, delete_product_json, delete_coupon_json, delete_order_json, delete_event_json, product_collection, coupon_collection, order_collection, contact_collection, event_collection, settings_document, product_query_cache, product_facets, product_filters, product_page_params, paginate_products, product_pricing, cart_view, fragment_cache, suggest_products, SUGGEST_LIMIT, MAX_SUGGEST_LIMIT
 
 internal_blueprint = Blueprint("internal", __name__, template_folder="./templates")
 
@@ -118,6 +119,66 @@ def send_contact_request():
 
     return redirect(f"{url_for('home')}#contact-section")
 
+#===========================
+# Product API Routes
+#===========================
+
+# Fields of a product card, prices formatted like the custom_format filter does
+def product_card(product: dict) -> dict:
+    pricing = product_pricing(product)
+    price_text: dict[str, str] = pricing.text(app._format)
+    return {
+        "id": product.get("id"),
+        "name": product.get("name"),
+        "url": f"/produkt/{product.get('id')}",
+        "thumbnail": url_for("internal.uploads", filename=product.get("thumbnail", "")),
+        "price": product.get("price"),
+        "new_price": product.get("new_price"),
+        "effective_price": pricing.effective_price,
+        "price_text": price_text["price"],
+        "new_price_text": price_text["new_price"] if pricing.on_sale else None,
+        "tax": product.get("tax"),
+    }
+
+# This function returns one page of filtered products; the first page also carries the facet counts
+@internal_blueprint.route("/api/filter-products", methods=["GET"])
+@conditional_page()
+def filter_products():
+    logger.info(f"GET request received for filtering products | Args: {dict(request.args)}")
+    filters: dict = product_filters(request.args)
+    page, limit = product_page_params(request.args)
+    listing: dict = paginate_products(filters, page, limit)
+
+    response: dict = {
+        "products": [product_card(product) for product in listing["products"]],
+        "page": listing["page"],
+        "next_page": listing["next_page"],
+        "total": listing["total"],
+    }
+    if page == 1:
+        response["facets"] = product_facets(filters["query"], filters["categories"], filters["price_min"], filters["price_max"],
+                                            filters["in_stock"], filters["on_sale"])
+    return jsonify(response)
+
+# This function returns the products whose name or keywords start with the typed text (search-as-you-type)
+@internal_blueprint.route("/api/search/suggest", methods=["GET"])
+def suggest_search():
+    query: str = request.args.get("q", "")
+    try:
+        limit: int = min(max(int(request.args.get("limit", SUGGEST_LIMIT)), 1), MAX_SUGGEST_LIMIT)
+    except ValueError:
+        limit = SUGGEST_LIMIT
+    # Fired on every keystroke, so it only logs at debug level
+    logger.debug(f"GET request received for search suggestions | Query: {query!r}")
+
+    suggestions: list[dict] = [{
+        "id": product.get("id"),
+        "name": product.get("name"),
+        "url": f"/produkt/{product.get('id')}",
+        "thumbnail": url_for("internal.uploads", filename=product.get("thumbnail", "")),
+    } for product in suggest_products(query, limit)]
+    return jsonify({"suggestions": suggestions})
+
 #===========================
 # Cart API Routes
 #===========================
@@ -174,27 +235,12 @@ def calculate_cart():
         logger.error(f"CSRF validation failed | Error: {str(e)}")
         return str(e), 403
     
-    cart: dict  = session.get("cart", {})
+    cart: dict = cart_view(session.get("cart", {}))
     discount: dict = session.get("discount", {})
-    products = get_products()
 
-    total: float = 0
-    tax: float = 0
+    total: float = cart["total"]
+    tax: float = cart["tax"]
     discount_amount: float = 0
-
-    items = [
-        {
-            "price": product.get("new_price") if product.get("new_price", 0) > 0 else product.get("price", 0.0),
-            "tax_rate": product.get("tax", 0.0) / 100,
-            "quantity": quantity,
-            "total": (product.get("new_price") if product.get("new_price", 0) > 0 else product.get("price", 0.0)) * quantity
-        }
-        for product_id, quantity in cart.items()
-        if (product := get_product_by_id(str(product_id)))
-    ]          
-
-    total = sum(item["total"] for item in items)
-    tax = sum((item["total"] / (1 + item["tax_rate"])) * item["tax_rate"] for item in items)
     
 
     old_total: float = total
@@ -661,6 +707,29 @@ def markdown_to_html():
         return abort(403)
     return convert_markdown_to_html(request.json.get("data", ""))
 
+# This function hands out a CSRF token for the visitor's session, used by the
+# exported static pages, which carry none (static/js/csrf.js)
+@internal_blueprint.route("/api/csrf-token", methods=["GET"])
+def get_csrf_token():
+    response = jsonify({"csrf_token": generate_csrf()})
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+# This function exports the storefront as static files (see static_export.py)
+@internal_blueprint.route("/api/export-site/", methods=["POST"])
+def export_static_site():
+    logger.info("POST request received for exporting the storefront")
+    if not session.get("login", False):
+        logger.warning("Unauthorized static export attempt")
+        return abort(403)
+
+    try:
+        summary: dict = export_site(base_url=app.config.get("STATIC_EXPORT_BASE_URL") or request.host_url, full=request.args.get("full") == "1")
+    except Exception as e:
+        logger.error(f"Error exporting the storefront: {str(e)}")
+        return jsonify({"error": "Export failed"}), 500
+    return jsonify(summary)
+
 # This function clears the cache
 @internal_blueprint.route("/api/clear-cache/", methods=["POST"])
 def clear_cache():
@@ -669,15 +738,26 @@ def clear_cache():
         logger.warning("Unauthorized cache clear attempt")
         return abort(403)
     
-    get_products.cache_clear()
-    get_product_by_id.cache_clear()
-    get_settings.cache_clear()
-    get_coupon_by_id.cache_clear()
-    get_coupons.cache_clear()
+    settings_document.invalidate()
+    for collection in (product_collection, coupon_collection, order_collection, contact_collection, event_collection):
+        collection.invalidate()
+    product_query_cache.clear()
+    page_cache.clear()
+    fragment_cache.clear()
 
     logger.info("Cache cleared successfully")
     return jsonify({"sucess": "Cache cleared sucessfully!"})
 
+# This function reports the hit/miss counters of the result caches
+@internal_blueprint.route("/api/get-cache-stats/", methods=["GET"])
+def get_cache_stats():
+    logger.info("GET request received for getting cache stats")
+    if not session.get("login", False):
+        logger.warning("Unauthorized cache stats request attempt")
+        return abort(403)
+
+    return jsonify({"product_queries": product_query_cache.stats(), "pages": page_cache.stats(), "fragments": fragment_cache.stats()})
+
 # This function retrieves system information
 @internal_blueprint.route("/api/get-system-info/", methods=["GET"])
 def get_system_info():
@@ -1,4 +1,6 @@
 from flask import Blueprint, render_template
+
+from FlaskClass import cached_page
 from logging_utility import logger
 
 legal_blueprint = Blueprint("legal", __name__, url_prefix="/rechtliches")
@@ -9,17 +11,20 @@ legal_blueprint = Blueprint("legal", __name__, url_prefix="/rechtliches")
 
 # Route to retrieve the Impressum page
 @legal_blueprint.route("/impressum", methods=["GET"])
+@cached_page
 def impressum():
     logger.info("GET request received for the Impressum page.")
     return render_template("imprint.jinja-html")
 
 # Route to retrieve the AGB page
 @legal_blueprint.route("/agb", methods=["GET"])
+@cached_page
 def agb():
     logger.info("GET request received for the AGB page.")
     return render_template("agb.jinja-html")
 
 @legal_blueprint.route("/datenschutz", methods=["GET"])
+@cached_page
 def datenschutz():
     logger.info("GET request received for the Datenschutz page.")
     return render_template("privacy.jinja-html")
@@ -1,4 +1,6 @@
 from flask import Blueprint, render_template
+
+from FlaskClass import cached_page
 from logging_utility import logger
 
 other_blueprint = Blueprint("other", __name__)
@@ -9,6 +11,7 @@ other_blueprint = Blueprint("other", __name__)
 
 # Route to retrieve the "Über" (About) page
 @other_blueprint.route("/ueber", methods=["GET"])
+@cached_page
 def about():
     logger.info("GET request received for the Über page.")
     return render_template("about.jinja-html")
@@ -1,5 +1,7 @@
-from flask import abort, Blueprint, render_template
-from utility import get_product_by_id
+from flask import abort, Blueprint, render_template, request, url_for
+
+from FlaskClass import cached_page, conditional_page, product_version
+from utility import get_product_by_id, paginate_products, product_filters, product_page_params
 from logging_utility import logger
 
 product_blueprint = Blueprint("products", __name__, url_prefix="")
@@ -8,14 +10,23 @@ product_blueprint = Blueprint("products", __name__, url_prefix="")
 # Product Routes
 # =====================================
 
-# Route to retrieve all products
+# Route to retrieve all products, one page at a time (?page=, ?limit=). The
+# further pages are appended by products.js through /api/filter-products.
 @product_blueprint.route("/produkte", methods=["GET"])
+@conditional_page()
+@cached_page
 def products():
     logger.info("GET request received for all products.")
-    return render_template("products.jinja-html")
+    page, limit = product_page_params(request.args)
+    listing: dict = paginate_products(product_filters(request.args), page, limit)
+    if listing["next_page"] is not None:
+        listing["next_url"] = url_for("products.products", **{**request.args.to_dict(flat=False), "page": listing["next_page"]})
+    return render_template("products.jinja-html", listing=listing)
 
 # Route to retrieve a single product by ID
 @product_blueprint.route("/produkt/<string:product_id>", methods=["GET"])
+@conditional_page(product_version)
+@cached_page
 def product(product_id: int):
     logger.info(f"GET request received for product with ID: {product_id}")
     
@@ -91,6 +91,33 @@ async function clearCache() {
     }
 }
 
+async function exportSite() {
+    const csrfToken = document.getElementById("csrf_token").value;
+    const button = document.getElementById("export_site");
+    button.disabled = true;
+    try {
+        const response = await fetch("/api/export-site/", {
+            method: "POST",
+            headers: {
+                "X-CSRF-Token": csrfToken
+            }
+        });
+
+        if (!response.ok) {
+            throw new Error("Failed to export the shop!");
+        }
+
+        const summary = await response.json();
+        window.alert(`Export abgeschlossen: ${summary.rendered} Seiten erstellt, ${summary.unchanged} unverändert, ${summary.removed} entfernt.`);
+
+    } catch (error) {
+        console.error("Error exporting the shop:", error);
+        window.alert("Export fehlgeschlagen!");
+    } finally {
+        button.disabled = false;
+    }
+}
+
 // Update file name when selected
 const fileInputs = document.querySelectorAll('.file-input');
 fileInputs.forEach(input => {
@@ -0,0 +1,19 @@
+// Pages exported as static files carry no CSRF token, fetch one for this visitor's session
+document.addEventListener("DOMContentLoaded", async () => {
+    const inputs = Array.from(document.querySelectorAll('input[name="csrf_token"]')).filter(input => !input.value);
+    if (inputs.length === 0) {
+        return;
+    }
+
+    try {
+        const response = await fetch("/api/csrf-token", { credentials: "same-origin" });
+        if (!response.ok) {
+            throw new Error("Failed to fetch CSRF token");
+        }
+
+        const data = await response.json();
+        inputs.forEach(input => input.value = data.csrf_token);
+    } catch (error) {
+        console.error("Error fetching CSRF token:", error);
+    }
+});
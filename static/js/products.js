@@ -18,15 +18,253 @@ function searchProducts() {
 
 
     if (query === "") {
-        newUrl.search.delete("search");
+        newUrl.searchParams.delete("search");
     }
     else {
         newUrl.searchParams.set("search", query);
     }
+
+    // Only the admin product list has the regex switch
+    const regexToggle = document.getElementById("regex-toggle");
+    if (regexToggle && regexToggle.checked) {
+        newUrl.searchParams.set("regex", "1");
+    }
+    else {
+        newUrl.searchParams.delete("regex");
+    }
     window.location.href = newUrl.toString();
 }
 
 
+// Reads the facet inputs of the product page into URL parameters
+function facetParams() {
+    const params = new URLSearchParams(window.location.search);
+    ["category", "price_min", "price_max", "in_stock", "on_sale", "sort", "page"].forEach(name => params.delete(name));
+
+    document.querySelectorAll('#facet-filters input[name="category"]:checked').forEach(input => {
+        params.append("category", input.value);
+    });
+    const priceMin = document.getElementById("price-min").value.trim();
+    const priceMax = document.getElementById("price-max").value.trim();
+    if (priceMin !== "") {
+        params.set("price_min", priceMin);
+    }
+    if (priceMax !== "") {
+        params.set("price_max", priceMax);
+    }
+    if (document.getElementById("in-stock-filter").checked) {
+        params.set("in_stock", "1");
+    }
+    if (document.getElementById("on-sale-filter").checked) {
+        params.set("on_sale", "1");
+    }
+    const sort = document.getElementById("sort-options").value;
+    if (sort !== "default") {
+        params.set("sort", sort);
+    }
+    return params;
+}
+
+// Applies the facets without a reload: products and counts come from /api/filter-products
+async function applyFacets(updateProducts = true) {
+    const query = facetParams().toString();
+    window.history.replaceState(null, "", query ? `?${query}` : window.location.pathname);
+
+    try {
+        const response = await fetch(`/api/filter-products?${query}`);
+        if (!response.ok) {
+            throw new Error('Failed to filter products');
+        }
+
+        const data = await response.json();
+        if (updateProducts) {
+            renderProducts(data.products);
+            updateLoadMore(data.next_page);
+        }
+        renderFacetCounts(data.facets);
+    } catch (error) {
+        console.error('Error filtering products:', error);
+    }
+}
+
+function renderFacetCounts(facets) {
+    document.querySelectorAll("#facet-filters .facet-count[data-category]").forEach(count => {
+        count.textContent = `(${facets.categories[count.dataset.category] ?? 0})`;
+    });
+    document.getElementById("in-stock-count").textContent = `(${facets.in_stock})`;
+    document.getElementById("on-sale-count").textContent = `(${facets.on_sale})`;
+}
+
+// Same markup as the product cards in products.jinja-html
+function productCard(product) {
+    const card = document.createElement("div");
+    card.className = "product";
+    card.dataset.name = product.name;
+    card.dataset.price = product.effective_price;
+
+    const image = document.createElement("img");
+    image.src = product.thumbnail;
+    image.loading = "lazy";
+    image.alt = product.name;
+
+    const link = document.createElement("a");
+    link.href = product.url;
+    const title = document.createElement("h3");
+    title.textContent = product.name;
+    link.appendChild(title);
+
+    const prices = document.createElement("div");
+    prices.className = "price_heading";
+    const oldPrice = document.createElement("span");
+    oldPrice.className = "old-price";
+    oldPrice.textContent = `€${product.price_text}`;
+    prices.appendChild(oldPrice);
+    if (product.new_price_text) {
+        const newPrice = document.createElement("span");
+        newPrice.className = "new-price";
+        newPrice.textContent = `€${product.new_price_text}`;
+        prices.appendChild(newPrice);
+    }
+
+    const button = document.createElement("button");
+    button.innerHTML = '<span><i class="fa-solid fa-cart-plus"></i></span>';
+    button.addEventListener("click", () => addToCart(product.id));
+
+    const details = document.createElement("div");
+    details.className = "detail-box";
+    details.append(prices, button);
+
+    const taxNote = document.createElement("span");
+    taxNote.className = "tax-note";
+    taxNote.textContent = `inkl. ${product.tax}% USt.`;
+
+    card.append(image, link, details, taxNote);
+    return card;
+}
+
+// Replaces the product cards, or adds to them for the next page
+function renderProducts(products, append = false) {
+    const container = document.getElementById("products-container");
+    if (append) {
+        products.forEach(product => container.appendChild(productCard(product)));
+        return;
+    }
+    container.querySelectorAll(".product, .no-products").forEach(element => element.remove());
+
+    if (products.length === 0) {
+        const empty = document.createElement("div");
+        empty.className = "no-products";
+        empty.innerHTML = '<h3>Keine passenden Produkte gefunden!</h3><br><a href="/produkte">Zurück zur Produktübersicht</a>';
+        container.appendChild(empty);
+        return;
+    }
+    products.forEach(product => container.appendChild(productCard(product)));
+}
+
+function updateLoadMore(nextPage) {
+    const loadMore = document.getElementById("load-more");
+    const params = facetParams();
+    if (nextPage) {
+        params.set("page", nextPage);
+    }
+    loadMore.dataset.nextPage = nextPage ?? "";
+    loadMore.href = `?${params.toString()}`;
+    loadMore.hidden = !nextPage;
+}
+
+let loadingPage = false;
+
+// Infinite scroll: appends the next page of products from /api/filter-products
+async function loadNextPage() {
+    const loadMore = document.getElementById("load-more");
+    if (loadingPage || !loadMore.dataset.nextPage) {
+        return;
+    }
+
+    loadingPage = true;
+    const params = facetParams();
+    params.set("page", loadMore.dataset.nextPage);
+    try {
+        const response = await fetch(`/api/filter-products?${params.toString()}`);
+        if (!response.ok) {
+            throw new Error('Failed to load products');
+        }
+
+        const data = await response.json();
+        renderProducts(data.products, true);
+        updateLoadMore(data.next_page);
+    } catch (error) {
+        console.error('Error loading products:', error);
+        return;
+    } finally {
+        loadingPage = false;
+    }
+
+    // The observer only fires on changes, keep going while the link is still in view
+    if (!loadMore.hidden && loadMore.getBoundingClientRect().top < window.innerHeight + 400) {
+        loadNextPage();
+    }
+}
+
+// Fills the search field's suggestion list while typing; an older request
+// still running is cancelled, so a slow answer can't overwrite a newer one
+let suggestRequest = null;
+
+function suggestProducts() {
+    const input = document.getElementById("search-input");
+    const list = document.getElementById("search-suggestions");
+    const query = input.value;
+
+    if (suggestRequest) {
+        suggestRequest.abort();
+    }
+    if (query.trim() === "") {
+        list.replaceChildren();
+        return;
+    }
+    suggestRequest = new AbortController();
+    fetch(`/api/search/suggest?q=${encodeURIComponent(query)}`, { signal: suggestRequest.signal })
+        .then(response => response.json())
+        .then(data => {
+            list.replaceChildren(...data.suggestions.map(suggestion => {
+                const option = document.createElement("option");
+                option.value = suggestion.name;
+                return option;
+            }));
+        })
+        .catch(error => {
+            if (error.name !== "AbortError") {
+                console.error("Error fetching suggestions:", error);
+            }
+        });
+}
+
+
+// The product page is rendered with its first page, the counts and further pages come from the API
+document.addEventListener("DOMContentLoaded", () => {
+    if (document.getElementById("search-suggestions")) {
+        document.getElementById("search-input").addEventListener("input", suggestProducts);
+    }
+    if (!document.getElementById("facet-filters")) {
+        return;
+    }
+    applyFacets(false);
+
+    const loadMore = document.getElementById("load-more");
+    loadMore.addEventListener("click", event => {
+        event.preventDefault();
+        loadNextPage();
+    });
+    if ("IntersectionObserver" in window) {
+        new IntersectionObserver(entries => {
+            if (entries.some(entry => entry.isIntersecting)) {
+                loadNextPage();
+            }
+        }, { rootMargin: "400px" }).observe(loadMore);
+    }
+});
+
+
 function sortProducts() {
     let sortValue = document.getElementById("sort-options").value;
     let container = document.getElementById("products-container");
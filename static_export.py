@@ -0,0 +1,230 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from datetime import date
+from urllib.parse import quote, urlencode
+
+from flask import g, url_for
+
+from FlaskClass import app
+from logging_utility import logger
+from utility import get_settings, product_collection, thaw
+
+# =====================================
+# Static Storefront Export
+# =====================================
+
+# Renders the public pages into a directory a plain static file server can
+# serve to anonymous visitors, with the app behind it for everything else
+# (cart, checkout, admin, /api/). Pages are rendered like for a visitor without
+# a session. The CSRF token is taken out of them; static/js/csrf.js fetches one
+# from /api/csrf-token when an exported page is opened.
+#
+# Every export writes a manifest with a tag per page. The next export renders
+# only pages whose tag changed: a product page when its product did, the home
+# page and product lists when any product did, and everything when the
+# settings, the templates or the base URL did. Pages of deleted products are
+# removed. After changing Python code, export with full=True.
+
+# Bumped whenever the layout of the export changes
+EXPORT_FORMAT: str = "simple-store-export/1"
+MANIFEST_FILE: str = ".export-manifest.json"
+DEFAULT_EXPORT_DIR: str = os.path.join(os.path.dirname(os.path.abspath(__file__)), "export")
+# Copied as they are, relative to the app root
+ASSET_DIRS: tuple[str, ...] = ("static", "uploads")
+ASSET_FILES: tuple[str, ...] = ("robots.txt",)
+# Pages that don't show products
+STATIC_PAGES: tuple[str, ...] = ("/ueber", "/rechtliches/impressum", "/rechtliches/agb", "/rechtliches/datenschutz")
+
+_export_lock = threading.Lock()
+
+
+def _digest(*parts) -> str:
+    hasher = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        hasher.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        hasher.update(b"\0")
+    return hasher.hexdigest()
+
+
+def _record_digest(record: dict) -> str:
+    return _digest(json.dumps(thaw(record), sort_keys=True, ensure_ascii=False, default=str))
+
+
+# Everything every page is rendered from: settings, templates and base URL
+def _site_tag(base_url: str) -> str:
+    sources: list[bytes] = []
+    templates: str = os.path.join(app.root_path, "templates")
+    for root, directories, files in os.walk(templates):
+        directories.sort()
+        for name in sorted(files):
+            path: str = os.path.join(root, name)
+            with open(path, "rb") as file:
+                sources.append(os.path.relpath(path, templates).encode("utf-8") + b"\0" + file.read())
+    settings: str = json.dumps(thaw(get_settings() or {}), sort_keys=True, ensure_ascii=False, default=str)
+    return _digest(EXPORT_FORMAT, base_url, settings, *sources)
+
+
+# (URL, file in the export directory, tag) of every page to export
+def export_pages(base_url: str) -> list[tuple[str, str, str]]:
+    site: str = _site_tag(base_url)
+    snapshot = product_collection.snapshot()
+    products: dict[str, str] = {record_id: _record_digest(record) for record_id, record in snapshot.index.items()}
+    catalog: str = _digest(site, *(f"{record_id}:{digest}" for record_id, digest in products.items()))
+
+    pages: list[tuple[str, str, str]] = [("/", "index.html", catalog), ("/produkte", "produkte.html", catalog)]
+    # Category links are /produkte?category=..., a static file server finds them
+    # as <path>/<query string>.html (see README)
+    categories: dict[str, None] = dict.fromkeys(category for record in snapshot.index.values()
+                                                for category in record.get("categories") or ())
+    for category in categories:
+        query: str = urlencode({"category": category}, quote_via=quote)
+        pages.append((f"/produkte?{query}", f"produkte/{query}.html", catalog))
+    for record_id, digest in products.items():
+        pages.append((f"/produkt/{quote(record_id, safe='')}", f"produkt/{quote(record_id, safe='')}.html", _digest(site, digest)))
+    for page in STATIC_PAGES:
+        pages.append((page, f"{page.lstrip('/')}.html", site))
+    # Its lastmod is the export date
+    pages.append(("/sitemap.xml", "sitemap.xml", _digest(site, date.today().isoformat())))
+    return pages
+
+
+# The page as an anonymous visitor gets it, None if it isn't a 200
+def render_page(url: str, base_url: str) -> bytes | None:
+    path, _, query = url.partition("?")
+    with app.test_request_context(path, query_string=query, base_url=base_url):
+        response = app.full_dispatch_request()
+        if response.status_code != 200:
+            logger.warning(f"Static export skipped {url}: status {response.status_code}")
+            return None
+        response.direct_passthrough = False
+        body: bytes = response.get_data()
+        token: str | None = g.get("csrf_token")
+        if token and response.mimetype == "text/html":
+            script: str = f'<script src="{url_for("static", filename="js/csrf.js")}" defer></script>\n</head>'
+            body = body.replace(token.encode(), b"").replace(b"</head>", script.encode(), 1)
+        return body
+
+
+def _write(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    descriptor, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(descriptor, "wb") as file:
+            file.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def _remove(directory: str, file: str):
+    try:
+        os.remove(os.path.join(directory, file))
+    except FileNotFoundError:
+        pass
+
+
+# Copy the asset files that are missing or differ in size or modification time,
+# returns every asset (relative path) and how many were copied
+def _copy_assets(directory: str) -> tuple[list[str], int]:
+    assets: list[str] = [name for name in ASSET_FILES if os.path.isfile(os.path.join(app.root_path, name))]
+    for asset_dir in ASSET_DIRS:
+        for root, directories, files in os.walk(os.path.join(app.root_path, asset_dir)):
+            directories.sort()
+            assets.extend(os.path.relpath(os.path.join(root, name), app.root_path).replace(os.sep, "/") for name in sorted(files))
+
+    copied: int = 0
+    for asset in assets:
+        source: os.stat_result = os.stat(os.path.join(app.root_path, asset))
+        target: str = os.path.join(directory, asset)
+        try:
+            stat: os.stat_result | None = os.stat(target)
+        except FileNotFoundError:
+            stat = None
+        if stat is None or stat.st_size != source.st_size or stat.st_mtime_ns != source.st_mtime_ns:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            shutil.copy2(os.path.join(app.root_path, asset), target)
+            copied += 1
+    return assets, copied
+
+
+def _read_manifest(directory: str) -> dict:
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), "r", encoding="utf-8") as file:
+            manifest: dict = json.load(file)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    return manifest if manifest.get("format") == EXPORT_FORMAT else {}
+
+
+# Export the storefront into directory (default: STATIC_EXPORT_DIR in the server
+# config, else export/), with base_url for absolute links (default: the
+# SERVER_NAME the app runs under). full re-renders every page.
+def export_site(directory: str | None = None, base_url: str | None = None, full: bool = False) -> dict:
+    directory = os.path.abspath(directory or app.config.get("STATIC_EXPORT_DIR") or DEFAULT_EXPORT_DIR)
+    base_url = base_url or app.config.get("STATIC_EXPORT_BASE_URL") or f"https://{app.config.get('SERVER_NAME') or 'localhost'}/"
+    with _export_lock:
+        start: float = time.perf_counter()
+        logger.info(f"Static export into {directory} started (full: {full}).")
+        os.makedirs(directory, exist_ok=True)
+        previous: dict = _read_manifest(directory)
+        previous_pages: dict[str, dict] = previous.get("pages", {})
+
+        pages: dict[str, dict] = {}
+        rendered: int = 0
+        unchanged: int = 0
+        failed: list[str] = []
+        for url, file, tag in export_pages(base_url):
+            entry: dict | None = previous_pages.get(url)
+            if (not full and entry is not None and entry["file"] == file and entry["tag"] == tag
+                    and os.path.isfile(os.path.join(directory, file))):
+                pages[url] = entry
+                unchanged += 1
+                continue
+            try:
+                body: bytes | None = render_page(url, base_url)
+            except Exception as e:
+                logger.error(f"Static export failed for {url}: {e}")
+                body = None
+            if body is None:
+                failed.append(url)
+                # The last good export of the page stays, the next export tries again
+                if entry is not None:
+                    pages[url] = entry
+                continue
+            _write(os.path.join(directory, file), body)
+            pages[url] = {"file": file, "tag": tag}
+            rendered += 1
+
+        # Pages (and their files) that are gone, e.g. of deleted products
+        kept: set[str] = {entry["file"] for entry in pages.values()}
+        removed: int = 0
+        for url, entry in previous_pages.items():
+            if url not in pages and entry["file"] not in kept:
+                _remove(directory, entry["file"])
+                removed += 1
+
+        assets, copied = _copy_assets(directory)
+        for asset in set(previous.get("assets", ())) - set(assets):
+            _remove(directory, asset)
+
+        manifest: dict = {"format": EXPORT_FORMAT, "base_url": base_url, "exported": time.time(), "pages": pages, "assets": assets}
+        _write(os.path.join(directory, MANIFEST_FILE), json.dumps(manifest, indent=4, ensure_ascii=False).encode("utf-8"))
+
+        summary: dict = {
+            "directory": directory,
+            "pages": len(pages),
+            "rendered": rendered,
+            "unchanged": unchanged,
+            "removed": removed,
+            "failed": failed,
+            "assets_copied": copied,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+        logger.info(f"Static export finished: {summary}")
+        return summary
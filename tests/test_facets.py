@@ -0,0 +1,37 @@
+from utility.facets import FacetIndex
+from utility.pricing import PricingIndex
+from utility.records import freeze
+
+
+def make_products() -> tuple:
+    return tuple(freeze(product) for product in (
+        {"id": "1", "price": 100.0, "new_price": 80.0, "amount": 1, "categories": ["Golfbälle"]},
+        {"id": "2", "price": 50.0, "new_price": "0.0", "amount": 1, "categories": ["Golfbälle"]},
+        {"id": "3", "price": 90.0, "new_price": -1, "amount": 1, "categories": ["Golfbälle"]},
+    ))
+
+
+# Filters take on sale and the effective price from Pricing, the same the
+# product cards show
+def test_facets_follow_pricing():
+    products: tuple = make_products()
+    facets: FacetIndex = FacetIndex.build(products, PricingIndex.build(products))
+
+    rows, counts = facets.select(on_sale=True)
+    assert facets.ids_of(rows) == ["1"]
+    assert counts["on_sale"] == 1
+    rows, _ = facets.select(price_min=60, price_max=85)
+    assert facets.ids_of(rows) == ["1"]
+
+
+def test_updated_facets_use_the_new_pricing():
+    products: tuple = make_products()
+    pricing: PricingIndex = PricingIndex.build(products)
+    facets: FacetIndex = FacetIndex.build(products, pricing)
+
+    changed: list = [freeze({**products[1], "new_price": 10.0})]
+    records: tuple = (products[0], changed[0], products[2])
+    facets = facets.updated(records, [products[1]], changed, pricing.updated(records, [products[1]], changed))
+
+    rows, _ = facets.select(on_sale=True)
+    assert facets.ids_of(rows) == ["1", "2"]
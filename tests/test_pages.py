@@ -0,0 +1,71 @@
+import os
+import shutil
+
+import pytest
+
+from utility.storage import JsonStorage, set_storage
+
+ROOT: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+# The app on a copy of data/, so writes don't touch the real files
+@pytest.fixture
+def client(tmp_path):
+    data_dir: str = str(tmp_path / "data")
+    shutil.copytree(os.path.join(ROOT, "data"), data_dir)
+    storage = JsonStorage(data_dir)
+    storage.binary_snapshots = False
+    set_storage(storage)
+
+    from main import app
+    from FlaskClass import page_cache
+    from utility import product_collection, settings_document
+    product_collection.invalidate()
+    settings_document.invalidate()
+    page_cache.clear()
+    return app.test_client()
+
+
+def page_cache_hits() -> int:
+    from FlaskClass import page_cache
+    return page_cache.stats()["hits"]
+
+
+# Anonymous visitors get the cached page until a product write publishes a new
+# catalog version
+def test_product_write_invalidates_cached_pages(client):
+    from utility import modify_product, product_collection
+
+    product_id: str = str(product_collection.load()[0]["id"])
+    first: str = client.get(f"/produkt/{product_id}").get_data(as_text=True)
+    hits: int = page_cache_hits()
+    assert client.get(f"/produkt/{product_id}").get_data(as_text=True) == first
+    assert page_cache_hits() == hits + 1
+
+    modify_product(product_id, {"name": "Driver Testname"})
+
+    assert "Driver Testname" in client.get(f"/produkt/{product_id}").get_data(as_text=True)
+    assert page_cache_hits() == hits + 1
+    assert "Driver Testname" in client.get("/produkte").get_data(as_text=True)
+
+
+def test_template_edit_invalidates_cached_pages(client):
+    from main import app
+
+    client.get("/rechtliches/impressum")
+    hits: int = page_cache_hits()
+    app.templates_changed("imprint.jinja-html")
+    client.get("/rechtliches/impressum")
+    assert page_cache_hits() == hits
+    client.get("/rechtliches/impressum")
+    assert page_cache_hits() == hits + 1
+
+
+# A cart makes the page personal, it is never served from or stored in the cache
+def test_visitors_with_a_cart_bypass_the_page_cache(client):
+    client.get("/ueber")
+    hits: int = page_cache_hits()
+    with client.session_transaction() as session:
+        session["cart"] = {"1": 1}
+    client.get("/ueber")
+    assert page_cache_hits() == hits
@@ -0,0 +1,156 @@
+from utility.pricing import PricingIndex
+from utility.records import freeze
+from utility.search import FEATURED, IN_STOCK, ListingIndex, SearchIndex, SortIndex, SuggestIndex
+
+
+def make_products() -> tuple:
+    return tuple(freeze(product) for product in (
+        {"id": "1", "price": 100.0, "new_price": 80.0},
+        {"id": "2", "price": 50.0, "new_price": "0.0"},
+        {"id": "3", "price": 90.0, "new_price": -1},
+    ))
+
+
+# Sorting by price takes the effective price from Pricing, the same the
+# product cards show
+def test_price_ordering_follows_pricing():
+    products: tuple = make_products()
+    sort_index: SortIndex = SortIndex.build(products, PricingIndex.build(products))
+
+    assert [product["id"] for product in sort_index.sort("effective_price")] == ["2", "1", "3"]
+
+
+def test_updated_price_ordering_uses_the_new_pricing():
+    products: tuple = make_products()
+    pricing: PricingIndex = PricingIndex.build(products)
+    sort_index: SortIndex = SortIndex.build(products, pricing)
+    sort_index.ordering("effective_price")
+
+    changed: list = [freeze({**products[1], "new_price": 10.0})]
+    records: tuple = (products[0], changed[0], products[2])
+    sort_index = sort_index.updated(records, [products[1]], changed, pricing.updated(records, [products[1]], changed))
+
+    assert [product["id"] for product in sort_index.sort("effective_price")] == ["2", "1", "3"]
+    assert [product["id"] for product in sort_index.sort("effective_price", ascending=False)] == ["3", "1", "2"]
+
+
+# Small results are put in order by their positions, large ones picked out of
+# the presorted order; both keep products without a price last
+def test_filtered_sort_is_the_same_for_small_and_large_results():
+    products: tuple = tuple(freeze({"id": str(i), "price": float(i * 37 % 20) if i % 4 else None}) for i in range(40))
+    sort_index: SortIndex = SortIndex.build(products, PricingIndex.build(products))
+
+    for record_ids in (["3", "9", "4"], [str(i) for i in range(0, 40, 2)]):
+        chosen: list = [product for product in products if product["id"] in record_ids]
+        priced: list = sorted((product for product in chosen if product["price"] is not None), key=lambda product: (product["price"], int(product["id"])))
+        missing: list = [product for product in chosen if product["price"] is None]
+
+        assert sort_index.sort("price", record_ids) == priced + missing
+        assert sort_index.sort("price", record_ids, ascending=False) == priced[::-1] + missing
+
+
+def make_catalog() -> tuple:
+    return tuple(freeze(product) for product in (
+        {"id": "1", "name": "Mizuno Golfschläger", "keyword": "golf"},
+        {"id": "2", "name": "Titleist Schläger", "keyword": "golf"},
+        {"id": "3", "name": "Schlaegerhülle", "keyword": "tasche"},
+        {"id": "4", "name": "Titleist Putter", "keyword": "golf putter"},
+    ))
+
+
+# Whole words rank before word starts before words containing the term, the
+# umlauts are found however they are typed
+def test_search_ranks_exact_prefix_and_infix_matches():
+    index: SearchIndex = SearchIndex.build(make_catalog())
+
+    for query in ("schlaeger", "Schläger", "SCHLÄGER"):
+        assert index.search(query) == ["2", "3", "1"]
+    assert index.search("titleist golf") == ["2", "4"]
+    assert index.search("lfschl") == ["1"]
+    assert index.search("putter 9") == []
+
+
+def test_search_limit_keeps_the_ranking():
+    index: SearchIndex = SearchIndex.build(make_catalog())
+
+    for query in ("golf", "schlaeger", "titleist golf", "tit"):
+        ranked: list[str] = index.search(query)
+        for limit in range(1, len(ranked) + 1):
+            assert index.search(query, limit) == ranked[:limit]
+
+
+def test_updated_search_index_finds_new_words_inside_tokens():
+    products: tuple = make_catalog()
+    index: SearchIndex = SearchIndex.build(products)
+
+    changed: list = [freeze({**products[3], "name": "Titleist Golfhandschuh", "keyword": "golf"})]
+    records: tuple = (*products[:3], changed[0])
+    index = index.updated(records, [products[3]], changed)
+
+    assert index.search("handschuh") == ["4"]
+    assert index.search("putter") == []
+    assert index.search("titleist golf", 1) == ["2"]
+
+
+def make_listed_products() -> tuple:
+    return tuple(freeze(product) for product in (
+        {"id": "1", "categories": ["Golfbälle"], "featured": True, "amount": 3},
+        {"id": "2", "categories": ["Golfschläger"], "amount": 0},
+        {"id": "3", "categories": ["Golfbälle", "Zubehör"], "featured": True, "amount": 0},
+        {"id": "4", "categories": ["Golfbälle"], "amount": "5"},
+    ))
+
+
+# Lists and their intersections keep the catalog order, candidates keep theirs
+def test_listing_ids_intersect_in_catalog_order():
+    listing: ListingIndex = ListingIndex.build(make_listed_products())
+
+    assert listing.ids([("category", "Golfbälle")]) == ["1", "3", "4"]
+    assert listing.ids([("category", "Golfbälle"), IN_STOCK]) == ["1", "4"]
+    assert listing.ids([FEATURED, ("category", "Golfbälle")]) == ["1", "3"]
+    assert listing.ids([("category", "Putter")]) == []
+    assert listing.ids([IN_STOCK], ["4", "2", "1"]) == ["4", "1"]
+
+
+# A write batch moves IDs between lists in place, the result is the same as a
+# listing built from the new records
+def test_updated_listing_matches_a_rebuilt_one():
+    products: tuple = make_listed_products()
+    listing: ListingIndex = ListingIndex.build(products)
+
+    changed: dict = freeze({**products[1], "categories": ["Golfbälle"], "amount": 2})
+    added: dict = freeze({"id": "5", "categories": ["Zubehör"], "featured": True, "amount": 1})
+    records: tuple = (products[0], changed, products[3], added)
+    listing = listing.updated(records, [products[1], products[2]], [changed, added])
+
+    assert listing.lists == ListingIndex.build(records).lists
+    assert listing.ids([("category", "Golfbälle"), IN_STOCK]) == ["1", "2", "4"]
+    assert listing.ids([FEATURED]) == ["1", "5"]
+
+
+# Names matching from their first word come before names matching from a later
+# word, then keywords; a finished word only matches whole words
+def test_suggest_ranks_name_starts_before_later_words_and_keywords():
+    index: SuggestIndex = SuggestIndex.build(make_catalog())
+
+    for query in ("schlaeger", "Schläger", "SCHLÄG"):
+        assert index.suggest(query) == ["3", "2"]
+    assert index.suggest("schlaeger ") == ["2"]
+    assert index.suggest("golf") == ["1", "2", "4"]
+    assert index.suggest("golf", 1) == ["1"]
+    assert index.suggest("titleist p") == ["4"]
+    assert index.suggest("  ") == []
+
+
+def test_updated_suggest_index_matches_a_rebuilt_one():
+    products: tuple = make_catalog()
+    index: SuggestIndex = SuggestIndex.build(products)
+    index.suggest("golf")
+
+    changed: list = [freeze({**products[3], "name": "Titleist Golfhandschuh", "keyword": "handschuh"})]
+    records: tuple = (*products[:3], changed[0])
+    index = index.updated(records, [products[3]], changed)
+
+    assert {name: entries for name, entries in index.buckets.items() if entries} == SuggestIndex.build(records)._built()
+    assert index.suggest("golfh") == ["4"]
+    assert index.suggest("putter") == []
@@ -0,0 +1,257 @@
+import json
+import multiprocessing
+import os
+import threading
+import time
+
+from utility import collection
+from utility.collection import Collection
+from utility.records import compact_record_type
+from utility.storage import COMPACT_FIELDS, JournalStorage, JsonStorage, SqliteStorage, import_json_data, set_storage
+
+
+def make_product(index: int) -> dict:
+    return {
+        "id": str(index),
+        "name": f"Mizuno Driver ST-G {index}",
+        "price": 599.99,
+        "new_price": 0.0,
+        "tax": 20.0,
+        "categories": ["Golfschläger"],
+        "description": f"<p>Driver {index}</p>",
+        "raw_description": f"Driver {index}",
+        "images": [f"products/{index}/1.webp", f"products/{index}/2.webp"],
+    }
+
+
+def write_data_dir(data_dir: str, records: list[dict], collection: str = "products"):
+    os.makedirs(data_dir, exist_ok=True)
+    with open(os.path.join(data_dir, f"{collection}.json"), "w", encoding="utf-8") as file:
+        json.dump(records, file, ensure_ascii=False)
+
+
+# The binary snapshot of the JSON backend keeps the heavy product fields in a
+# side file, the import has to carry them over all the same
+def test_import_into_sqlite_keeps_full_records(tmp_path):
+    data_dir: str = str(tmp_path / "data")
+    products: list[dict] = [make_product(index) for index in range(5)]
+    write_data_dir(data_dir, products)
+    # Writes the binary snapshot with the side file
+    JsonStorage(data_dir).load("products")
+
+    target = SqliteStorage(str(tmp_path / "store.sqlite3"))
+    imported: dict[str, int] = import_json_data(target, data_dir)
+
+    assert imported == {"products": 5}
+    assert target.load("products") == products
+
+
+def test_sqlite_stores_lazy_and_compact_records_in_full(tmp_path):
+    data_dir: str = str(tmp_path / "data")
+    products: list[dict] = [make_product(index) for index in range(3)]
+    write_data_dir(data_dir, products)
+    lazy_records: list[dict] = JsonStorage(data_dir).load("products")
+    compact_type = compact_record_type(COMPACT_FIELDS["products"])
+
+    target = SqliteStorage(str(tmp_path / "store.sqlite3"))
+    target.replace("products", lazy_records[:2])
+    target.insert("products", compact_type(lazy_records[2]))
+
+    assert target.load("products") == products
+
+
+# Collections reload when their signature changes, writes to orders must not
+# make the catalog reload
+def test_sqlite_signature_only_changes_with_its_collection(tmp_path):
+    storage = SqliteStorage(str(tmp_path / "store.sqlite3"))
+    storage.replace("products", [make_product(1)])
+    products: tuple = storage.signature("products")
+
+    storage.insert("orders", {"id": "1", "items": []})
+    storage.update("orders", "1", {"status": "done"})
+    storage.delete("orders", "1")
+    storage.apply("orders", [("insert", {"id": "2", "items": []})], [])
+    assert storage.signature("products") == products
+
+    storage.update("products", "1", {"name": "Mizuno Driver ST-Z"})
+    assert storage.signature("products") != products
+    assert storage.signature("products") == SqliteStorage(storage.path).signature("products")
+
+
+# A replace while a compaction folds the journal waits for it, the compaction
+# must not publish its older snapshot afterwards
+def test_journal_replace_waits_for_compaction(tmp_path, monkeypatch):
+    data_dir: str = str(tmp_path / "data")
+    write_data_dir(data_dir, [], "orders")
+    storage = JournalStorage(data_dir, ["orders"], max_bytes=1 << 20)
+    storage.binary_snapshots = False
+    storage.insert("orders", {"id": "1", "items": []})
+
+    replay = JournalStorage._replay
+    replacing: list[threading.Thread] = []
+
+    def slow_replay(records: list[dict], data: bytes) -> list[dict]:
+        if not replacing:
+            replacing.append(threading.Thread(target=storage.replace, args=("orders", [{"id": "2", "items": []}])))
+            replacing[0].start()
+            time.sleep(0.2)
+        return replay(records, data)
+
+    monkeypatch.setattr(JournalStorage, "_replay", staticmethod(slow_replay))
+    storage.compact("orders")
+    replacing[0].join()
+
+    assert storage.load("orders") == [{"id": "2", "items": []}]
+    assert sorted(name for name in os.listdir(data_dir) if not name.endswith(".lock")) == ["orders.json"]
+
+
+def record_ids(records: list[dict]) -> list[str]:
+    return [record["id"] for record in records]
+
+
+# Two processes append to the same journal: one compacts while the other still
+# has the old journal open, the other's next record must not go to that file
+def test_journal_append_follows_rotation_by_another_process(tmp_path):
+    data_dir: str = str(tmp_path / "data")
+    write_data_dir(data_dir, [], "orders")
+    first = JournalStorage(data_dir, ["orders"])
+    second = JournalStorage(data_dir, ["orders"])
+
+    first.insert("orders", {"id": "1", "items": []})
+    second.insert("orders", {"id": "2", "items": []})
+    first.compact("orders")
+    second.insert("orders", {"id": "3", "items": []})
+
+    assert record_ids(JournalStorage(data_dir, ["orders"]).load("orders")) == ["1", "2", "3"]
+    assert second.delete("orders", "1")
+    assert record_ids(first.load("orders")) == ["2", "3"]
+
+
+# A crash in the middle of an append leaves a partial last line: loads skip
+# it, the next append cuts it off before writing
+def test_journal_replays_after_crash_mid_write(tmp_path):
+    data_dir: str = str(tmp_path / "data")
+    write_data_dir(data_dir, [{"id": "1", "items": []}], "orders")
+    with open(os.path.join(data_dir, "orders.journal"), "w", encoding="utf-8") as file:
+        file.write(json.dumps({"op": "insert", "record": {"id": "2", "items": []}}) + "\n")
+        file.write(json.dumps({"op": "update", "id": "1", "data": {"status": "done"}}) + "\n")
+        file.write('{"op": "insert", "record": {"id": "3", "it')
+
+    storage = JournalStorage(data_dir, ["orders"])
+    assert storage.load("orders") == [{"id": "1", "items": [], "status": "done"}, {"id": "2", "items": []}]
+
+    storage.insert("orders", {"id": "4", "items": []})
+    assert record_ids(JournalStorage(data_dir, ["orders"]).load("orders")) == ["1", "2", "4"]
+
+
+# Writers in two processes while both keep compacting: every record is stored once
+def test_journal_concurrent_compaction_keeps_every_record(tmp_path):
+    data_dir: str = str(tmp_path / "data")
+    write_data_dir(data_dir, [], "orders")
+    storages: list[JournalStorage] = [JournalStorage(data_dir, ["orders"], max_bytes=512) for _ in range(2)]
+    for storage in storages:
+        storage.binary_snapshots = False
+
+    def write(number: int):
+        storage: JournalStorage = storages[number % 2]
+        for index in range(40):
+            storage.insert("orders", {"id": f"{number}-{index}", "items": []})
+            if index % 10 == 0:
+                storage.compact("orders")
+
+    writers: list[threading.Thread] = [threading.Thread(target=write, args=(number,)) for number in range(4)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+
+    expected: list[str] = sorted(f"{number}-{index}" for number in range(4) for index in range(40))
+    assert sorted(record_ids(JournalStorage(data_dir, ["orders"]).load("orders"))) == expected
+
+
+def insert_orders(data_dir: str, prefix: str, count: int):
+    storage = JsonStorage(data_dir)
+    storage.binary_snapshots = False
+    set_storage(storage)
+    orders = Collection("orders")
+    for index in range(count):
+        orders.insert({"id": f"{prefix}-{index}", "items": []})
+
+
+# Worker processes writing the same JSON file: each batch starts from the
+# file as the others left it, no write is overwritten
+def test_json_collection_writes_from_several_processes(tmp_path):
+    data_dir: str = str(tmp_path / "data")
+    write_data_dir(data_dir, [], "orders")
+    context = multiprocessing.get_context("spawn")
+    workers: list = [context.Process(target=insert_orders, args=(data_dir, str(number), 20)) for number in range(3)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    expected: list[str] = sorted(f"{number}-{index}" for number in range(3) for index in range(20))
+    assert sorted(record_ids(JsonStorage(data_dir).load("orders"))) == expected
+
+
+# Write batches change only the chunks they touch; with small chunks, inserts,
+# updates (also of the ID) and deletes end up the same as on a plain list
+def test_collection_record_chunks_follow_every_write(tmp_path, monkeypatch):
+    monkeypatch.setattr(collection, "RECORD_CHUNK", 4)
+    data_dir: str = str(tmp_path / "data")
+    write_data_dir(data_dir, [{"id": str(index), "count": 0} for index in range(10)], "orders")
+    set_storage(JournalStorage(data_dir, ["orders"]))
+    orders = Collection("orders")
+    expected: list[dict] = [{"id": str(index), "count": 0} for index in range(10)]
+
+    for step in range(60):
+        record_id: str = str(step * 7 % 25)
+        if step % 5 == 3:
+            orders.delete(record_id, durable=False)
+            expected = [record for record in expected if record["id"] != record_id]
+        elif step % 7 == 4 and any(record["id"] == record_id for record in expected):
+            orders.update(record_id, {"id": f"{record_id}-moved"}, durable=False)
+            next(record for record in expected if record["id"] == record_id)["id"] = f"{record_id}-moved"
+        elif any(record["id"] == record_id for record in expected):
+            orders.update(record_id, {"count": step}, durable=False)
+            next(record for record in expected if record["id"] == record_id)["count"] = step
+        else:
+            orders.insert({"id": record_id, "count": step}, durable=False)
+            expected.append({"id": record_id, "count": step})
+        if step % 4 == 0:
+            orders.flush()
+            assert list(orders.snapshot().records) == expected
+    orders.flush()
+
+    assert list(orders.snapshot().records) == expected
+    assert all(orders.get(record["id"]) == record for record in expected)
+    assert JournalStorage(data_dir, ["orders"]).load("orders") == expected
+
+
+# Updates given as a function see the record as the batches before them left
+# it: concurrent decrements never spend the same use twice
+def test_collection_update_function_counts_down_without_lost_updates(tmp_path):
+    data_dir: str = str(tmp_path / "data")
+    write_data_dir(data_dir, [{"id": "golf10", "uses_remaining": 100}], "coupons")
+    set_storage(JournalStorage(data_dir, ["coupons"]))
+    coupons = Collection("coupons")
+    taken: list[bool] = []
+
+    def take_use(coupon: dict) -> dict | None:
+        if coupon["uses_remaining"] <= 0:
+            return None
+        return {"uses_remaining": coupon["uses_remaining"] - 1}
+
+    def take_uses():
+        for _ in range(30):
+            taken.append(coupons.update("golf10", take_use))
+
+    threads: list[threading.Thread] = [threading.Thread(target=take_uses) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert taken.count(True) == 100
+    assert coupons.get("golf10")["uses_remaining"] == 0
+    assert JournalStorage(data_dir, ["coupons"]).load("coupons") == [{"id": "golf10", "uses_remaining": 0}]
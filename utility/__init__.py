@@ -1,3 +1,10 @@
+from .records import *
+from .storage import *
+from .collection import *
+from .search import *
+from .facets import *
+from .pricing import *
+from .fragments import *
 from .data_managment import *
 from .calendar import *
 from .file_util import *
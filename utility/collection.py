@@ -0,0 +1,668 @@
+import atexit
+import itertools
+import json
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Sequence
+from types import MappingProxyType
+from typing import Any, Callable
+
+from logging_utility import logger
+from .records import FrozenRecord, compact_record_type, freeze, full_record
+from .storage import COMPACT_FIELDS, get_storage, file_signature
+
+# =====================================
+# In-Memory Collections
+# =====================================
+
+# Records per chunk of a RecordList
+RECORD_CHUNK: int = 512
+
+
+# The records of a snapshot in chunks of RECORD_CHUNK, with the position of
+# every ID (the first record wins if an ID appears twice). Snapshots share the
+# chunks they have in common: a write batch copies the list of chunks and only
+# the chunks it changes, inserts fill up the last one. The positions are a base
+# dict, also shared, plus the IDs inserted since; those are merged into a new
+# base once there are more than a chunk of them. So publishing an insert or an
+# update costs about the chunk size, not the collection size.
+class RecordList(Sequence):
+    __slots__ = ("chunks", "length", "positions", "inserted")
+
+    def __init__(self, chunks: tuple[tuple, ...], length: int, positions: dict[str, int], inserted: dict[str, int]):
+        self.chunks = chunks
+        self.length = length
+        self.positions = positions
+        self.inserted = inserted
+
+    def __repr__(self):
+        return f"<RecordList {self.length} records in {len(self.chunks)} chunks>"
+
+    @classmethod
+    def build(cls, records) -> "RecordList":
+        records = tuple(records)
+        positions: dict[str, int] = {}
+        for position, record in enumerate(records):
+            positions.setdefault(str(record.get("id")), position)
+        chunks: tuple = tuple(records[start:start + RECORD_CHUNK] for start in range(0, len(records), RECORD_CHUNK))
+        return cls(chunks, len(records), positions, {})
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self):
+        return itertools.chain.from_iterable(self.chunks)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return tuple(self)[position]
+        if position < 0:
+            position += self.length
+        if not 0 <= position < self.length:
+            raise IndexError("record position out of range")
+        return self.chunks[position // RECORD_CHUNK][position % RECORD_CHUNK]
+
+    def position(self, record_id: str) -> int | None:
+        position: int | None = self.inserted.get(record_id)
+        return self.positions.get(record_id) if position is None else position
+
+    def get(self, record_id: str) -> FrozenRecord | None:
+        position: int | None = self.position(record_id)
+        return None if position is None else self[position]
+
+
+# Working copy of a RecordList for one write batch. A delete, or an update that
+# changes an ID, moves positions: from then on the batch works on a flat list
+# and builds all positions again, like before chunks.
+class _RecordBatch:
+    def __init__(self, records: RecordList):
+        self.records = records
+        self.chunks: list = list(records.chunks)
+        # Numbers of the chunks copied into lists
+        self.copied: set[int] = set()
+        self.length: int = records.length
+        self.inserted: dict[str, int] = dict(records.inserted)
+        self.flat: list | None = None
+        self.positions: dict[str, int] = {}
+
+    def position(self, record_id: str) -> int | None:
+        if self.flat is not None:
+            return self.positions.get(record_id)
+        position: int | None = self.inserted.get(record_id)
+        return self.records.positions.get(record_id) if position is None else position
+
+    def get(self, record_id: str) -> FrozenRecord | None:
+        position: int | None = self.position(record_id)
+        if position is None:
+            return None
+        if self.flat is not None:
+            return self.flat[position]
+        return self.chunks[position // RECORD_CHUNK][position % RECORD_CHUNK]
+
+    def _chunk(self, number: int) -> list:
+        if number not in self.copied:
+            self.chunks[number] = list(self.chunks[number])
+            self.copied.add(number)
+        return self.chunks[number]
+
+    def append(self, record: FrozenRecord):
+        record_id: str = str(record.get("id"))
+        if self.flat is not None:
+            self.positions.setdefault(record_id, len(self.flat))
+            self.flat.append(record)
+            return
+        if self.position(record_id) is None:
+            self.inserted[record_id] = self.length
+        if self.length % RECORD_CHUNK == 0:
+            self.chunks.append([record])
+            self.copied.add(len(self.chunks) - 1)
+        else:
+            self._chunk(len(self.chunks) - 1).append(record)
+        self.length += 1
+
+    # Put record in the place of the one with record_id
+    def replace(self, record_id: str, record: FrozenRecord):
+        position: int = self.position(record_id)
+        if self.flat is not None:
+            self.flat[position] = record
+        else:
+            self._chunk(position // RECORD_CHUNK)[position % RECORD_CHUNK] = record
+        if str(record.get("id")) != record_id:
+            self._flatten()
+
+    # Remove every record with record_id, returns them
+    def delete(self, record_id: str) -> list[FrozenRecord]:
+        self._flatten()
+        removed: list[FrozenRecord] = [record for record in self.flat if str(record.get("id")) == record_id]
+        self.flat = [record for record in self.flat if str(record.get("id")) != record_id]
+        self._flatten()
+        return removed
+
+    def _flatten(self):
+        if self.flat is None:
+            self.flat = list(itertools.chain.from_iterable(self.chunks))
+        self.positions = {}
+        for position, record in enumerate(self.flat):
+            self.positions.setdefault(str(record.get("id")), position)
+
+    def result(self) -> RecordList:
+        if self.flat is not None:
+            return RecordList.build(self.flat)
+        chunks: tuple = tuple(tuple(chunk) if number in self.copied else chunk for number, chunk in enumerate(self.chunks))
+        positions: dict[str, int] = self.records.positions
+        inserted: dict[str, int] = self.inserted
+        if len(inserted) > RECORD_CHUNK:
+            positions, inserted = {**positions, **inserted}, {}
+        return RecordList(chunks, self.length, positions, inserted)
+
+
+# One published state of a collection. It never changes after publishing, so
+# readers use it without locks; a write publishes a new one with a higher
+# version, which downstream caches can key on. indexes holds the secondary
+# indexes registered on the collection, built for exactly these records.
+# Look single records up through record_list.get(). records (a tuple) and
+# index (ID -> record) are made from record_list on first use, so a write batch
+# doesn't pay for them.
+class Snapshot:
+    __slots__ = ("record_list", "indexes", "version", "_records", "_index")
+
+    def __init__(self, record_list: RecordList, indexes: dict[str, "SnapshotIndex"], version: int):
+        self.record_list: RecordList = record_list
+        self.indexes: MappingProxyType = MappingProxyType(indexes)
+        self.version: int = version
+        self._records: tuple[FrozenRecord, ...] | None = None
+        self._index: MappingProxyType | None = None
+
+    def __repr__(self):
+        return f"<Snapshot version={self.version}, {len(self.record_list)} records>"
+
+    @property
+    def records(self) -> tuple[FrozenRecord, ...]:
+        if self._records is None:
+            self._records = tuple(self.record_list)
+        return self._records
+
+    @property
+    def index(self) -> MappingProxyType:
+        if self._index is None:
+            self._index = MappingProxyType(Collection._build_index(self.record_list))
+        return self._index
+
+
+# Extension point for secondary indexes (full-text search, ...) kept next to
+# every snapshot. build() creates one for freshly loaded records, updated()
+# the one for the snapshot after a write batch, from the records the batch
+# removed and added. records is a sequence (a tuple or the snapshot's
+# RecordList), iterate it instead of copying it. Both return a new object, the old one stays untouched
+# because older snapshots still use it. An index that derives from other
+# indexes of the same snapshot names them in uses; they get passed to build()
+# and updated() as keyword arguments and have to be registered before it.
+class SnapshotIndex:
+    uses: tuple[str, ...] = ()
+
+    @classmethod
+    def build(cls, records: tuple, **indexes) -> "SnapshotIndex":
+        raise NotImplementedError
+
+    def updated(self, records: tuple, removed: list, added: list, **indexes) -> "SnapshotIndex":
+        return self.build(records, **indexes)
+
+
+_revisions = itertools.count(1)
+
+
+# Revision of every record, a number no other record version in this process
+# gets (reloads included). Caches outside the snapshots, like rendered
+# fragments, can key on (ID, revision) and never find a changed record's old
+# output under its new key.
+class RevisionIndex(SnapshotIndex):
+    def __init__(self, revisions: dict[str, int]):
+        self.revisions = revisions
+
+    def __repr__(self):
+        return f"<RevisionIndex {len(self.revisions)} records>"
+
+    @classmethod
+    def build(cls, records: tuple) -> "RevisionIndex":
+        revisions: dict[str, int] = {}
+        for record in records:
+            # The first record wins if an ID appears twice, like the ID index
+            record_id: str = str(record.get("id"))
+            if record_id not in revisions:
+                revisions[record_id] = next(_revisions)
+        return cls(revisions)
+
+    def updated(self, records: tuple, removed: list, added: list) -> "RevisionIndex":
+        revisions: dict[str, int] = dict(self.revisions)
+        for record in removed:
+            revisions.pop(str(record.get("id")), None)
+        for record in added:
+            record_id: str = str(record.get("id"))
+            if record_id not in revisions:
+                revisions[record_id] = next(_revisions)
+        return RevisionIndex(revisions)
+
+    def get(self, record_id: str) -> int | None:
+        return self.revisions.get(str(record_id))
+
+
+# One queued mutation. applied is set once the in-memory copy has it, durable
+# once the batch it belongs to was written to storage.
+class _Write:
+    def __init__(self, op: tuple):
+        self.op = op
+        self.result: bool = True
+        self.error: Exception | None = None
+        self.store_error: Exception | None = None
+        self.applied = threading.Event()
+        self.durable = threading.Event()
+
+
+# Cached copy of one storage collection, published as immutable snapshots with
+# an ID -> record index next to the records, so lookups stay O(1).
+#
+# Other processes (more workers, an operator editing the files) are noticed by
+# comparing the storage signature at most every check_interval seconds, so the
+# hot path stays a time comparison and only the changed collection is reloaded.
+#
+# Inserts, updates and deletes are queued to one writer thread per collection.
+# It collects everything arriving within the storage batch_window, builds the
+# next snapshot from it (copy-on-write, once per batch) and persists the whole
+# batch with a single storage write, so a burst of checkouts costs one file
+# write (or fsync) instead of one each.
+class Collection:
+    def __init__(self, name: str, indexes: dict[str, type[SnapshotIndex]] | None = None):
+        self.name = name
+        self.index_types: dict[str, type[SnapshotIndex]] = dict(indexes or {})
+        self.current: Snapshot | None = None
+        self.version: int = 0
+        self.signature: tuple | None = None
+        self.next_check: float = 0.0
+        self.lock = threading.RLock()
+        self.queue: queue.Queue = queue.Queue()
+        self.writer: threading.Thread | None = None
+        atexit.register(self.flush)
+
+    def __repr__(self):
+        loaded = "not loaded" if self.current is None else f"{len(self.current.record_list)} records"
+        return f"<Collection name={self.name}, version={self.version}, {loaded}>"
+
+    # The first record wins if an ID appears twice, like the old list scans did
+    @staticmethod
+    def _build_index(records: list[dict]) -> dict[str, dict]:
+        index: dict[str, dict] = {}
+        for record in records:
+            index.setdefault(str(record.get("id")), record)
+        return index
+
+    # Immutable in-memory form of a record: a FrozenRecord, or a CompactRecord if configured
+    def _freeze(self, record: dict, shared: dict | None = None) -> FrozenRecord:
+        if get_storage().compact_records and self.name in COMPACT_FIELDS:
+            return compact_record_type(COMPACT_FIELDS[self.name])(record, shared)
+        return freeze(record)
+
+    # Versions keep counting up across reloads, so a cache key never comes back
+    def _publish(self, records: RecordList, indexes: dict[str, SnapshotIndex]):
+        self.version += 1
+        self.current = Snapshot(records, indexes, self.version)
+
+    # Drop the cached copy if the stored collection was changed by someone else
+    def _check(self, force: bool = False):
+        storage = get_storage()
+        if storage.check_interval < 0 and not force:
+            return
+
+        with self.lock:
+            if self.current is None:
+                return
+            now: float = time.monotonic()
+            if not force and now < self.next_check:
+                return
+            self.next_check = now + storage.check_interval
+            if storage.signature(self.name) != self.signature:
+                logger.info(f"Collection '{self.name}' changed on disk, reloading it.")
+                self.invalidate()
+
+    # The current snapshot, loaded from storage if needed
+    def snapshot(self) -> Snapshot:
+        if self.current is not None and time.monotonic() >= self.next_check:
+            self._check()
+
+        snapshot: Snapshot | None = self.current
+        if snapshot is not None:
+            return snapshot
+
+        with self.lock:
+            if self.current is None:
+                storage = get_storage()
+                # Taken before reading, so a change during the read triggers another reload
+                signature: tuple | None = storage.signature(self.name)
+                shared: dict = {}
+                records: tuple[FrozenRecord, ...] = tuple(self._freeze(record, shared) for record in storage.load(self.name))
+                indexes: dict[str, SnapshotIndex] = {}
+                for name, index_type in self.index_types.items():
+                    indexes[name] = index_type.build(records, **{used: indexes[used] for used in index_type.uses})
+                self._publish(RecordList.build(records), indexes)
+                self.signature = signature
+                self.next_check = time.monotonic() + storage.check_interval
+                logger.info(f"Collection '{self.name}' loaded with {len(records)} records.")
+            return self.current
+
+    def load(self) -> tuple[FrozenRecord, ...]:
+        return self.snapshot().records
+
+    def get(self, record_id: str) -> FrozenRecord | None:
+        return self.snapshot().record_list.get(str(record_id))
+
+    # Our own writes change the signature too, remember the new one
+    def _written(self):
+        self.signature = get_storage().signature(self.name)
+
+    # Writes return once the new snapshot is published; with durable=True (the
+    # default) they also wait until their batch is stored and raise if that failed.
+    # update() also takes a function of the current record that returns the
+    # changes (None for none); the writer thread calls it, so a read-modify-write
+    # like a counter never works from an outdated record.
+    def insert(self, record: dict, durable: bool = True):
+        self._submit(("insert", record), durable)
+
+    def update(self, record_id: str, data: dict | Callable[[FrozenRecord], dict | None], durable: bool = True) -> bool:
+        return self._submit(("update", str(record_id), data), durable)
+
+    def delete(self, record_id: str, durable: bool = True) -> bool:
+        return self._submit(("delete", str(record_id)), durable)
+
+    def _submit(self, op: tuple, durable: bool) -> bool:
+        write = _Write(op)
+        self.queue.put(write)
+        self._start_writer()
+
+        write.applied.wait()
+        if write.error is not None:
+            raise write.error
+        if durable:
+            write.durable.wait()
+            if write.store_error is not None:
+                raise write.store_error
+        return write.result
+
+    def _start_writer(self):
+        if self.writer is not None:
+            return
+        with self.lock:
+            if self.writer is None:
+                self.writer = threading.Thread(target=self._run_writer, name=f"collection-writer-{self.name}", daemon=True)
+                self.writer.start()
+
+    def _run_writer(self):
+        while True:
+            batch: list[_Write] = [self.queue.get()]
+            batch_window: float = get_storage().batch_window
+            if batch_window > 0:
+                time.sleep(batch_window)
+            while True:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            try:
+                self._commit(batch)
+            except Exception as e:
+                logger.error(f"Collection writer for '{self.name}' failed: {e}")
+                for write in batch:
+                    if not write.applied.is_set():
+                        write.error = e
+                    write.applied.set()
+                    write.durable.set()
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    # Publish the next snapshot with the whole batch, then persist it with one storage
+    # call. The storage write lock is held from the check for changes to the store,
+    # so the batch starts from everything other processes stored before it.
+    def _commit(self, batch: list[_Write]):
+        with get_storage().write_lock(self.name):
+            with self.lock:
+                try:
+                    self._check(force=True)
+                    snapshot: Snapshot = self.snapshot()
+                    working: _RecordBatch = _RecordBatch(snapshot.record_list)
+                    removed: list[FrozenRecord] = []
+                    added: list[FrozenRecord] = []
+                    ops: list[tuple] = []
+                    for write in batch:
+                        op: tuple | None = self._apply(working, write.op, removed, added)
+                        write.result = op is not None
+                        if op is not None:
+                            ops.append(op)
+                    if ops:
+                        records: RecordList = working.result()
+                        indexes: dict[str, SnapshotIndex] = {}
+                        for name, secondary in snapshot.indexes.items():
+                            indexes[name] = secondary.updated(records, removed, added, **{used: indexes[used] for used in secondary.uses})
+                        self._publish(records, indexes)
+                except Exception as e:
+                    for write in batch:
+                        write.error = e
+                        write.applied.set()
+                        write.durable.set()
+                    return
+
+                for write in batch:
+                    write.applied.set()
+
+                try:
+                    if ops:
+                        get_storage().apply(self.name, ops, records)
+                        self._written()
+                except Exception as e:
+                    # The published snapshot is ahead of storage now, drop it
+                    logger.error(f"Writing {len(ops)} changes to '{self.name}' failed: {e}")
+                    self.invalidate()
+                    for write in batch:
+                        write.store_error = e
+                finally:
+                    for write in batch:
+                        write.durable.set()
+
+    # Apply one operation to the working copy of the next snapshot. Returns the
+    # operation to store, None if it changed nothing.
+    def _apply(self, working: _RecordBatch, op: tuple, removed: list[FrozenRecord], added: list[FrozenRecord]) -> tuple | None:
+        if op[0] == "insert":
+            record: FrozenRecord = self._freeze(op[1])
+            working.append(record)
+            added.append(record)
+            return op
+
+        old: FrozenRecord | None = working.get(op[1])
+        if old is None:
+            return None
+
+        if op[0] == "update":
+            # A callable computes the changes from the current record, None to leave it
+            data: dict | None = op[2](old) if callable(op[2]) else op[2]
+            if data is None:
+                return None
+            record: FrozenRecord = self._freeze({**full_record(old), **data})
+            working.replace(op[1], record)
+            self._retire(old, removed, added, record)
+            return ("update", op[1], data)
+        if op[0] == "delete":
+            for record in working.delete(op[1]):
+                self._retire(record, removed, added)
+        return op
+
+    # Report a replaced (or deleted) record to the indexes. One added earlier in
+    # the same batch never reached them, so it is swapped out of added in place,
+    # which keeps added in catalog order.
+    @staticmethod
+    def _retire(record: FrozenRecord, removed: list[FrozenRecord], added: list[FrozenRecord], replacement: FrozenRecord | None = None):
+        for position, item in enumerate(added):
+            if item is record:
+                if replacement is None:
+                    del added[position]
+                else:
+                    added[position] = replacement
+                return
+        removed.append(record)
+        if replacement is not None:
+            added.append(replacement)
+
+    # Wait until every queued write is stored (also run at interpreter exit)
+    def flush(self):
+        self.queue.join()
+
+    def replace(self, records: list[dict]):
+        storage = get_storage()
+        with storage.write_lock(self.name), self.lock:
+            storage.replace(self.name, records)
+            self.invalidate()
+
+    # Drop the cached copy, the next read loads it again from storage. Readers
+    # still holding the old snapshot keep a consistent view of it.
+    def invalidate(self):
+        with self.lock:
+            self.current = None
+
+
+# =====================================
+# Versioned Result Caches
+# =====================================
+
+# Bounded LRU cache for results computed from one snapshot version. Results of
+# an older version are never asked for again, so all entries are dropped as
+# soon as a newer version shows up. Values are shared between callers and
+# must not be changed.
+class VersionedCache:
+    def __init__(self, name: str, maxsize: int = 256):
+        self.name = name
+        self.maxsize = maxsize
+        self.version: int | None = None
+        self.entries: OrderedDict = OrderedDict()
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.invalidations: int = 0
+        self.lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<VersionedCache name={self.name}, version={self.version}, {len(self.entries)}/{self.maxsize} entries>"
+
+    # The cached value for key, computed (outside the lock) on a miss
+    def get(self, version: int, key: tuple, compute: Callable[[], Any]) -> Any:
+        with self.lock:
+            if version == self.version and key in self.entries:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return self.entries[key]
+            self.misses += 1
+
+        value: Any = compute()
+        with self.lock:
+            if self.version is not None and version < self.version:
+                # A reader still on an older snapshot, its result is already outdated
+                return value
+            if version != self.version:
+                if self.entries:
+                    self.invalidations += 1
+                self.entries.clear()
+                self.version = version
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            if len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return value
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.version = None
+
+    def stats(self) -> dict:
+        with self.lock:
+            requests: int = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "maxsize": self.maxsize,
+                "version": self.version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / requests, 4) if requests else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+
+# =====================================
+# Cached JSON Documents
+# =====================================
+
+# A single JSON file (settings.json) cached in memory as a frozen, versioned
+# copy and re-read when the file changes on disk, checked at most every
+# check_interval seconds. Change it with replace(), starting from thaw(load()).
+class Document:
+    def __init__(self, path: str):
+        self.path = path
+        self.data: FrozenRecord | None = None
+        self.version: int = 0
+        self.signature: tuple | None = None
+        self.next_check: float = 0.0
+        self.lock = threading.RLock()
+
+    def __repr__(self):
+        return f"<Document path={self.path}, version={self.version}, loaded={self.data is not None}>"
+
+    def load(self) -> FrozenRecord:
+        if self.data is not None and time.monotonic() >= self.next_check:
+            check_interval: float = get_storage().check_interval
+            if check_interval >= 0:
+                with self.lock:
+                    self.next_check = time.monotonic() + check_interval
+                    if file_signature(self.path) != self.signature:
+                        logger.info(f"{self.path} changed on disk, reloading it.")
+                        self.data = None
+
+        data: FrozenRecord | None = self.data
+        if data is not None:
+            return data
+
+        with self.lock:
+            if self.data is None:
+                signature: tuple | None = file_signature(self.path)
+                with open(self.path, "r", encoding="utf-8") as file:
+                    settings: dict = json.load(file)
+                # On the first load the storage backend is set up from these settings
+                # instead of reading the file once more
+                check_interval: float = get_storage(settings).check_interval
+                data = freeze(settings)
+                self.version += 1
+                self.data = data
+                self.signature = signature
+                self.next_check = time.monotonic() + check_interval
+                logger.info(f"{self.path} loaded successfully.")
+            return self.data
+
+    # Written to a temp file and swapped in, readers in other workers never see it half written
+    def replace(self, data: dict):
+        with self.lock:
+            temp_path: str = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            try:
+                with open(temp_path, "w", encoding="utf-8") as file:
+                    json.dump(data, file, indent=4, ensure_ascii=False)
+                    file.flush()
+                    os.fsync(file.fileno())
+                os.replace(temp_path, self.path)
+            finally:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+            self.invalidate()
+
+    def invalidate(self):
+        with self.lock:
+            self.data = None
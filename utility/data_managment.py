@@ -1,19 +1,51 @@
 import json
+import math
 import re
-from functools import lru_cache
 
 from logging_utility import logger
+from .collection import Collection, Document, RevisionIndex, Snapshot, VersionedCache
+from .facets import FacetIndex
+from .other_utils import number_format
+from .pricing import Pricing, PricingIndex
+from .records import freeze
+from .search import (FEATURED, IN_STOCK, SORT_ORDERINGS, SUGGEST_LIMIT, ListingIndex, SearchIndex, SortIndex, SuggestIndex,
+                     query_terms, sort_records)
+from .storage import SETTINGS_FILE
+
+# The pricing index comes first, sort and facets take their prices from it
+product_collection = Collection("products", indexes={"pricing": PricingIndex, "search": SearchIndex, "listing": ListingIndex,
+                                                      "sort": SortIndex, "facets": FacetIndex, "suggest": SuggestIndex,
+                                                      "revisions": RevisionIndex})
+coupon_collection = Collection("coupons")
+contact_collection = Collection("contact")
+order_collection = Collection("orders")
+settings_document = Document(SETTINGS_FILE)
+
+# Results of query_products() and product_facets() for the current catalog version
+QUERY_CACHE_SIZE: int = 256
+product_query_cache = VersionedCache("products", QUERY_CACHE_SIZE)
+
+# Products per page of the storefront listing, and the most a client may ask for
+PRODUCT_PAGE_SIZE: int = 24
+MAX_PRODUCT_PAGE_SIZE: int = 96
+
+# Values of the storefront's sort select -> (sort_by, ascending)
+PRODUCT_SORTS: dict[str, tuple[str, bool]] = {
+    "price-asc": ("effective_price", True),
+    "price-desc": ("effective_price", False),
+    "name-asc": ("name", True),
+    "name-desc": ("name", False),
+    "newest": ("newest", True),
+}
 
 # =====================================
 # Products Functions
 # =====================================
 
-# Get products from the products.json file
-@lru_cache(maxsize=30720)
-def get_products() -> list | None:
+# Get products from the cached product collection
+def get_products() -> tuple | None:
     try:
-        with open("data/products.json", "r", encoding="utf-8") as file:
-            products: list = json.load(file)
+        products: tuple = product_collection.load()
         logger.info("Products loaded successfully.")
         return products
     except FileNotFoundError:
@@ -24,46 +56,236 @@ def get_products() -> list | None:
         return None
 
 
-# Query products based on search criteria
-def query_products(query: str = None, category: str = None, sort_by=None, ascending=True) -> list | None:
+# Query products based on search criteria. The query goes through the full-text
+# index (ranked, best match first); regex=True matches it as a regular expression
+# instead, which is only meant for the admin panel. category, featured and
+# in_stock narrow the result through the listing index. sort_by "price",
+# "effective_price", "name" and "newest" use the presorted orderings of the
+# sort index, other fields are sorted on the spot; missing values go last
+# either way. categories (any of them), price_min/price_max (on the effective
+# price) and on_sale are facets, resolved by the facet index.
+#
+# Results are cached per catalog version, keyed on the normalized parameters,
+# so the same listing isn't filtered and sorted again on every render. They
+# are shared tuples, copy them before changing anything.
+def query_products(query: str = None, category: str = None, sort_by=None, ascending=True, regex: bool = False,
+                   featured: bool = False, in_stock: bool = False, categories: list[str] | None = None,
+                   price_min: float | None = None, price_max: float | None = None, on_sale: bool = False) -> tuple:
     try:
-        products: list[dict] | None = get_products()
-        
-        # Filter by query (name or keyword)
-        if query is not None:
-            if query.strip() == "":
-                query = ".*"
+        snapshot = product_collection.snapshot()
+        key: tuple = (_normalize_query(query, regex), category, sort_by, bool(ascending), bool(regex), bool(featured), bool(in_stock),
+                      *_normalize_facets(categories, price_min, price_max, on_sale))
+        products: tuple = product_query_cache.get(snapshot.version, key, lambda: _query_products(snapshot, *key))
+        logger.info("Products queried successfully.")
+        return products
+
+    except Exception as e:
+        logger.error(f"Error querying products: {e}")
+        return ()
+
+
+def _normalize_query(query: str | None, regex: bool = False) -> str | None:
+    if query is None or query.strip() == "":
+        return None
+    return query if regex else " ".join(query_terms(query))
+
+
+def _normalize_facets(categories: list[str] | None, price_min: float | None, price_max: float | None, on_sale: bool) -> tuple:
+    return (tuple(sorted(set(categories))) if categories else None,
+            None if price_min is None else float(price_min),
+            None if price_max is None else float(price_max),
+            bool(on_sale))
+
+
+# The uncached query on one snapshot
+def _query_products(snapshot: Snapshot, query: str | None, category: str | None, sort_by, ascending: bool, regex: bool,
+                    featured: bool, in_stock: bool, categories: tuple | None, price_min: float | None,
+                    price_max: float | None, on_sale: bool) -> tuple:
+    filters: list[tuple] = []
+    if category is not None:
+        filters.append(("category", category))
+    if featured:
+        filters.append(FEATURED)
+    if in_stock:
+        filters.append(IN_STOCK)
+    listing: ListingIndex = snapshot.indexes["listing"]
+    # None stands for the whole catalog in catalog order
+    product_ids: list[str] | None = None
+
+    facet_rows = None
+    facets: FacetIndex = snapshot.indexes["facets"]
+    if categories or price_min is not None or price_max is not None or on_sale:
+        facet_rows, _ = facets.select(list(categories or ()), price_min, price_max, in_stock, on_sale)
+    
+    # Filter by query (id, name or keyword)
+    if query is not None:
+        if regex:
             pattern = re.compile(query, re.IGNORECASE)
-            products = [
-                product for product in products 
+            product_ids = [
+                str(product.get("id")) for product in snapshot.records 
                 if (pattern.search(product.get("id", "")) or pattern.search(product.get("name", "")) or pattern.search(product.get("keyword", "")))
             ]
-        
-        # Filter by category
-        if category is not None:
-            products = [
-                product for product in products if (category in product.get("categories", []))
-            ]
-        
-        # Sort products by given field
-        if sort_by:
-            products = sorted(products, key=lambda x: x.get(sort_by, None), reverse=not ascending)
-        
-        logger.info("Products queried successfully.")
-        return products if products else []
+        else:
+            product_ids = snapshot.indexes["search"].search(query)
+        product_ids = listing.ids(filters, product_ids)
+    
+    # Filter by category, featured and stock
+    elif filters:
+        product_ids = listing.ids(filters)
 
+    # Filter by facets
+    if facet_rows is not None:
+        product_ids = facets.ids_of(facet_rows) if product_ids is None else facets.restrict(product_ids, facet_rows)
+    
+    # Sort products by given field
+    if sort_by in SORT_ORDERINGS:
+        sort_index: SortIndex = snapshot.indexes["sort"]
+        return tuple(sort_index.sort(sort_by, product_ids, ascending))
+
+    products: list[dict] | tuple = snapshot.records if product_ids is None else [snapshot.record_list.get(product_id) for product_id in product_ids]
+    if sort_by:
+        products = sort_records(products, sort_by, ascending)
+    
+    return tuple(products)
+
+
+# Facet counts (per category, in stock, on sale, price range) for the products
+# query_products() returns with the same parameters
+def product_facets(query: str = None, categories: list[str] | None = None, price_min: float | None = None,
+                   price_max: float | None = None, in_stock: bool = False, on_sale: bool = False) -> dict:
+    try:
+        snapshot = product_collection.snapshot()
+        key: tuple = ("facets", _normalize_query(query), bool(in_stock), *_normalize_facets(categories, price_min, price_max, on_sale))
+        return product_query_cache.get(snapshot.version, key, lambda: _product_facets(snapshot, *key[1:]))
     except Exception as e:
-        logger.error(f"Error querying products: {e}")
-        return []
+        logger.error(f"Error counting product facets: {e}")
+        return {}
+
+
+def _product_facets(snapshot: Snapshot, query: str | None, in_stock: bool, categories: tuple | None, price_min: float | None,
+                    price_max: float | None, on_sale: bool) -> dict:
+    within: list[str] | None = None if query is None else snapshot.indexes["search"].search(query)
+    facets: FacetIndex = snapshot.indexes["facets"]
+    return freeze(facets.select(list(categories or ()), price_min, price_max, in_stock, on_sale, within)[1])
+
+
+# query_products()/product_facets() parameters from the storefront's query string:
+# search, category (repeatable), price_min, price_max, in_stock=1, on_sale=1, sort
+def product_filters(args) -> dict:
+    def number(name: str) -> float | None:
+        try:
+            value: float = float(args.get(name, ""))
+        except ValueError:
+            return None
+        return value if math.isfinite(value) else None
+
+    sort_by, ascending = PRODUCT_SORTS.get(args.get("sort", ""), (None, True))
+    return {
+        "query": args.get("search"),
+        "categories": [category for category in args.getlist("category") if category] or None,
+        "price_min": number("price_min"),
+        "price_max": number("price_max"),
+        "in_stock": args.get("in_stock") == "1",
+        "on_sale": args.get("on_sale") == "1",
+        "sort_by": sort_by,
+        "ascending": ascending,
+    }
+
+
+# page (from 1) and limit from the storefront's query string, limit clamped to MAX_PRODUCT_PAGE_SIZE
+def product_page_params(args) -> tuple[int, int]:
+    try:
+        page: int = max(int(args.get("page", 1)), 1)
+    except ValueError:
+        page = 1
+    try:
+        limit: int = min(max(int(args.get("limit", PRODUCT_PAGE_SIZE)), 1), MAX_PRODUCT_PAGE_SIZE)
+    except ValueError:
+        limit = PRODUCT_PAGE_SIZE
+    return page, limit
+
+
+# One page of query_products(filters). The full result stays in the query
+# cache, so every further page is a slice of it.
+def paginate_products(filters: dict, page: int = 1, limit: int = PRODUCT_PAGE_SIZE) -> dict:
+    products: tuple = query_products(**filters)
+    start: int = (page - 1) * limit
+    return {
+        "products": products[start:start + limit],
+        "page": page,
+        "limit": limit,
+        "total": len(products),
+        "pages": max(1, -(-len(products) // limit)),
+        "next_page": page + 1 if start + limit < len(products) else None,
+    }
+
+
+# Products whose name or keywords start with the typed text, for search-as-you-type.
+# A lookup is a binary search into the suggestion index, so it isn't cached.
+def suggest_products(query: str, limit: int = SUGGEST_LIMIT) -> tuple:
+    try:
+        snapshot = product_collection.snapshot()
+        return tuple(snapshot.record_list.get(record_id) for record_id in snapshot.indexes["suggest"].suggest(query, limit))
+    except Exception as e:
+        logger.error(f"Error suggesting products for {query!r}: {e}")
+        return ()
+
+
+# Effective price, tax split, discount and formatted prices of a product,
+# computed once per product version by the pricing index
+def product_pricing(product: dict) -> Pricing:
+    return product_collection.snapshot().indexes["pricing"].get(product)
+
+
+# Revision of a product for fragment cache keys, None if the record isn't the
+# current version (its fragments are then rendered, not cached)
+def product_revision(product: dict) -> int | None:
+    snapshot = product_collection.snapshot()
+    record_id: str = str(product.get("id"))
+    if snapshot.record_list.get(record_id) is not product:
+        return None
+    return snapshot.indexes["revisions"].get(record_id)
+
+
+# The cart with every entry joined to its product through the ID index, plus
+# pricing, line totals and (with a format string) formatted prices, so the cart
+# page, the cart totals and the checkout cost O(cart size). Entries whose
+# product no longer exists are left out.
+def cart_view(cart: dict, format_string: str | None = None) -> dict:
+    snapshot = product_collection.snapshot()
+    prices: PricingIndex = snapshot.indexes["pricing"]
+    lines: list[dict] = []
+    for product_id, quantity in cart.items():
+        product = snapshot.record_list.get(str(product_id))
+        if product is None:
+            continue
+        pricing: Pricing = prices.get(product)
+        line: dict = {
+            "product": product,
+            "quantity": quantity,
+            "pricing": pricing,
+            "total": pricing.effective_price * quantity,
+            "tax": pricing.tax_amount * quantity,
+        }
+        if format_string is not None:
+            price_text: dict[str, str] = pricing.text(format_string)
+            line["price_text"] = price_text["price"]
+            line["new_price_text"] = price_text["new_price"] if pricing.on_sale else None
+            line["total_text"] = number_format(format_string).format(line["total"])
+        lines.append(line)
+
+    return {
+        "lines": lines,
+        "quantity": sum(line["quantity"] for line in lines),
+        "total": sum(line["total"] for line in lines),
+        "tax": sum(line["tax"] for line in lines),
+    }
 
 
 # Get product by its ID
-@lru_cache(maxsize=30720)
 def get_product_by_id(_id: str) -> dict | None:
     try:
-        products: list[dict] | None = get_products()
-        result = [product for product in products if (str(_id) == (product.get("id")))]
-        product = result[0] if result else None
+        product = product_collection.get(_id)
         logger.info(f"Product with ID {_id} retrieved.")
         return product
     except Exception as e:
@@ -71,23 +293,13 @@ def get_product_by_id(_id: str) -> dict | None:
         return None
 
 
-# Delete product from the products.json file
+# Delete product from storage
 def delete_product_json(product_id: str):
     try:
-        products: list[dict] = get_products()
-        
         # Remove the product with the given ID
-        products_new = [product for product in products if product.get("id") != str(product_id)]
-
-        # Save the updated list back to the file
-        with open("data/products.json", "w", encoding="utf-8") as f:
-            json.dump(products_new, f, indent=4, ensure_ascii=False)    
+        product_collection.delete(product_id)
         
         logger.info(f"Product with ID {product_id} deleted successfully.")
-
-        # Clear cached data for products
-        get_product_by_id.cache_clear()
-        get_products.cache_clear()
     
     except FileNotFoundError:
         logger.critical("products.json file not found.")
@@ -99,17 +311,9 @@ def delete_product_json(product_id: str):
 
 def add_product(product_data: dict):
     try:
-        products: list[dict] = get_products()
-        products.append(product_data)
-
-        with open("data/products.json", "w", encoding="utf-8") as f:
-            json.dump(products, f, indent=4, ensure_ascii=False)
+        product_collection.insert(product_data)
         
         logger.info(f"Product added successfully | Product ID: {product_data.get('id')}")
-        
-        # Clear cached data for products
-        get_product_by_id.cache_clear()
-        get_products.cache_clear()
     except FileNotFoundError:
         logger.critical("products.json file not found.")
     except json.JSONDecodeError:
@@ -121,16 +325,8 @@ def add_product(product_data: dict):
 # Modify product by its ID
 def modify_product(product_id: str, updated_data: dict):
     try:
-        products: list[dict] = get_products()
-        product = get_product_by_id(product_id)
-        if product:
-            product.update(updated_data)
-            with open("data/products.json", "w", encoding="utf-8") as f:
-                json.dump(products, f, indent=4, ensure_ascii=False)
+        if product_collection.update(product_id, updated_data):
             logger.info(f"Product with ID {product_id} updated successfully.")
-            # Clear cached data for products
-            get_product_by_id.cache_clear()
-            get_products.cache_clear()
         else:
             logger.error(f"Product with ID {product_id} not found.")
     except FileNotFoundError:
@@ -145,12 +341,10 @@ def modify_product(product_id: str, updated_data: dict):
 # Coupons Functions
 # =====================================
 
-# Get coupons from the coupons.json file
-@lru_cache(maxsize=30720)
+# Get coupons from the cached coupon collection
 def get_coupons(type: str = "") -> dict | None:
     try:
-        with open("data/coupons.json", "r", encoding="utf-8") as file:
-            data: dict = json.load(file)
+        data: dict = coupon_collection.load()
         logger.info("Coupons loaded successfully.")
     except FileNotFoundError:
         logger.critical("coupons.json file not found.")
@@ -166,12 +360,9 @@ def get_coupons(type: str = "") -> dict | None:
 
 
 # Get coupon by its ID
-@lru_cache(maxsize=30720)
 def get_coupon_by_id(_id: str) -> dict | None:
     try:
-        coupons: list[dict] | None = get_coupons()
-        result = [coupon for coupon in coupons if str(_id) == coupon.get("id")]
-        coupon = result[0] if result else None
+        coupon = coupon_collection.get(_id)
         logger.info(f"Coupon with ID {_id} retrieved.")
         return coupon
     except Exception as e:
@@ -179,23 +370,13 @@ def get_coupon_by_id(_id: str) -> dict | None:
         return None
 
 
-# Delete coupon from the coupons.json file
+# Delete coupon from storage
 def delete_coupon_json(coupon_id: str):
     try:
-        coupons = get_coupons()
-
         # Remove the coupon with the given ID
-        coupons_new = [coupon for coupon in coupons if coupon.get("id") != str(coupon_id)]
-
-        # Save the updated list back to the file
-        with open("data/coupons.json", "w", encoding="utf-8") as f:
-            json.dump(coupons_new, f, indent=4, ensure_ascii=False)    
+        coupon_collection.delete(coupon_id)
         
         logger.info(f"Coupon with ID {coupon_id} deleted successfully.")
-
-        # Clear cached data for coupons
-        get_coupon_by_id.cache_clear()
-        get_coupons.cache_clear()
     
     except FileNotFoundError:
         logger.critical("coupons.json file not found.")
@@ -207,17 +388,9 @@ def delete_coupon_json(coupon_id: str):
 
 def add_coupon(coupon_data: dict):
     try:
-        coupons: list[dict] = get_coupons()
-        coupons.append(coupon_data)
-
-        with open("data/coupons.json", "w", encoding="utf-8") as f:
-            json.dump(coupons, f, indent=4, ensure_ascii=False)
+        coupon_collection.insert(coupon_data)
         
         logger.info(f"Coupon added successfully | Coupon ID: {coupon_data.get('id')}")
-        
-        # Clear cached data for coupons
-        get_coupon_by_id.cache_clear()
-        get_coupons.cache_clear()
     except FileNotFoundError:
         logger.critical("coupons.json file not found.")
     except json.JSONDecodeError:
@@ -229,16 +402,8 @@ def add_coupon(coupon_data: dict):
 # Modify coupon by its ID
 def modify_coupon(coupon_id: str, updated_data: dict):
     try:
-        coupons: list[dict] = get_coupons()
-        coupon = get_coupon_by_id(coupon_id)
-        if coupon:
-            coupon.update(updated_data)
-            with open("data/coupons.json", "w", encoding="utf-8") as f:
-                json.dump(coupons, f, indent=4, ensure_ascii=False)
+        if coupon_collection.update(coupon_id, updated_data):
             logger.info(f"Coupon with ID {coupon_id} updated successfully.")
-            # Clear cached data for coupons
-            get_coupon_by_id.cache_clear()
-            get_coupons.cache_clear()
         else:
             logger.error(f"Coupon with ID {coupon_id} not found.")
     except FileNotFoundError:
@@ -249,17 +414,39 @@ def modify_coupon(coupon_id: str, updated_data: dict):
         logger.error(f"Error updating coupon with ID {coupon_id}: {e}")
 
 
+# Take one use of a coupon with limited uses. The collection's writer counts
+# uses_remaining down on the current record, so two checkouts can't both spend
+# the last use. The coupon is deleted once no use is left. Returns False if
+# there was no use left to take.
+def use_coupon(coupon_id: str) -> bool:
+    def take_use(coupon: dict) -> dict | None:
+        uses_remaining = coupon.get("uses_remaining")
+        if uses_remaining is None or uses_remaining <= 0:
+            return None
+        return {"uses_remaining": uses_remaining - 1}
+
+    try:
+        if not coupon_collection.update(coupon_id, take_use):
+            logger.info(f"Coupon with ID {coupon_id} has no uses left.")
+            return False
+        coupon = coupon_collection.get(coupon_id)
+        if coupon is not None and coupon.get("uses_remaining") == 0:
+            coupon_collection.delete(coupon_id)
+        logger.info(f"Coupon with ID {coupon_id} used.")
+        return True
+    except Exception as e:
+        logger.error(f"Error using coupon with ID {coupon_id}: {e}")
+        return False
+
+
 # =====================================
 # Settings Functions
 # =====================================
 
 # Get settings from the settings.json file
-@lru_cache(maxsize=30720)
 def get_settings(type: str = "") -> dict | None:
     try:
-        with open("data/settings.json", "r", encoding="utf-8") as file:
-            data: dict = json.load(file)
-        logger.info("Settings loaded successfully.")
+        data: dict = settings_document.load()
     except FileNotFoundError:
         logger.critical("settings.json file not found.")
         return None
@@ -277,12 +464,10 @@ def get_settings(type: str = "") -> dict | None:
 # Contact Functions
 # =====================================
 
-# Get contact requests from the contacts.json file
-@lru_cache(maxsize=30720)
+# Get contact requests from the cached contact collection
 def get_contact_requests(type: str = "") -> dict | None:
     try:
-        with open("data/contact.json", "r", encoding="utf-8") as file:
-            data: dict = json.load(file)
+        data: dict = contact_collection.load()
         logger.info("Contact requests loaded successfully.")
     except FileNotFoundError:
         logger.critical("contacts.json file not found.")
@@ -298,12 +483,9 @@ def get_contact_requests(type: str = "") -> dict | None:
 
 
 # Get coupon by its ID
-@lru_cache(maxsize=30720)
 def get_contact_by_id(_id: str) -> dict | None:
     try:
-        contact_requests: list[dict] | None = get_contact_requests()
-        result = [request for request in contact_requests if str(_id) == request.get("id")]
-        request = result[0] if result else None
+        request = contact_collection.get(_id)
         logger.info(f"Coupon with ID {_id} retrieved.")
         return request
     except Exception as e:
@@ -311,23 +493,13 @@ def get_contact_by_id(_id: str) -> dict | None:
         return None
 
 
-# Delete coupon from the coupons.json file
+# Delete contact request from storage
 def delete_request_json(request_id: str):
     try:
-        contact_requests = get_contact_requests()
-
-        # Remove the coupon with the given ID
-        coupons_new = [request for request in contact_requests if request.get("id") != str(request_id)]
-
-        # Save the updated list back to the file
-        with open("data/coupons.json", "w", encoding="utf-8") as f:
-            json.dump(coupons_new, f, indent=4, ensure_ascii=False)    
+        # Remove the contact request with the given ID
+        contact_collection.delete(request_id)
         
         logger.info(f"Contact Request with ID {request_id} deleted successfully.")
-
-        # Clear cached data for coupons
-        get_contact_requests.cache_clear()
-        get_contact_by_id.cache_clear()
     
     except FileNotFoundError:
         logger.critical("contacts.json file not found.")
@@ -338,17 +510,9 @@ def delete_request_json(request_id: str):
 
 def add_contact_request(contact_entry: dict):
     try:
-        contact_requests: list[dict] = get_contact_requests()
-        contact_requests.append(contact_entry)
-
-        with open("data/contact.json", "w", encoding="utf-8") as file:
-            json.dump(contact_requests, file, indent=4, ensure_ascii=False)
+        contact_collection.insert(contact_entry)
         
         logger.info(f"Contact entry added successfully | Entry: {contact_entry}")
-        
-        # Clear cached data for contact requests
-        get_contact_by_id.cache_clear()
-        get_contact_requests.cache_clear()
     except FileNotFoundError:
         logger.critical("contact.json file not found.")
     except json.JSONDecodeError:
@@ -360,16 +524,8 @@ def add_contact_request(contact_entry: dict):
 # Modify contact request by its ID
 def modify_contact_request(request_id: str, updated_data: dict):
     try:
-        contact_requests: list[dict] = get_contact_requests()
-        request = get_contact_by_id(request_id)
-        if request:
-            request.update(updated_data)
-            with open("data/contact.json", "w", encoding="utf-8") as f:
-                json.dump(contact_requests, f, indent=4, ensure_ascii=False)
+        if contact_collection.update(request_id, updated_data):
             logger.info(f"Contact request with ID {request_id} updated successfully.")
-            # Clear cached data for contact requests
-            get_contact_by_id.cache_clear()
-            get_contact_requests.cache_clear()
         else:
             logger.error(f"Contact request with ID {request_id} not found.")
     except FileNotFoundError:
@@ -384,12 +540,10 @@ def modify_contact_request(request_id: str, updated_data: dict):
 # Orders Functions
 # =====================================
 
-# Get orders from the orders.json file
-@lru_cache(maxsize=30720)
-def get_orders() -> list | None:
+# Get orders from the cached order collection
+def get_orders() -> tuple | None:
     try:
-        with open("data/orders.json", "r", encoding="utf-8") as file:
-            orders: list = json.load(file)
+        orders: tuple = order_collection.load()
         logger.info("Orders loaded successfully.")
         return orders
     except FileNotFoundError:
@@ -400,35 +554,22 @@ def get_orders() -> list | None:
         return None
 
 # Get order by its ID
-@lru_cache(maxsize=30720)
 def get_order_by_id(_id: str) -> dict | None:
     try:
-        orders: list[dict] | None = get_orders()
-        result = [order for order in orders if str(_id) == order.get("id")]
-        order = result[0] if result else None
+        order = order_collection.get(_id)
         logger.info(f"Order with ID {_id} retrieved.")
         return order
     except Exception as e:
         logger.error(f"Error retrieving order by ID {_id}: {e}")
         return None
 
-# Delete order from the orders.json file
+# Delete order from storage
 def delete_order_json(order_id: str):
     try:
-        orders: list[dict] = get_orders()
-        
         # Remove the order with the given ID
-        orders_new = [order for order in orders if order.get("id") != str(order_id)]
-
-        # Save the updated list back to the file
-        with open("data/orders.json", "w", encoding="utf-8") as f:
-            json.dump(orders_new, f, indent=4, ensure_ascii=False)    
+        order_collection.delete(order_id)
         
         logger.info(f"Order with ID {order_id} deleted successfully.")
-
-        # Clear cached data for orders
-        get_order_by_id.cache_clear()
-        get_orders.cache_clear()
     
     except FileNotFoundError:
         logger.critical("orders.json file not found.")
@@ -437,20 +578,12 @@ def delete_order_json(order_id: str):
     except Exception as e:
         logger.error(f"Error deleting order with ID {order_id}: {e}")
 
-# Add order to the orders.json file
+# Add order to storage
 def add_order(order_data: dict):
     try:
-        orders: list[dict] = get_orders()
-        orders.append(order_data)
-
-        with open("data/orders.json", "w", encoding="utf-8") as f:
-            json.dump(orders, f, indent=4, ensure_ascii=False)
+        order_collection.insert(order_data)
         
         logger.info(f"Order added successfully | Order ID: {order_data.get('id')}")
-        
-        # Clear cached data for orders
-        get_order_by_id.cache_clear()
-        get_orders.cache_clear()
     except FileNotFoundError:
         logger.critical("orders.json file not found.")
     except json.JSONDecodeError:
@@ -462,16 +595,8 @@ def add_order(order_data: dict):
 # Modify order by its ID
 def modify_order(order_id: str, updated_data: dict):
     try:
-        orders: list[dict] = get_orders()
-        order = get_order_by_id(order_id)
-        if order:
-            order.update(updated_data)
-            with open("data/orders.json", "w", encoding="utf-8") as f:
-                json.dump(orders, f, indent=4, ensure_ascii=False)
+        if order_collection.update(order_id, updated_data):
             logger.info(f"Order with ID {order_id} updated successfully.")
-            # Clear cached data for orders
-            get_order_by_id.cache_clear()
-            get_orders.cache_clear()
         else:
             logger.error(f"Order with ID {order_id} not found.")
     except FileNotFoundError:
@@ -0,0 +1,220 @@
+import math
+
+import numpy as np
+
+from .collection import SnapshotIndex
+from .pricing import PricingIndex
+from .search import in_stock
+
+# =====================================
+# Faceted Filtering
+# =====================================
+
+# Spare rows the bitsets get when they grow, so inserts don't copy them every time
+_GROWTH: int = 1024
+
+
+# Packed bitset of size bytes (np.packbits order: row 0 is the highest bit of byte 0)
+def _packed(flags: np.ndarray, size: int) -> np.ndarray:
+    bits: np.ndarray = np.zeros(size, dtype=np.uint8)
+    packed: np.ndarray = np.packbits(flags)
+    bits[:packed.size] = packed
+    return bits
+
+
+def _set_bit(bits: np.ndarray, row: int, value: bool):
+    mask: int = 0x80 >> (row & 7)
+    if value:
+        bits[..., row >> 3] |= np.uint8(mask)
+    else:
+        bits[..., row >> 3] &= np.uint8(0xFF ^ mask)
+
+
+def _count(bits: np.ndarray) -> int:
+    return int(np.bitwise_count(bits).sum())
+
+
+# Bitset columns over the catalog, one bit per record row: alive, in stock,
+# on sale and one bitset per category, plus the effective prices as a float
+# column. On sale and prices come from the pricing index, so the filters agree
+# with the prices the storefront shows. A facet combination is a few vectorized ANDs over the packed bytes,
+# and the counts for every category come out of the same pass with one
+# popcount over the category matrix.
+#
+# Rows follow the catalog order. A write batch copies the columns and only
+# touches the rows of its records: updated records keep their row, deleted
+# ones leave a dead row behind until there are enough of them to rebuild.
+class FacetIndex(SnapshotIndex):
+    uses = ("pricing",)
+
+    def __init__(self, ids: list[str | None], records: list, categories: dict[str, int], alive: np.ndarray,
+                 stock: np.ndarray, sale: np.ndarray, prices: np.ndarray, category_bits: np.ndarray, row_of: dict[str, int] | None = None):
+        # Row -> record ID and record, None for dead rows
+        self.ids = ids
+        self.records = records
+        if row_of is None:
+            row_of = {record_id: row for row, record_id in enumerate(ids) if record_id is not None}
+        self.row_of = row_of
+        # Category -> row in category_bits
+        self.categories = categories
+        self.alive = alive
+        self.stock = stock
+        self.sale = sale
+        self.prices = prices
+        self.category_bits = category_bits
+
+    def __repr__(self):
+        return f"<FacetIndex {len(self.row_of)} records, {len(self.ids)} rows, {len(self.categories)} categories>"
+
+    @classmethod
+    def build(cls, records: tuple, pricing: PricingIndex) -> "FacetIndex":
+        ids: list[str] = []
+        rows: list = []
+        seen: set[str] = set()
+        for record in records:
+            record_id: str = str(record.get("id"))
+            # The first record wins if an ID appears twice, like the ID index
+            if record_id not in seen:
+                seen.add(record_id)
+                ids.append(record_id)
+                rows.append(record)
+
+        categories: dict[str, int] = {}
+        member_rows: list[int] = []
+        member_codes: list[int] = []
+        for row, record in enumerate(rows):
+            for category in dict.fromkeys(record.get("categories") or ()):
+                member_rows.append(row)
+                member_codes.append(categories.setdefault(category, len(categories)))
+
+        count: int = len(rows)
+        size: int = (count + _GROWTH + 7) // 8
+        prices: np.ndarray = np.full(size * 8, np.nan)
+        prices[:count] = np.fromiter((pricing.get(record).effective_price for record in rows), dtype=np.float64, count=count)
+        category_bits: np.ndarray = np.zeros((len(categories), size), dtype=np.uint8)
+        if member_rows:
+            member_row_array: np.ndarray = np.array(member_rows, dtype=np.int64)
+            np.bitwise_or.at(category_bits, (np.array(member_codes, dtype=np.int64), member_row_array >> 3),
+                             (0x80 >> (member_row_array & 7)).astype(np.uint8))
+
+        return cls(
+            ids, rows, categories,
+            _packed(np.ones(count, dtype=bool), size),
+            _packed(np.fromiter((in_stock(record) for record in rows), dtype=bool, count=count), size),
+            _packed(np.fromiter((pricing.get(record).on_sale for record in rows), dtype=bool, count=count), size),
+            prices, category_bits,
+        )
+
+    def updated(self, records: tuple, removed: list, added: list, pricing: PricingIndex) -> "FacetIndex":
+        ids: list[str | None] = list(self.ids)
+        rows: list = list(self.records)
+        row_of: dict[str, int] = dict(self.row_of)
+        categories: dict[str, int] = dict(self.categories)
+        alive, stock, sale = self.alive.copy(), self.stock.copy(), self.sale.copy()
+        prices: np.ndarray = self.prices.copy()
+        category_bits: np.ndarray = self.category_bits.copy()
+
+        # Rows of removed records, an updated record gets its old row back
+        freed: dict[str, int] = {}
+        for record in removed:
+            record_id: str = str(record.get("id"))
+            row: int | None = row_of.pop(record_id, None)
+            if row is None:
+                continue
+            freed[record_id] = row
+            ids[row] = rows[row] = None
+            for bits in (alive, stock, sale, category_bits):
+                _set_bit(bits, row, False)
+            prices[row] = math.nan
+
+        for record in added:
+            record_id: str = str(record.get("id"))
+            if record_id in row_of:
+                continue
+            row: int | None = freed.pop(record_id, None)
+            if row is None:
+                row = len(ids)
+                ids.append(None)
+                rows.append(None)
+                if row >= prices.size:
+                    grow: int = max(_GROWTH, prices.size // 2) // 8
+                    alive, stock, sale = (np.concatenate((bits, np.zeros(grow, dtype=np.uint8))) for bits in (alive, stock, sale))
+                    prices = np.concatenate((prices, np.full(grow * 8, np.nan)))
+                    category_bits = np.concatenate((category_bits, np.zeros((len(categories), grow), dtype=np.uint8)), axis=1)
+            row_of[record_id] = row
+            ids[row] = record_id
+            rows[row] = record
+            _set_bit(alive, row, True)
+            _set_bit(stock, row, in_stock(record))
+            _set_bit(sale, row, pricing.get(record).on_sale)
+            prices[row] = pricing.get(record).effective_price
+            for category in dict.fromkeys(record.get("categories") or ()):
+                if category not in categories:
+                    categories[category] = len(categories)
+                    category_bits = np.vstack((category_bits, np.zeros((1, category_bits.shape[1]), dtype=np.uint8)))
+                _set_bit(category_bits[categories[category]], row, True)
+
+        if len(ids) - len(row_of) > max(_GROWTH, len(row_of) // 4):
+            return self.build(records, pricing)
+        return FacetIndex(ids, rows, categories, alive, stock, sale, prices, category_bits, row_of)
+
+    # Bitset of the records in any of the categories
+    def _in_categories(self, categories: list[str]) -> np.ndarray:
+        codes: list[int] = [self.categories[category] for category in dict.fromkeys(categories) if category in self.categories]
+        if not codes:
+            return np.zeros_like(self.alive)
+        return np.bitwise_or.reduce(self.category_bits[codes], axis=0)
+
+    def _in_price_range(self, price_min: float | None, price_max: float | None) -> np.ndarray:
+        within: np.ndarray = ~np.isnan(self.prices)
+        if price_min is not None:
+            within &= self.prices >= price_min
+        if price_max is not None:
+            within &= self.prices <= price_max
+        return np.packbits(within)
+
+    # Bitset of the rows of the given IDs
+    def _rows_of(self, record_ids: list[str]) -> np.ndarray:
+        flags: np.ndarray = np.zeros(len(self.ids), dtype=bool)
+        row_of: dict[str, int] = self.row_of
+        flags[[row_of[record_id] for record_id in record_ids if record_id in row_of]] = True
+        return _packed(flags, self.alive.size)
+
+    # Rows (catalog order) matching every given facet, and the facet counts for
+    # them. Each facet is counted with all other facets applied but not itself,
+    # so the counts say what choosing it would give. within limits everything
+    # to the given IDs, e.g. the results of a search.
+    def select(self, categories: list[str] | None = None, price_min: float | None = None, price_max: float | None = None,
+               in_stock: bool = False, on_sale: bool = False, within: list[str] | None = None) -> tuple[np.ndarray, dict]:
+        everything: np.ndarray = self.alive if within is None else self.alive & self._rows_of(within)
+        category: np.ndarray = self._in_categories(categories) if categories else everything
+        price: np.ndarray = self._in_price_range(price_min, price_max) if price_min is not None or price_max is not None else everything
+        stock: np.ndarray = self.stock if in_stock else everything
+        sale: np.ndarray = self.sale if on_sale else everything
+
+        without_category: np.ndarray = everything & price & stock & sale
+        matching: np.ndarray = without_category & category
+        without_price: np.ndarray = everything & category & stock & sale
+        prices: np.ndarray = self.prices[:len(self.ids)][np.unpackbits(without_price, count=len(self.ids)).view(bool)]
+        prices = prices[~np.isnan(prices)]
+
+        category_counts: np.ndarray = np.bitwise_count(self.category_bits & without_category).sum(axis=1)
+        facets: dict = {
+            "total": _count(matching),
+            "categories": {name: int(category_counts[code]) for name, code in self.categories.items()},
+            "in_stock": _count(everything & category & price & sale & self.stock),
+            "on_sale": _count(everything & category & price & stock & self.sale),
+            "price": {"min": float(prices.min()) if prices.size else None, "max": float(prices.max()) if prices.size else None},
+        }
+        return np.flatnonzero(np.unpackbits(matching, count=len(self.ids))), facets
+
+    def ids_of(self, rows: np.ndarray) -> list[str]:
+        ids: list[str | None] = self.ids
+        return [ids[row] for row in rows.tolist()]
+
+    # The given IDs (kept in their order) that are in rows
+    def restrict(self, record_ids: list[str], rows: np.ndarray) -> list[str]:
+        matching: np.ndarray = np.zeros(len(self.ids), dtype=bool)
+        matching[rows] = True
+        row_of: dict[str, int] = self.row_of
+        return [record_id for record_id in record_ids if record_id in row_of and matching[row_of[record_id]]]
@@ -0,0 +1,101 @@
+import threading
+from collections import OrderedDict
+from typing import Callable
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+
+# =====================================
+# Template Fragment Cache
+# =====================================
+
+FRAGMENT_CACHE_SIZE: int = 4096
+
+
+# Bounded LRU cache of rendered template fragments. Keys start with the
+# fragment's name, which the hit/miss counters are kept per. The rest of the
+# key has to change whenever the fragment's output does (record revision,
+# settings version, ...); changed templates clear the whole cache.
+class FragmentCache:
+    def __init__(self, maxsize: int = FRAGMENT_CACHE_SIZE):
+        self.maxsize = maxsize
+        self.entries: OrderedDict = OrderedDict()
+        # Fragment name -> [hits, misses, bypassed]
+        self.counters: dict[str, list[int]] = {}
+        self.evictions: int = 0
+        self.lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<FragmentCache {len(self.entries)}/{self.maxsize} entries>"
+
+    def _counter(self, name: str) -> list[int]:
+        counter: list[int] | None = self.counters.get(name)
+        if counter is None:
+            counter = self.counters.setdefault(name, [0, 0, 0])
+        return counter
+
+    # The cached output for key, rendered with render() on a miss. A key with a
+    # None part (e.g. a record of an outdated snapshot) is rendered, not stored.
+    def get(self, key: tuple, render: Callable[[], str]) -> str:
+        name: str = str(key[0])
+        if any(part is None for part in key):
+            with self.lock:
+                self._counter(name)[2] += 1
+            return render()
+
+        with self.lock:
+            if key in self.entries:
+                self.entries.move_to_end(key)
+                self._counter(name)[0] += 1
+                return self.entries[key]
+            self._counter(name)[1] += 1
+
+        output: str = render()
+        with self.lock:
+            self.entries[key] = output
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+        return output
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "size": len(self.entries),
+                "maxsize": self.maxsize,
+                "evictions": self.evictions,
+                "fragments": {
+                    name: {
+                        "hits": hits,
+                        "misses": misses,
+                        "bypassed": bypassed,
+                        "hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+                    }
+                    for name, (hits, misses, bypassed) in self.counters.items()
+                },
+            }
+
+
+fragment_cache = FragmentCache()
+
+
+# {% cache "name", key, ... %}...{% endcache %}: the body is rendered once per
+# distinct ("name", key, ...) and taken from fragment_cache after that
+class FragmentCacheExtension(Extension):
+    tags = {"cache"}
+
+    def parse(self, parser) -> nodes.Node:
+        lineno: int = next(parser.stream).lineno
+        key: list[nodes.Expr] = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            key.append(parser.parse_expression())
+        body: list[nodes.Node] = parser.parse_statements(("name:endcache",), drop_needle=True)
+        return nodes.CallBlock(self.call_method("_cached", [nodes.List(key)]), [], [], body).set_lineno(lineno)
+
+    def _cached(self, key: list, caller: Callable[[], str]) -> str:
+        return fragment_cache.get(tuple(key), caller)
@@ -1,5 +1,9 @@
 from logging_utility import logger
+import functools
+import hashlib
 import re
+import threading
+from collections import OrderedDict
 from PIL import Image, ImageDraw, ImageFont, ImageFilter
 import random
 from typing import Tuple, List
@@ -47,165 +51,213 @@ def generate_captcha() -> Tuple[Image.Image, List[str]]:
     image = image.filter(ImageFilter.GaussianBlur(0.25))
     return (image, "".join(text))
 
-def convert_markdown_to_html(markdown_text: str) -> str:
-    translation_table: dict = str.maketrans({
-        "&": "&amp;",
-        "<": "&lt;",
-        ">": "&gt;",
-    })
-    
-    patterns: List[Tuple[re.Pattern, str]] = [
-        (re.compile(r'\*\*\*(.+?)\*\*\*'), r'<strong><em>\1</em></strong>'),
-        (re.compile(r'\*\*(.+?)\*\*'), r'<strong>\1</strong>'),          
-        (re.compile(r'\*(.+?)\*'), r'<em>\1</em>'),                        
-        (re.compile(r'~~(.+?)~~'), r'<s>\1</s>'),                         
-        (re.compile(r'_(.+?)_'), r'<u>\1</u>'),                               
-        (re.compile(r'\{color:(#[0-9a-fA-F]{3,6})\}(.*?)\{\/color\}', re.DOTALL), r'<div style="color:\1">\2</div>'),
-        (re.compile(r'\{align:([a-z]*)\}(.*?)\{\/align\}', re.DOTALL), r'<div style="display: block; text-align:\1">\2</div>'),
-        (re.compile(r'\[(.+?)\]\((.+?)\)'), r'<a href="\2">\1</a>'),        
-        (re.compile(r'`(.+?)`'), r'<code>\1</code>')
-    ]
-
+# =====================================
+# Markdown to HTML Conversion
+# =====================================
+
+_ESCAPE_HTML: dict = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+})
+_HEADER: re.Pattern = re.compile(r'#+')
+
+# Converted HTML by hash of the markdown text and block tag, most recently used last
+MARKDOWN_CACHE_SIZE: int = 64
+_markdown_cache: OrderedDict = OrderedDict()
+_markdown_cache_lock = threading.Lock()
+
+
+# Inline patterns in the order they are applied; later ones see the output of
+# earlier ones. Each comes with a piece of text it can't match without, so a
+# line only runs the regexes that can change it.
+@functools.lru_cache(maxsize=None)
+def _inline_patterns(block_tag: str) -> tuple[tuple[str, re.Pattern, str], ...]:
+    return (
+        ("***", re.compile(r'\*\*\*(.+?)\*\*\*'), r'<strong><em>\1</em></strong>'),
+        ("**", re.compile(r'\*\*(.+?)\*\*'), r'<strong>\1</strong>'),
+        ("*", re.compile(r'\*(.+?)\*'), r'<em>\1</em>'),
+        ("~~", re.compile(r'~~(.+?)~~'), r'<s>\1</s>'),
+        ("_", re.compile(r'_(.+?)_'), r'<u>\1</u>'),
+        ("{color:", re.compile(r'\{color:(#[0-9a-fA-F]{3,6})\}(.*?)\{\/color\}', re.DOTALL), rf'<{block_tag} style="color:\1">\2</{block_tag}>'),
+        ("{align:", re.compile(r'\{align:([a-z]*)\}(.*?)\{\/align\}', re.DOTALL), rf'<{block_tag} style="display: block; text-align:\1">\2</{block_tag}>'),
+        ("](", re.compile(r'\[(.+?)\]\((.+?)\)'), r'<a href="\2">\1</a>'),
+        ("`", re.compile(r'`(.+?)`'), r'<code>\1</code>'),
+    )
+
+
+def _render_markdown(markdown_text: str, block_tag: str) -> str:
+    patterns: tuple[tuple[str, re.Pattern, str], ...] = _inline_patterns(block_tag)
     html_output_list: List[str] = []
-
-    line_iter = iter(markdown_text.splitlines())
+    append = html_output_list.append
 
     in_codeblock: bool = False
     in_list: bool = False
     in_blockquote: bool = False
     in_html: bool = False
 
-    for line in line_iter:
-        if line.strip().startswith(r"{html}"):
+    for line in markdown_text.splitlines():
+        stripped: str = line.strip()
+        if stripped.startswith("{html}"):
             in_html = True
             continue
-        if line.strip().startswith(r"{/html}"):
+        if stripped.startswith("{/html}"):
             in_html = False
             continue
-        
+
         if in_html:
-            html_output_list.append(line)
+            append(line)
             continue
 
-        if line.strip().startswith('```'):
-            if in_codeblock:
-                html_output_list.append('</pre>')
-                in_codeblock = False
-            else:
-                html_output_list.append('<pre>')
-                in_codeblock = True
+        if stripped.startswith('```'):
+            append('</pre>' if in_codeblock else '<pre>')
+            in_codeblock = not in_codeblock
             continue
 
         if in_codeblock:
-            line = line.translate(translation_table)
-            html_output_list.append(line)
+            append(line.translate(_ESCAPE_HTML))
             continue
 
-        if in_list and not line.strip().startswith('- '):
-            html_output_list.append('</ul>')
+        if in_list and not stripped.startswith('- '):
+            append('</ul>')
             in_list = False
-        
-        if in_blockquote and not line.strip().startswith('> '):
-            html_output_list.append('</blockquote>')
+
+        if in_blockquote and not stripped.startswith('> '):
+            append('</blockquote>')
             in_blockquote = False
 
-        for pattern, replacement in patterns:
-            line = pattern.sub(replacement, line)
+        original: str = line
+        for required, pattern, replacement in patterns:
+            if required in line:
+                line = pattern.sub(replacement, line)
+        if line is not original:
+            stripped = line.strip()
 
-        if line.strip() == "":
-            html_output_list.append("<br>")
+        if stripped == "":
+            append("<br>")
             continue
 
-        if line.strip().startswith('#'):
-            header_level: int = len(re.match(r'#+', line).group(0))
-            header_content: str = line[header_level:].strip()
-            html_output_list.append(f'<h{header_level}>{header_content}</h{header_level}>')
+        if stripped.startswith('#'):
+            header_level: int = len(_HEADER.match(line).group(0))
+            append(f'<h{header_level}>{line[header_level:].strip()}</h{header_level}>')
             continue
 
-        if line.strip().startswith("---"):
-            html_output_list.append("<hr>")
+        if stripped.startswith("---"):
+            append("<hr>")
             continue
 
-        if line.strip().startswith('- '):
+        if stripped.startswith('- '):
             if not in_list:
                 in_list = True
-                html_output_list.append('<ul>')
-            html_output_list.append(f'\t<li>{line[2:].strip()}</li>')
+                append('<ul>')
+            append(f'\t<li>{line[2:].strip()}</li>')
             continue
 
-        if line.strip().startswith('> '):
+        if stripped.startswith('> '):
             if not in_blockquote:
                 in_blockquote = True
-                html_output_list.append('<blockquote>')
-            html_output_list.append(line[2:].strip())
+                append('<blockquote>')
+            append(line[2:].strip())
             continue
 
-        html_output_list.append(f'<p>{line.strip()}</p>')
+        append(f'<p>{stripped}</p>')
 
     if in_list:
-        html_output_list.append('</ul>')
+        append('</ul>')
     if in_blockquote:
-        html_output_list.append('</blockquote>')
+        append('</blockquote>')
     if in_codeblock:
-        html_output_list.append('</pre>')
+        append('</pre>')
+
+    return "\n".join(html_output_list)
+
+
+# Convert the editor's markdown to HTML. {color:} and {align:} become block_tag
+# elements (emails use <span>). The result is cached by a hash of the text, so
+# previews and saves of the same description convert it once.
+def convert_markdown_to_html(markdown_text: str, block_tag: str = "div") -> str:
+    key: tuple[bytes, str] = (hashlib.blake2b(markdown_text.encode("utf-8", "surrogatepass"), digest_size=16).digest(), block_tag)
+    with _markdown_cache_lock:
+        html_output: str | None = _markdown_cache.get(key)
+        if html_output is not None:
+            _markdown_cache.move_to_end(key)
+            return html_output
+
+    html_output = _render_markdown(markdown_text, block_tag)
+    with _markdown_cache_lock:
+        _markdown_cache[key] = html_output
+        _markdown_cache.move_to_end(key)
+        while len(_markdown_cache) > MARKDOWN_CACHE_SIZE:
+            _markdown_cache.popitem(last=False)
+    return html_output
 
-    html_output: str = "\n".join(html_output_list)
+# Sections of a format string such as "#.##0,00": text before the number,
+# integer digits, thousands separator, decimal separator, decimals, text after
+_NUMBER_FORMAT: re.Pattern = re.compile(r'^(?P<Pre_text>.*?)(?P<thousands_digits>[#0]+)(?P<thousands_separator>[^#0]*?)(?P<hundreds_digits>[#0]{1,3})(?P<decimal>[\s\S]*?)(?P<num_of_decimals>[#0]+)(?P<post_text>[\s\S]*)$')
+
+
+# A format string parsed once, so formatting a number only does the number's part.
+# Decimals are cut off after the format's places, not rounded, and trailing
+# decimals are only filled up to the last "0" of the format.
+class NumberFormat:
+    __slots__ = ("format_string", "valid", "pre_text", "thousands_separator", "decimal", "decimal_places", "pre_digits",
+                 "min_digits", "post_text")
+
+    def __init__(self, format_string: str):
+        self.format_string: str = format_string
+        match: re.Match | None = _NUMBER_FORMAT.match(format_string)
+        self.valid: bool = match is not None
+        if not match:
+            return
+
+        integer_digits: str = (match.group("thousands_digits") or "") + (match.group("hundreds_digits") or "")
+        num_of_decimals: str = match.group("num_of_decimals") or "00"
+        self.pre_text: str = match.group("Pre_text") or ""
+        self.thousands_separator: str = match.group("thousands_separator") or ""
+        self.decimal: str = match.group("decimal")
+        self.decimal_places: int = len(num_of_decimals)
+        self.pre_digits: int = max(integer_digits[::-1].rfind("0") + 1, 0)
+        self.min_digits: int = max(num_of_decimals.rfind("0") + 1, 0)
+        self.post_text: str = match.group("post_text") or ""
+
+    def __repr__(self):
+        return f"<NumberFormat {self.format_string!r}>"
+
+    def format(self, number: float | int) -> str:
+        number = float(number)
+        if not self.valid:
+            return f"{number:,.2f}"
+
+        integer_part, _, decimal_original = str(number).partition(".")
+        if number.is_integer():
+            decimal_original = ""
+        integer_part = integer_part.rjust(self.pre_digits, "0")
+
+        separator: str = self.thousands_separator
+        if separator and len(integer_part) > 3:
+            head: int = len(integer_part) % 3 or 3
+            integer_part = separator.join([integer_part[:head], *(integer_part[i:i + 3] for i in range(head, len(integer_part), 3))])
+
+        if number == 0:
+            formatted_number: str = f"{integer_part}{self.decimal}{'0' * self.min_digits}"
+        elif decimal_original or self.min_digits > 0:
+            formatted_number = f"{integer_part}{self.decimal}{decimal_original[:self.decimal_places].ljust(self.min_digits, '0')}"
+        else:
+            formatted_number = integer_part
+
+        return f"{self.pre_text}{formatted_number}{self.post_text}"
+
+    # Formats a whole listing's numbers in one call
+    def format_many(self, numbers) -> list[str]:
+        return [self.format(number) for number in numbers]
+
+
+# The compiled NumberFormat of a format string. Keyed by the string, so a new
+# format from the general settings gets its own entry.
+@functools.lru_cache(maxsize=32)
+def number_format(format_string: str) -> NumberFormat:
+    return NumberFormat(format_string)
 
-    return html_output
 
 def format_number(number: float|int, format_string: str) -> str:
-    number = float(number)
-    pattern: str = r'^(?P<Pre_text>.*?)(?P<thousands_digits>[#0]+)(?P<thousands_separator>[^#0]*?)(?P<hundreds_digits>[#0]{1,3})(?P<decimal>[\s\S]*?)(?P<num_of_decimals>[#0]+)(?P<post_text>[\s\S]*)$'
-    match: re.Match = re.match(pattern, format_string)
-
-    if not match:
-        return f"{number:,.2f}"
-
-    pre_text: str = match.group("Pre_text") or ""
-    thousands_digits: str = match.group("thousands_digits") or ""
-    hundreds_digits: str = match.group("hundreds_digits") or ""
-    thousands_separator: str = match.group("thousands_separator") or ""
-    decimal: str = match.group("decimal")
-    num_of_decimals: str = match.group("num_of_decimals") or "00"
-    post_text: str = match.group("post_text") or ""
-
-    decimal_places: int = len(num_of_decimals)
-
-    pre_digits: int = str(thousands_digits+hundreds_digits)[::-1].rfind("0") + 1
-
-    min_digits: int = str(num_of_decimals).rfind("0") + 1
-    if pre_digits < 1:
-        pre_digits = 0
-    
-    if min_digits < 1:
-        min_digits = 0
-
-    if not decimal:
-        formatted_number: str = f"{int(number)}" if number.is_integer() else f"{number:,.2f}"
-    else:
-        formatted_number: str = f"{number:,.{decimal_places}f}"
-
-    decimal_original: str = str(number).split(".")[1] if not number.is_integer() else ""
-    integer_part: str = str(number).split(".")[0].rjust(pre_digits, "0")
-
-    if not thousands_separator:
-        formatted_integer_part: str = integer_part
-    else:
-        int_str: str = ""
-        for i, char in enumerate(integer_part[::-1]):
-            if i % 3 == 0 and i != 0:
-                int_str += thousands_separator
-            int_str += char
-        formatted_integer_part = int_str[::-1]
-
-    if decimal_original or min_digits > 0:
-        formatted_number = f"{formatted_integer_part}{decimal}{decimal_original[:decimal_places].ljust(min_digits, '0')}"
-    else:
-        formatted_number = formatted_integer_part
-
-    if number == 0:
-        formatted_number = f"{formatted_integer_part}{decimal}{'0' * min_digits}"
-
-    formatted_string: str = f"{pre_text}{formatted_number}{post_text}"
-
-    return formatted_string
+    return number_format(format_string).format(number)
@@ -0,0 +1,88 @@
+from .collection import SnapshotIndex
+from .other_utils import number_format
+
+# =====================================
+# Derived Pricing
+# =====================================
+
+# Price fields that get a formatted string in Pricing.text()
+TEXT_FIELDS: tuple[str, ...] = ("price", "new_price", "effective_price", "net_price", "tax_amount")
+
+
+def _amount(value) -> float:
+    try:
+        return float(value or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+# What the storefront, cart and checkout derive from one product version.
+# Prices are gross, tax included: the customer pays new_price if it is set
+# (> 0), otherwise price.
+class Pricing:
+    __slots__ = ("record", "price", "new_price", "on_sale", "effective_price", "tax", "tax_rate", "net_price", "tax_amount",
+                 "discount_percent", "_text")
+
+    def __init__(self, record: dict):
+        self.record = record
+        self.price: float = _amount(record.get("price"))
+        self.new_price: float = _amount(record.get("new_price"))
+        self.on_sale: bool = self.new_price > 0
+        self.effective_price: float = self.new_price if self.on_sale else self.price
+        # Tax rate in percent as entered in the admin panel, and as a fraction
+        self.tax: float = _amount(record.get("tax"))
+        self.tax_rate: float = self.tax / 100
+        self.tax_amount: float = self.effective_price / (1 + self.tax_rate) * self.tax_rate
+        self.net_price: float = self.effective_price - self.tax_amount
+        self.discount_percent: int = round((1 - self.new_price / self.price) * 100) if self.on_sale and self.price > 0 else 0
+        self._text: tuple[str, dict[str, str]] | None = None
+
+    def __repr__(self):
+        return f"<Pricing {self.record.get('id')}: {self.effective_price} incl. {self.tax}% tax>"
+
+    # TEXT_FIELDS formatted with the format string, kept for the last format
+    # string since that only changes when the settings do
+    def text(self, format_string: str) -> dict[str, str]:
+        cached: tuple[str, dict[str, str]] | None = self._text
+        if cached is None or cached[0] != format_string:
+            texts: list[str] = number_format(format_string).format_many(getattr(self, field) for field in TEXT_FIELDS)
+            cached = (format_string, dict(zip(TEXT_FIELDS, texts)))
+            self._text = cached
+        return cached[1]
+
+
+# Pricing of every record, made when the catalog is loaded and afterwards only
+# for the records a write batch adds, so requests don't redo the arithmetic.
+class PricingIndex(SnapshotIndex):
+    def __init__(self, prices: dict[str, Pricing]):
+        self.prices = prices
+
+    def __repr__(self):
+        return f"<PricingIndex {len(self.prices)} records>"
+
+    @classmethod
+    def build(cls, records: tuple) -> "PricingIndex":
+        prices: dict[str, Pricing] = {}
+        for record in records:
+            record_id: str = str(record.get("id"))
+            # The first record wins if an ID appears twice, like the ID index
+            if record_id not in prices:
+                prices[record_id] = Pricing(record)
+        return cls(prices)
+
+    def updated(self, records: tuple, removed: list, added: list) -> "PricingIndex":
+        prices: dict[str, Pricing] = dict(self.prices)
+        for record in removed:
+            prices.pop(str(record.get("id")), None)
+        for record in added:
+            record_id: str = str(record.get("id"))
+            if record_id not in prices:
+                prices[record_id] = Pricing(record)
+        return PricingIndex(prices)
+
+    # Pricing of the record, computed on the spot for records of other versions
+    def get(self, record: dict) -> Pricing:
+        pricing: Pricing | None = self.prices.get(str(record.get("id")))
+        if pricing is None or pricing.record is not record:
+            return Pricing(record)
+        return pricing
@@ -0,0 +1,193 @@
+import functools
+from collections.abc import Mapping
+
+# =====================================
+# Immutable Records
+# =====================================
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError(f"{type(self).__name__} is read-only, write it through its collection instead")
+
+
+# A dict that can't be changed once created. Cached records are shared by all
+# requests, so changes have to go through the collection (or a .copy()).
+class FrozenRecord(dict):
+    __slots__ = ()
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __reduce__(self):
+        return (type(self), (dict(self),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo: dict):
+        return self
+
+
+# A FrozenRecord that only keeps its small fields in memory. The heavy ones
+# (long texts, image lists) stay in a side file and are read on access through
+# record[key], record.get() or Jinja's record.key. They are not part of len(),
+# "in" or iteration; full() returns the complete record.
+class LazyRecord(FrozenRecord):
+    __slots__ = ("source", "offset", "length")
+
+    def __init__(self, data: dict, source, offset: int, length: int):
+        super().__init__(data)
+        self.source = source
+        self.offset = offset
+        self.length = length
+
+    # The heavy fields of this record, read from the side file
+    def heavy(self) -> FrozenRecord:
+        return self.source.read(self.offset, self.length)
+
+    def __missing__(self, key):
+        if key not in self.source.fields:
+            raise KeyError(key)
+        return self.heavy()[key]
+
+    def get(self, key, default=None):
+        if dict.__contains__(self, key):
+            return dict.__getitem__(self, key)
+        if key not in self.source.fields:
+            return default
+        return self.heavy().get(key, default)
+
+    def full(self) -> FrozenRecord:
+        return FrozenRecord({**self, **self.heavy()})
+
+    def copy(self) -> dict:
+        return dict(self.full())
+
+    def __reduce__(self):
+        return (FrozenRecord, (dict(self.full()),))
+
+
+# Read-only record that keeps a fixed set of fields in __slots__ instead of a
+# per-record dict, for large catalogs. Other keys go to a small extra dict and
+# heavy fields of a LazyRecord stay in its side file. Supports the same access
+# as a FrozenRecord (record.key in Jinja, record[key], .get(), iteration), but
+# isn't a dict: use full() or copy() where one is needed (json, sessions).
+# Subclasses with the actual fields come from compact_record_type().
+class CompactRecord(Mapping):
+    __slots__ = ("_extra", "_source", "_offset", "_length")
+    fields: tuple[str, ...] = ()
+    field_set: frozenset = frozenset()
+
+    # shared deduplicates equal values (prices, tax rates, category tuples) between records
+    def __init__(self, record: dict, shared: dict | None = None):
+        extra: dict = {}
+        for key, value in record.items():
+            value = freeze(value)
+            if shared is not None:
+                try:
+                    value = shared.setdefault((type(value), value), value)
+                except TypeError:
+                    pass
+            if key in self.field_set:
+                object.__setattr__(self, key, value)
+            else:
+                extra[key] = value
+        object.__setattr__(self, "_extra", FrozenRecord(extra) if extra else None)
+
+        lazy: bool = isinstance(record, LazyRecord)
+        object.__setattr__(self, "_source", record.source if lazy else None)
+        object.__setattr__(self, "_offset", record.offset if lazy else 0)
+        object.__setattr__(self, "_length", record.length if lazy else 0)
+
+    def __getitem__(self, key):
+        if key in self.field_set:
+            try:
+                return object.__getattribute__(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        if self._source is not None and key in self._source.fields:
+            return self._source.read(self._offset, self._length)[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key) -> bool:
+        if key in self.field_set:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self):
+        for key in self.fields:
+            if hasattr(self, key):
+                yield key
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    __setattr__ = __delattr__ = _read_only
+
+    def full(self) -> FrozenRecord:
+        record: dict = dict(self.items())
+        if self._source is not None:
+            record.update(self._source.read(self._offset, self._length))
+        return FrozenRecord(record)
+
+    def copy(self) -> dict:
+        return dict(self.full())
+
+    def __reduce__(self):
+        return (FrozenRecord, (dict(self.full()),))
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo: dict):
+        return self
+
+    def __repr__(self):
+        return f"{type(self).__name__}({dict(self.items())!r})"
+
+
+# CompactRecord subclass with one slot per field (fields must be identifiers)
+@functools.lru_cache(maxsize=None)
+def compact_record_type(fields: tuple[str, ...]) -> type:
+    for field in fields:
+        if not field.isidentifier() or hasattr(CompactRecord, field):
+            raise ValueError(f"Field '{field}' can't be stored in a slot")
+    return type("CompactRecord", (CompactRecord,), {"__slots__": fields, "fields": fields, "field_set": frozenset(fields)})
+
+
+# The complete record, with the heavy fields of a LazyRecord read in
+def full_record(record: dict) -> dict:
+    if isinstance(record, (LazyRecord, CompactRecord)):
+        return record.full()
+    return record
+
+
+# Recursively turn dicts into FrozenRecords and lists into tuples
+def freeze(value):
+    if isinstance(value, (FrozenRecord, CompactRecord)):
+        return value
+    if isinstance(value, dict):
+        return FrozenRecord({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+# Mutable deep copy of a frozen value, for building the next version of it
+def thaw(value):
+    if isinstance(value, (LazyRecord, CompactRecord)):
+        value = value.full()
+    if isinstance(value, dict):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [thaw(item) for item in value]
+    return value
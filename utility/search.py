@@ -0,0 +1,805 @@
+import heapq
+import re
+import threading
+import unicodedata
+from bisect import bisect_left, insort
+from itertools import chain, compress
+from operator import itemgetter
+from typing import Callable
+
+from .collection import SnapshotIndex
+from .pricing import PricingIndex
+
+# =====================================
+# Text Folding
+# =====================================
+
+# casefold() already turns ß into ss, the umlauts get their German spelling
+_UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue"})
+_TOKEN = re.compile(r"\w+")
+
+
+# Lowercase text the way German speakers search: "Schläger" == "schlaeger", "Maß" == "mass"
+def fold(text: str) -> str:
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize("NFC", text).casefold().translate(_UMLAUTS)
+    # Other accents (é, ñ, ...) are dropped
+    return "".join(char for char in unicodedata.normalize("NFKD", text) if not unicodedata.combining(char))
+
+
+def tokenize(text: str) -> list[str]:
+    return _TOKEN.findall(fold(text))
+
+
+# Catalog position of every record after a write batch: updated records keep
+# their place, new ones go to the end
+def _reordered(order: dict[str, int], next_order: int, removed: list, added: list) -> tuple[dict[str, int], int]:
+    new_order: dict[str, int] = dict(order)
+    for record in removed:
+        new_order.pop(str(record.get("id")), None)
+    for record in added:
+        record_id: str = str(record.get("id"))
+        if record_id in order:
+            new_order[record_id] = order[record_id]
+        elif record_id not in new_order:
+            new_order[record_id] = next_order
+            next_order += 1
+    return new_order, next_order
+
+
+# =====================================
+# Full-Text Search Index
+# =====================================
+
+# Searched fields and their weight in the ranking
+SEARCH_FIELDS: dict[str, int] = {"id": 4, "name": 2, "keyword": 1}
+# How a term matched a token, multiplies the field weight: the whole token, its
+# start or somewhere inside it ("schlaeger" in "golfschlaeger")
+EXACT_MATCH: int = 4
+PREFIX_MATCH: int = 2
+INFIX_MATCH: int = 1
+# Longer queries are cut off, so a search can't take longer than these many lookups
+MAX_QUERY_LENGTH: int = 200
+MAX_QUERY_TERMS: int = 8
+# Shorter terms only match whole tokens, or whole tokens and token starts
+MIN_PREFIX_LENGTH: int = 2
+MIN_INFIX_LENGTH: int = 3
+
+
+# The terms a search actually uses, so equivalent queries share cache entries
+def query_terms(query: str) -> list[str]:
+    return tokenize(query[:MAX_QUERY_LENGTH])[:MAX_QUERY_TERMS]
+
+
+# What one query term matches: the ranked groups of the tokens it matched as
+# (score, IDs in catalog order), and their postings to score single records
+class _TermMatch:
+    __slots__ = ("groups", "postings", "size", "best")
+
+    def __init__(self, groups: list[tuple[int, tuple[str, ...]]], postings: list[tuple[int, dict[str, int]]]):
+        self.groups = groups
+        self.postings = postings
+        self.size: int = sum(len(ids) for _, ids in groups)
+        self.best: int = max((score for score, _ in groups), default=0)
+
+    # Score of every matching record
+    def scores(self) -> dict[str, int]:
+        scores: dict[str, int] = {}
+        # Lowest scores first, so every record ends up with its best
+        for score, ids in sorted(self.groups, key=itemgetter(0)):
+            scores.update(dict.fromkeys(ids, score))
+        return scores
+
+    # Score of one record for the term, 0 if it doesn't match
+    def score(self, record_id: str) -> int:
+        score: int = 0
+        for multiplier, posting in self.postings:
+            weight: int | None = posting.get(record_id)
+            if weight is not None and weight * multiplier > score:
+                score = weight * multiplier
+        return score
+
+
+# Inverted index over SEARCH_FIELDS: token -> {record ID: weight}. Every query
+# term has to match a token exactly, as its start (sorted token list) or inside
+# it (sorted suffixes of the tokens, split by first letter); records are ranked
+# by their summed score, ties keep the catalog order. No regex runs on user
+# input.
+#
+# The postings are also kept pre-ranked, as the IDs per weight in catalog order.
+# A search walks the rarest term's groups best score first and checks the other
+# terms per candidate, so with a limit it stops once no candidate left can make
+# the top results, however many records match.
+class SearchIndex(SnapshotIndex):
+    def __init__(self, postings: dict[str, dict[str, int]], ranked: dict[str, dict[int, tuple[str, ...]]], tokens: list[str],
+                 infixes: dict[str, tuple[tuple[str, str], ...]], order: dict[str, int], next_order: int):
+        self.postings = postings
+        self.ranked = ranked
+        self.tokens = tokens
+        # First letter -> sorted (suffix, token) entries
+        self.infixes = infixes
+        # Catalog position of every record, new records go to the end
+        self.order = order
+        self.next_order = next_order
+
+    def __repr__(self):
+        return f"<SearchIndex {len(self.tokens)} tokens, {len(self.order)} records>"
+
+    @staticmethod
+    def _terms(record: dict) -> dict[str, int]:
+        terms: dict[str, int] = {}
+        for field, weight in SEARCH_FIELDS.items():
+            value = record.get(field)
+            if value is None:
+                continue
+            for token in tokenize(str(value)):
+                if weight > terms.get(token, 0):
+                    terms[token] = weight
+        return terms
+
+    # Suffixes a term can match inside the token; numbers (IDs, sizes) are only
+    # matched from their start
+    @staticmethod
+    def _suffixes(token: str) -> list[tuple[str, str]]:
+        if token.isdigit():
+            return []
+        return [(token[start:], token) for start in range(1, len(token) - MIN_INFIX_LENGTH + 1)]
+
+    @classmethod
+    def build(cls, records: tuple) -> "SearchIndex":
+        postings: dict[str, dict[str, int]] = {}
+        ranked: dict[str, dict[int, list[str]]] = {}
+        order: dict[str, int] = {}
+        for record in records:
+            record_id: str = str(record.get("id"))
+            # The first record wins if an ID appears twice, like the ID index
+            if record_id in order:
+                continue
+            order[record_id] = len(order)
+            for token, weight in cls._terms(record).items():
+                postings.setdefault(token, {})[record_id] = weight
+                ranked.setdefault(token, {}).setdefault(weight, []).append(record_id)
+
+        infixes: dict[str, list[tuple[str, str]]] = {}
+        for token in postings:
+            for entry in cls._suffixes(token):
+                infixes.setdefault(entry[0][0], []).append(entry)
+        return cls(postings, {token: {weight: tuple(ids) for weight, ids in groups.items()} for token, groups in ranked.items()},
+                   sorted(postings), {letter: tuple(sorted(entries)) for letter, entries in infixes.items()}, order, len(order))
+
+    # Only the postings of tokens the batch touched are copied, IDs move in
+    # their ranked groups by binary search on the catalog position
+    def updated(self, records: tuple, removed: list, added: list) -> "SearchIndex":
+        order, next_order = _reordered(self.order, self.next_order, removed, added)
+        touched: dict[str, dict[str, int]] = {}
+        touched_groups: dict[str, dict[int, list[str]]] = {}
+
+        def posting(token: str) -> dict[str, int]:
+            if token not in touched:
+                touched[token] = dict(self.postings.get(token, {}))
+            return touched[token]
+
+        def group(token: str, weight: int) -> list[str]:
+            groups: dict[int, list[str]] = touched_groups.setdefault(token, {})
+            if weight not in groups:
+                groups[weight] = list(self.ranked.get(token, {}).get(weight, ()))
+            return groups[weight]
+
+        def unlist(token: str, weight: int, record_id: str, positions: dict[str, int]):
+            ids: list[str] = group(token, weight)
+            position: int = bisect_left(ids, positions[record_id], key=positions.__getitem__)
+            if position < len(ids) and ids[position] == record_id:
+                del ids[position]
+
+        # Every ID still listed has its old position until the removals are done
+        for record in removed:
+            record_id: str = str(record.get("id"))
+            if record_id not in self.order:
+                continue
+            for token in self._terms(record):
+                weight: int | None = posting(token).pop(record_id, None)
+                if weight is not None:
+                    unlist(token, weight, record_id, self.order)
+
+        for record in added:
+            record_id: str = str(record.get("id"))
+            for token, weight in self._terms(record).items():
+                entries: dict[str, int] = posting(token)
+                if entries.get(record_id) == weight:
+                    continue
+                if record_id in entries:
+                    unlist(token, entries[record_id], record_id, order)
+                entries[record_id] = weight
+                ids: list[str] = group(token, weight)
+                ids.insert(bisect_left(ids, order[record_id], key=order.__getitem__), record_id)
+
+        postings: dict[str, dict[str, int]] = dict(self.postings)
+        ranked: dict[str, dict[int, tuple[str, ...]]] = dict(self.ranked)
+        new_tokens: list[str] = []
+        dropped_tokens: list[str] = []
+        for token, entries in touched.items():
+            if entries:
+                if token not in postings:
+                    new_tokens.append(token)
+                postings[token] = entries
+                groups: dict[int, tuple[str, ...]] = {**self.ranked.get(token, {}), **{weight: tuple(ids) for weight, ids in touched_groups.get(token, {}).items()}}
+                ranked[token] = {weight: ids for weight, ids in groups.items() if ids}
+            elif token in postings:
+                dropped_tokens.append(token)
+                del postings[token]
+                del ranked[token]
+
+        tokens: list[str] = self.tokens
+        if new_tokens or dropped_tokens:
+            tokens = list(tokens)
+            for token in dropped_tokens:
+                del tokens[bisect_left(tokens, token)]
+            for token in new_tokens:
+                insort(tokens, token)
+        return SearchIndex(postings, ranked, tokens, self._updated_infixes(new_tokens, dropped_tokens), order, next_order)
+
+    # Only the suffix lists of the first letters of new or dropped tokens are copied
+    def _updated_infixes(self, new_tokens: list[str], dropped_tokens: list[str]) -> dict[str, tuple[tuple[str, str], ...]]:
+        touched: dict[str, list[tuple[str, str]]] = {}
+
+        def bucket(entry: tuple[str, str]) -> list[tuple[str, str]]:
+            letter: str = entry[0][0]
+            if letter not in touched:
+                touched[letter] = list(self.infixes.get(letter, ()))
+            return touched[letter]
+
+        for token in dropped_tokens:
+            for entry in self._suffixes(token):
+                entries: list[tuple[str, str]] = bucket(entry)
+                position: int = bisect_left(entries, entry)
+                if position < len(entries) and entries[position] == entry:
+                    del entries[position]
+        for token in new_tokens:
+            for entry in self._suffixes(token):
+                entries = bucket(entry)
+                position = bisect_left(entries, entry)
+                if position == len(entries) or entries[position] != entry:
+                    entries.insert(position, entry)
+
+        if not touched:
+            return self.infixes
+        infixes: dict[str, tuple[tuple[str, str], ...]] = dict(self.infixes)
+        for letter, entries in touched.items():
+            if entries:
+                infixes[letter] = tuple(entries)
+            else:
+                infixes.pop(letter, None)
+        return infixes
+
+    # The tokens a term matches, as (match multiplier, token): the term itself,
+    # the tokens starting with it and the tokens containing it
+    def _matched_tokens(self, term: str) -> list[tuple[int, str]]:
+        matched: dict[str, int] = {}
+        if term in self.postings:
+            matched[term] = EXACT_MATCH
+        if len(term) >= MIN_PREFIX_LENGTH:
+            position: int = bisect_left(self.tokens, term)
+            while position < len(self.tokens) and self.tokens[position].startswith(term):
+                matched.setdefault(self.tokens[position], PREFIX_MATCH)
+                position += 1
+        if len(term) >= MIN_INFIX_LENGTH:
+            entries: tuple[tuple[str, str], ...] = self.infixes.get(term[0], ())
+            position = bisect_left(entries, (term,))
+            while position < len(entries) and entries[position][0].startswith(term):
+                matched.setdefault(entries[position][1], INFIX_MATCH)
+                position += 1
+        return [(multiplier, token) for token, multiplier in matched.items()]
+
+    def _match(self, term: str) -> _TermMatch:
+        groups: list[tuple[int, tuple[str, ...]]] = []
+        postings: list[tuple[int, dict[str, int]]] = []
+        for multiplier, token in self._matched_tokens(term):
+            postings.append((multiplier, self.postings[token]))
+            groups.extend((weight * multiplier, ids) for weight, ids in self.ranked[token].items())
+        return _TermMatch(groups, postings)
+
+    # IDs of the matching records, best match first; only the first limit of them
+    # if given
+    def search(self, query: str, limit: int | None = None) -> list[str]:
+        terms: list[str] = query_terms(query)
+        if not terms or limit == 0:
+            return []
+        # The rarest term goes first, the others only check its records
+        matches: list[_TermMatch] = sorted((self._match(term) for term in dict.fromkeys(terms)), key=lambda match: match.size)
+        if not matches[0].size:
+            return []
+        if limit is None:
+            return self._all(matches)
+        return self._top(matches, limit)
+
+    # Every matching record, ranked
+    def _all(self, matches: list[_TermMatch]) -> list[str]:
+        order: dict[str, int] = self.order
+        lead, others = matches[0], matches[1:]
+        if not others:
+            # The groups by score, best first and each in catalog order, are the ranking already
+            levels: list = []
+            for level in sorted({score for score, _ in lead.groups}, reverse=True):
+                level_groups: list[tuple[str, ...]] = [ids for score, ids in lead.groups if score == level]
+                levels.append(level_groups[0] if len(level_groups) == 1 else sorted(chain(*level_groups), key=order.__getitem__))
+            return list(dict.fromkeys(chain.from_iterable(levels)))
+
+        scores: dict[str, int] = lead.scores()
+        for match in others:
+            if len(scores) * len(match.postings) > match.size:
+                term_scores: dict[str, int] = match.scores()
+                scores = {record_id: score + term_scores[record_id] for record_id, score in scores.items() if record_id in term_scores}
+            else:
+                next_scores: dict[str, int] = {}
+                for record_id, score in scores.items():
+                    term_score: int = match.score(record_id)
+                    if term_score:
+                        next_scores[record_id] = score + term_score
+                scores = next_scores
+            if not scores:
+                return []
+        # Both sorts are stable: catalog order first, then by score
+        ranked: list[str] = sorted(scores, key=order.__getitem__)
+        ranked.sort(key=scores.__getitem__, reverse=True)
+        return ranked
+
+    # The first limit records of the ranking. The lead term's groups are walked
+    # best score first, each in catalog order, until no record left can make it.
+    def _top(self, matches: list[_TermMatch], limit: int) -> list[str]:
+        order: dict[str, int] = self.order
+        lead, others = matches[0], matches[1:]
+        # The most the other terms can add to a record's score
+        headroom: int = sum(match.best for match in others)
+        scores: dict[str, int] = {}
+        # (score, -catalog position) of the best limit records so far, the worst first
+        best: list[tuple[int, int]] = []
+
+        for level in sorted({score for score, _ in lead.groups}, reverse=True):
+            bound: int = level + headroom
+            level_groups: list[tuple[str, ...]] = [ids for score, ids in lead.groups if score == level]
+            candidates = level_groups[0] if len(level_groups) == 1 else heapq.merge(*level_groups, key=order.__getitem__)
+            for record_id in candidates:
+                # Seen at a higher level already (a better matching token)
+                if record_id in scores:
+                    continue
+                position: int = order[record_id]
+                # The records left score at most bound and come later in the catalog
+                if len(best) == limit and (best[0][0] > bound or best[0][0] == bound and -best[0][1] < position):
+                    break
+                score: int = level
+                for match in others:
+                    term_score: int = match.score(record_id)
+                    if not term_score:
+                        break
+                    score += term_score
+                else:
+                    scores[record_id] = score
+                    if len(best) < limit:
+                        heapq.heappush(best, (score, -position))
+                    elif (score, -position) > best[0]:
+                        heapq.heapreplace(best, (score, -position))
+                    continue
+                # Rejected records are remembered too, so they aren't checked again
+                scores[record_id] = 0
+            else:
+                continue
+            break
+
+        ranked: list[str] = sorted((record_id for record_id, score in scores.items() if score), key=order.__getitem__)
+        ranked.sort(key=scores.__getitem__, reverse=True)
+        return ranked[:limit]
+
+
+# =====================================
+# Listing Indexes
+# =====================================
+
+# Listing keys besides ("category", <name>)
+FEATURED: tuple = ("featured",)
+IN_STOCK: tuple = ("in_stock",)
+
+
+def in_stock(record: dict) -> bool:
+    try:
+        return float(record.get("amount") or 0) > 0
+    except (TypeError, ValueError):
+        return False
+
+
+# Listing key -> IDs of the records under it, in catalog order: one list per
+# category, the featured products and the products in stock. A category page
+# or the featured strip reads its list directly, combined filters intersect
+# the lists starting from the shortest, so the work follows the result size
+# instead of the catalog size. A write batch only copies the lists it touched
+# and moves single IDs in them by binary search on the catalog position.
+class ListingIndex(SnapshotIndex):
+    def __init__(self, lists: dict[tuple, tuple[str, ...]], order: dict[str, int], next_order: int):
+        self.lists = lists
+        self.order = order
+        self.next_order = next_order
+        # Set versions of the lists, made on first use
+        self.sets: dict[tuple, frozenset[str]] = {}
+
+    def __repr__(self):
+        return f"<ListingIndex {len(self.lists)} lists, {len(self.order)} records>"
+
+    @staticmethod
+    def _keys(record: dict) -> list[tuple]:
+        keys: list[tuple] = [("category", category) for category in dict.fromkeys(record.get("categories") or ())]
+        if record.get("featured"):
+            keys.append(FEATURED)
+        if in_stock(record):
+            keys.append(IN_STOCK)
+        return keys
+
+    @classmethod
+    def build(cls, records: tuple) -> "ListingIndex":
+        lists: dict[tuple, list[str]] = {}
+        order: dict[str, int] = {}
+        for record in records:
+            record_id: str = str(record.get("id"))
+            # The first record wins if an ID appears twice, like the ID index
+            if record_id in order:
+                continue
+            order[record_id] = len(order)
+            for key in cls._keys(record):
+                lists.setdefault(key, []).append(record_id)
+        return cls({key: tuple(ids) for key, ids in lists.items()}, order, len(order))
+
+    def updated(self, records: tuple, removed: list, added: list) -> "ListingIndex":
+        order, next_order = _reordered(self.order, self.next_order, removed, added)
+        touched: dict[tuple, list[str]] = {}
+
+        def listing(key: tuple) -> list[str]:
+            if key not in touched:
+                touched[key] = list(self.lists.get(key, ()))
+            return touched[key]
+
+        # Every ID still listed has its old position until the removals are done
+        for record in removed:
+            record_id: str = str(record.get("id"))
+            if record_id not in self.order:
+                continue
+            for key in self._keys(record):
+                ids: list[str] = listing(key)
+                position: int = bisect_left(ids, self.order[record_id], key=self.order.__getitem__)
+                if position < len(ids) and ids[position] == record_id:
+                    del ids[position]
+        for record in added:
+            record_id: str = str(record.get("id"))
+            for key in self._keys(record):
+                ids: list[str] = listing(key)
+                position: int = bisect_left(ids, order[record_id], key=order.__getitem__)
+                if position == len(ids) or ids[position] != record_id:
+                    ids.insert(position, record_id)
+
+        lists: dict[tuple, tuple[str, ...]] = dict(self.lists)
+        for key, ids in touched.items():
+            if ids:
+                lists[key] = tuple(ids)
+            else:
+                lists.pop(key, None)
+        return ListingIndex(lists, order, next_order)
+
+    def members(self, key: tuple) -> frozenset[str]:
+        members: frozenset[str] | None = self.sets.get(key)
+        if members is None:
+            members = self.sets[key] = frozenset(self.lists.get(key, ()))
+        return members
+
+    # IDs listed under every key, in catalog order, or the candidates (kept in
+    # their order) that are
+    def ids(self, keys: list[tuple], candidates: list[str] | None = None) -> list[str]:
+        if not keys:
+            return list(candidates or [])
+        if candidates is None:
+            keys = sorted(keys, key=lambda key: len(self.lists.get(key, ())))
+            candidates, keys = list(self.lists.get(keys[0], ())), keys[1:]
+        for key in keys:
+            if not candidates:
+                break
+            members: frozenset[str] = self.members(key)
+            candidates = [record_id for record_id in candidates if record_id in members]
+        return candidates
+
+
+# =====================================
+# Sort Orders
+# =====================================
+
+# Sort rank of missing values (None, ""), they always go last
+MISSING: int = 2
+
+
+# Sort key for any field value: numbers before text, missing values last,
+# so mixed None/float/str fields sort instead of raising TypeError
+def sort_value(value) -> tuple:
+    if value is None or value == "":
+        return (MISSING,)
+    if isinstance(value, (int, float)):
+        return (0, value)
+    return (1, fold(str(value)))
+
+
+# Sort key functions of the presorted orderings besides "effective_price" (from
+# the pricing index) and "newest" (catalog position)
+SORT_FIELDS: dict[str, Callable[[dict], tuple]] = {
+    "price": lambda record: sort_value(record.get("price")),
+    "name": lambda record: sort_value(record.get("name")),
+}
+SORT_ORDERINGS: tuple[str, ...] = (*SORT_FIELDS, "effective_price", "newest")
+
+
+# Items in key order; descending only reverses the present values, missing ones stay last
+def _directed(ordered: list, key: Callable, ascending: bool) -> list:
+    if ascending:
+        return ordered
+    split: int = bisect_left(ordered, (MISSING,), key=key)
+    return ordered[:split][::-1] + ordered[split:]
+
+
+def sort_records(records: list, field: str, ascending: bool = True) -> list:
+    key: Callable = lambda record: sort_value(record.get(field))
+    return _directed(sorted(records, key=key), key, ascending)
+
+
+# One presorted ordering: the records in order, their IDs and how many records
+# have a value (the missing ones come after them)
+class _Ordering:
+    __slots__ = ("records", "ids", "present", "_rank")
+
+    def __init__(self, records: tuple, ids: tuple[str, ...], present: int):
+        self.records = records
+        self.ids = ids
+        self.present = present
+        self._rank: dict[str, int] | None = None
+
+    # Position of every ID, made on first use so write batches don't pay for it
+    def rank(self) -> dict[str, int]:
+        if self._rank is None:
+            self._rank = dict(zip(self.ids, range(len(self.ids))))
+        return self._rank
+
+
+# Results with at least this share of the catalog are picked out of the
+# presorted order (one pass over it) instead of sorting their positions
+SORT_FILTER_SHARE: float = 0.2
+
+
+# Presorted orderings of the records for SORT_ORDERINGS, ties keep the catalog
+# order. A filtered result is put in order by sorting the integer positions of
+# its IDs, so no query compares field values again; a large one by marking its
+# positions in a bitset and taking the marked records in order. Each ordering is
+# built on its first use and after that kept up to date by every write batch.
+class SortIndex(SnapshotIndex):
+    uses = ("pricing",)
+
+    def __init__(self, records: tuple, order: dict[str, int], next_order: int, pricing: PricingIndex,
+                 orderings: dict[str, _Ordering] | None = None):
+        self.records = records
+        self.pricing = pricing
+        self.order = order
+        self.next_order = next_order
+        self.orderings: dict[str, _Ordering] = dict(orderings or {})
+        self.lock = threading.Lock()
+
+    def __repr__(self):
+        return f"<SortIndex {', '.join(self.orderings) or 'no orderings'} built, {len(self.order)} records>"
+
+    def _key(self, name: str, record: dict, position: int) -> tuple:
+        if name == "newest":
+            return (0, -position)
+        if name == "effective_price":
+            return (*sort_value(self.pricing.get(record).effective_price), position)
+        return (*SORT_FIELDS[name](record), position)
+
+    @classmethod
+    def build(cls, records: tuple, pricing: PricingIndex) -> "SortIndex":
+        order: dict[str, int] = {}
+        for record in records:
+            # The first record wins if an ID appears twice, like the ID index
+            order.setdefault(str(record.get("id")), len(order))
+        return cls(records, order, len(order), pricing)
+
+    def ordering(self, name: str) -> _Ordering:
+        ordering: _Ordering | None = self.orderings.get(name)
+        if ordering is not None:
+            return ordering
+
+        with self.lock:
+            if name not in self.orderings:
+                entries: list[tuple] = []
+                seen: set[str] = set()
+                for record in self.records:
+                    record_id: str = str(record.get("id"))
+                    if record_id not in seen:
+                        seen.add(record_id)
+                        entries.append((self._key(name, record, self.order[record_id]), record_id, record))
+                entries.sort(key=itemgetter(0))
+                present: int = bisect_left(entries, (MISSING,), key=itemgetter(0))
+                self.orderings[name] = _Ordering(tuple(entry[2] for entry in entries), tuple(entry[1] for entry in entries), present)
+            return self.orderings[name]
+
+    # Only orderings built so far are carried over, records move by binary search
+    def updated(self, records: tuple, removed: list, added: list, pricing: PricingIndex) -> "SortIndex":
+        order, next_order = _reordered(self.order, self.next_order, removed, added)
+        removed_ids: set[str] = {str(record.get("id")) for record in removed}
+        index: SortIndex = SortIndex(records, order, next_order, pricing)
+        for name, old in list(self.orderings.items()):
+            sorted_records: list = list(old.records)
+            ids: list[str] = list(old.ids)
+            present: int = old.present
+            old_rank: dict[str, int] = old.rank()
+            for position in sorted((old_rank[record_id] for record_id in removed_ids if record_id in old_rank), reverse=True):
+                del sorted_records[position]
+                del ids[position]
+                present -= position < old.present
+
+            key: Callable = lambda record: index._key(name, record, order[str(record.get("id"))])
+            inserted: set[str] = set()
+            for record in added:
+                record_id: str = str(record.get("id"))
+                if record_id in inserted or (record_id in old_rank and record_id not in removed_ids):
+                    continue
+                inserted.add(record_id)
+                position: int = bisect_left(sorted_records, key(record), key=key)
+                sorted_records.insert(position, record)
+                ids.insert(position, record_id)
+                present += key(record)[0] != MISSING
+            index.orderings[name] = _Ordering(tuple(sorted_records), tuple(ids), present)
+        return index
+
+    # The records with the given IDs (all records if None) in the given ordering
+    def sort(self, name: str, record_ids: list[str] | None = None, ascending: bool = True) -> list:
+        ordering: _Ordering = self.ordering(name)
+        sorted_records: tuple = ordering.records
+        if record_ids is None:
+            if ascending:
+                return list(sorted_records)
+            return [*sorted_records[:ordering.present][::-1], *sorted_records[ordering.present:]]
+
+        rank: dict[str, int] = ordering.rank()
+        if len(record_ids) >= len(sorted_records) * SORT_FILTER_SHARE:
+            marked: bytearray = bytearray(len(sorted_records))
+            for position in map(rank.__getitem__, record_ids):
+                marked[position] = 1
+            if ascending:
+                return list(compress(sorted_records, marked))
+            present: list = list(compress(sorted_records[:ordering.present], marked[:ordering.present]))
+            present.reverse()
+            return present + list(compress(sorted_records[ordering.present:], marked[ordering.present:]))
+
+        positions: list[int] = sorted(map(rank.__getitem__, record_ids))
+        if not ascending:
+            split: int = bisect_left(positions, ordering.present)
+            positions = positions[:split][::-1] + positions[split:]
+        return list(map(sorted_records.__getitem__, positions))
+
+
+# =====================================
+# Search Suggestions
+# =====================================
+
+SUGGEST_LIMIT: int = 8
+MAX_SUGGEST_LIMIT: int = 20
+# Words kept per suggestion key, longer inputs only match on their first words
+SUGGEST_KEY_WORDS: int = 6
+
+
+# Sorted-array prefix index for search-as-you-type. Every product name is kept
+# once per word, as the folded words from that word on ("driver st g " for
+# "Mizuno Driver ST-G"), and the keywords the same way. Typed text is folded
+# the same way and found with one binary search; the matches are the entries
+# right after it, so a lookup costs O(log n + limit) however short the input
+# is. Names matching from their first word come first, then names matching
+# from a later word, then keywords.
+#
+# The sorted arrays are split by tier and first letter, so a write batch only
+# copies the few arrays its records are in. They are built on the first lookup.
+class SuggestIndex(SnapshotIndex):
+    TIERS: int = 3
+
+    def __init__(self, records: tuple, buckets: dict[tuple[int, str], list[tuple[str, str]]] | None = None):
+        self.records = records
+        # (tier, first letter) -> sorted (key, record ID) entries
+        self.buckets = buckets
+        self.lock = threading.Lock()
+
+    def __repr__(self):
+        if self.buckets is None:
+            return f"<SuggestIndex not built, {len(self.records)} records>"
+        return f"<SuggestIndex {sum(len(entries) for entries in self.buckets.values())} entries>"
+
+    @staticmethod
+    def _entries(record: dict) -> set[tuple[int, str]]:
+        entries: set[tuple[int, str]] = set()
+        words: list[str] = tokenize(str(record.get("name") or ""))
+        for start in range(len(words)):
+            entries.add((0 if start == 0 else 1, " ".join(words[start:start + SUGGEST_KEY_WORDS]) + " "))
+        words = tokenize(str(record.get("keyword") or ""))
+        for start in range(len(words)):
+            entries.add((2, " ".join(words[start:start + SUGGEST_KEY_WORDS]) + " "))
+        return entries
+
+    @classmethod
+    def build(cls, records: tuple) -> "SuggestIndex":
+        return cls(records)
+
+    def _built(self) -> dict[tuple[int, str], list[tuple[str, str]]]:
+        if self.buckets is not None:
+            return self.buckets
+
+        with self.lock:
+            if self.buckets is None:
+                buckets: dict[tuple[int, str], list[tuple[str, str]]] = {}
+                seen: set[str] = set()
+                for record in self.records:
+                    record_id: str = str(record.get("id"))
+                    # The first record wins if an ID appears twice, like the ID index
+                    if record_id in seen:
+                        continue
+                    seen.add(record_id)
+                    for tier, key in self._entries(record):
+                        buckets.setdefault((tier, key[0]), []).append((key, record_id))
+                for entries in buckets.values():
+                    entries.sort()
+                self.buckets = buckets
+            return self.buckets
+
+    # Entries of the batch are removed and inserted by binary search
+    def updated(self, records: tuple, removed: list, added: list) -> "SuggestIndex":
+        if self.buckets is None:
+            return SuggestIndex(records)
+        buckets: dict[tuple[int, str], list[tuple[str, str]]] = dict(self.buckets)
+        copied: set[tuple[int, str]] = set()
+
+        def bucket(tier: int, key: str) -> list[tuple[str, str]]:
+            name: tuple[int, str] = (tier, key[0])
+            if name not in copied:
+                copied.add(name)
+                buckets[name] = list(buckets.get(name, ()))
+            return buckets[name]
+
+        for record in removed:
+            record_id: str = str(record.get("id"))
+            for tier, key in self._entries(record):
+                entries: list[tuple[str, str]] = bucket(tier, key)
+                position: int = bisect_left(entries, (key, record_id))
+                if position < len(entries) and entries[position] == (key, record_id):
+                    del entries[position]
+
+        for record in added:
+            record_id: str = str(record.get("id"))
+            for tier, key in self._entries(record):
+                entries: list[tuple[str, str]] = bucket(tier, key)
+                position: int = bisect_left(entries, (key, record_id))
+                if position == len(entries) or entries[position] != (key, record_id):
+                    entries.insert(position, (key, record_id))
+
+        return SuggestIndex(records, buckets)
+
+    # IDs of up to limit records whose name or keywords start with the typed text
+    def suggest(self, query: str, limit: int = SUGGEST_LIMIT) -> list[str]:
+        words: list[str] = tokenize(query[:MAX_QUERY_LENGTH])
+        if not words or limit <= 0:
+            return []
+        prefix: str = " ".join(words[:SUGGEST_KEY_WORDS])
+        # A finished word only matches whole words
+        if not query[-1:].isalnum() or len(words) > SUGGEST_KEY_WORDS:
+            prefix += " "
+
+        buckets: dict[tuple[int, str], list[tuple[str, str]]] = self._built()
+        matches: dict[str, None] = {}
+        for tier in range(self.TIERS):
+            entries: list[tuple[str, str]] = buckets.get((tier, prefix[0]), [])
+            position: int = bisect_left(entries, (prefix,))
+            while position < len(entries) and len(matches) < limit:
+                key, record_id = entries[position]
+                if not key.startswith(prefix):
+                    break
+                matches[record_id] = None
+                position += 1
+            if len(matches) >= limit:
+                break
+        return list(matches)
@@ -0,0 +1,922 @@
+import contextlib
+import functools
+import glob
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from logging_utility import logger
+from .records import FrozenRecord, LazyRecord, freeze, full_record
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: no locks between processes, a data directory belongs to one process
+    fcntl = None
+
+# =====================================
+# Storage Configuration
+# =====================================
+
+DATA_DIR: str = "data"
+SETTINGS_FILE: str = os.path.join(DATA_DIR, "settings.json")
+
+# Every record collection and the JSON file it is stored in
+COLLECTIONS: dict[str, str] = {
+    "products": "products.json",
+    "coupons": "coupons.json",
+    "orders": "orders.json",
+    "contact": "contact.json",
+    "events": "events.json",
+}
+
+# Large fields that listings never show. With binary snapshots they stay on disk
+# until a record's detail page or editor asks for them.
+LAZY_FIELDS: dict[str, tuple[str, ...]] = {
+    "products": ("description", "raw_description", "images"),
+}
+
+# Fields kept in slots when compact_records is on (see CompactRecord)
+COMPACT_FIELDS: dict[str, tuple[str, ...]] = {
+    "products": ("id", "name", "price", "new_price", "tax", "amount", "thumbnail",
+                 "featured", "categories", "availability", "keyword"),
+}
+
+DEFAULT_STORAGE_CONFIG: dict = {
+    "backend": "json",
+    "sqlite_path": os.path.join(DATA_DIR, "store.sqlite3"),
+    "journal": [],
+    "journal_max_bytes": 1024 * 1024,
+    "check_interval": 2.0,
+    "batch_window": 0.002,
+    "binary_snapshots": True,
+    "compact_records": False,
+}
+
+# Bumped whenever the layout of the binary snapshot files changes
+BINARY_FORMAT: str = "simple-store-snapshot/2"
+
+
+# Read the "storage" block of settings.json (settings always stay in JSON), or
+# take it from settings that were already read
+def read_storage_config(settings: dict | None = None) -> dict:
+    config: dict = dict(DEFAULT_STORAGE_CONFIG)
+    if settings is None:
+        try:
+            with open(SETTINGS_FILE, "r", encoding="utf-8") as file:
+                settings = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            logger.warning("Could not read storage config from settings.json, using defaults.")
+            return config
+    config.update(settings.get("storage", {}))
+    return config
+
+
+# Cheap change marker for a file: (mtime, size, inode) or None if it doesn't exist.
+# Changes whenever the file is rewritten in place or replaced.
+def file_signature(path: str) -> tuple | None:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+# Lock file next to the data, so writers in other worker processes wait as well.
+# An flock belongs to the open file, which all threads of a process share: it
+# is only taken with a threading lock held around it.
+class FileLock:
+    def __init__(self, path: str):
+        self.path = path
+        self.file = None
+
+    @contextlib.contextmanager
+    def hold(self, shared: bool = False):
+        if fcntl is None:
+            yield
+            return
+        if self.file is None:
+            self.file = open(self.path, "a")
+        fcntl.flock(self.file.fileno(), fcntl.LOCK_SH if shared else fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(self.file.fileno(), fcntl.LOCK_UN)
+
+
+# =====================================
+# Storage Backends
+# =====================================
+
+# Interface every storage engine implements. Records are plain dicts and are
+# identified by their "id" field, exactly like in the JSON files.
+class StorageBackend:
+    name: str = "base"
+    # Seconds between checks whether another process changed the data (negative disables them)
+    check_interval: float = DEFAULT_STORAGE_CONFIG["check_interval"]
+    # Seconds the collection writer waits to collect more writes into one batch
+    batch_window: float = DEFAULT_STORAGE_CONFIG["batch_window"]
+    # Keep records of the COMPACT_FIELDS collections as CompactRecords in memory
+    compact_records: bool = DEFAULT_STORAGE_CONFIG["compact_records"]
+
+    def load(self, collection: str) -> list[dict]:
+        raise NotImplementedError
+
+    # Value that changes whenever the stored collection changes, None if unknown
+    def signature(self, collection: str) -> tuple | None:
+        return None
+
+    def insert(self, collection: str, record: dict):
+        raise NotImplementedError
+
+    # Merge data into the first record with the given ID, returns False if there is none
+    def update(self, collection: str, record_id: str, data: dict) -> bool:
+        raise NotImplementedError
+
+    # Remove every record with the given ID, returns False if there was none
+    def delete(self, collection: str, record_id: str) -> bool:
+        raise NotImplementedError
+
+    # Replace the whole collection (imports)
+    def replace(self, collection: str, records: list[dict]):
+        raise NotImplementedError
+
+    # Persist a batch of already validated operations ("insert", record), ("update", id, data)
+    # and ("delete", id) at once. records is the full collection after the batch, for
+    # engines that always rewrite everything.
+    def apply(self, collection: str, ops: list[tuple], records: list[dict]):
+        for op in ops:
+            if op[0] == "insert":
+                self.insert(collection, op[1])
+            elif op[0] == "update":
+                self.update(collection, op[1], op[2])
+            elif op[0] == "delete":
+                self.delete(collection, op[1])
+
+    # Held by a collection from checking for changes of other processes to storing
+    # its batch. Engines that store the whole collection at once make writers in
+    # other processes wait here; the others apply batches as changes and need none.
+    def write_lock(self, collection: str):
+        return contextlib.nullcontext()
+
+    def __repr__(self):
+        return f"<{type(self).__name__} name={self.name}>"
+
+
+# Pickled heavy fields of a collection, one blob per record, found by offset.
+# The file is opened right away and kept open, so snapshots that still point
+# into it stay readable after a newer side file replaced it.
+class _SideFile:
+    def __init__(self, path: str, fields: tuple[str, ...]):
+        self.path = path
+        self.fields = fields
+        self.file = open(path, "rb")
+        self.lock = threading.Lock()
+        # The product page reads several heavy fields of the same record
+        self.read = functools.lru_cache(maxsize=64)(self._read)
+
+    def _read(self, offset: int, length: int) -> FrozenRecord:
+        with self.lock:
+            self.file.seek(offset)
+            data: bytes = self.file.read(length)
+        return pickle.loads(data)
+
+    def __del__(self):
+        self.file.close()
+
+
+# The original engine: one pretty printed JSON file per collection.
+#
+# Next to every JSON file it keeps a pickled copy of the (frozen) records,
+# stamped with the signature of the JSON file it was made from. Loading it
+# skips parsing and freezing the JSON, which is most of a cold start with a
+# large catalog. It is rewritten with every write; a stamp that doesn't match
+# (the JSON was edited by hand or compacted) makes load fall back to the JSON
+# and write a fresh copy. The JSON file stays the source of truth.
+#
+# The LAZY_FIELDS of a collection go to a side file instead, and load returns
+# LazyRecords that read them from there on access.
+class JsonStorage(StorageBackend):
+    name = "json"
+    binary_snapshots: bool = DEFAULT_STORAGE_CONFIG["binary_snapshots"]
+
+    def __init__(self, data_dir: str = DATA_DIR):
+        self.data_dir = data_dir
+        self.write_locks: dict[str, tuple[threading.Lock, FileLock]] = {}
+
+    def path(self, collection: str) -> str:
+        return os.path.join(self.data_dir, COLLECTIONS[collection])
+
+    def binary_path(self, collection: str) -> str:
+        return os.path.join(self.data_dir, f"{collection}.bin")
+
+    def load(self, collection: str) -> list[dict]:
+        if self.binary_snapshots:
+            records: list[dict] | None = self._read_binary(collection)
+            if records is not None:
+                return records
+
+        # Taken before reading, so the stamp can't claim a newer file than was read
+        signature: tuple | None = file_signature(self.path(collection))
+        records = self._read_json(collection)
+        if self.binary_snapshots:
+            self._write_binary(collection, records, signature)
+            # Read back right away, so the heavy fields don't stay in memory
+            if collection in LAZY_FIELDS:
+                return self._read_binary(collection) or records
+        return records
+
+    def _read_json(self, collection: str) -> list[dict]:
+        with open(self.path(collection), "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    # The pickled records, or None if there are none for the current JSON file
+    def _read_binary(self, collection: str) -> list[dict] | None:
+        try:
+            with open(self.binary_path(collection), "rb") as file:
+                header: tuple = pickle.load(file)
+                if header[:2] != (BINARY_FORMAT, file_signature(self.path(collection))):
+                    return None
+                records: list = pickle.load(file)
+
+            side_name: str | None = header[2]
+            if side_name is None:
+                return records
+            side_file = _SideFile(os.path.join(self.data_dir, side_name), LAZY_FIELDS[collection])
+            return [LazyRecord(record, side_file, offset, length) for record, offset, length in records]
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable binary snapshot of '{collection}': {e}")
+            return None
+
+    def _write_binary(self, collection: str, records: list[dict], signature: tuple | None):
+        path: str = self.binary_path(collection)
+        temp_path: str = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        side_name: str | None = None
+        try:
+            if collection in LAZY_FIELDS:
+                # A new name every time, readers of the old one keep their open file
+                side_name = f"{collection}.{time.time_ns()}.{os.getpid()}.heavy"
+                records = self._write_side_file(os.path.join(self.data_dir, side_name), LAZY_FIELDS[collection], records)
+            else:
+                records = [freeze(record) for record in records]
+
+            with open(temp_path, "wb") as file:
+                pickle.dump((BINARY_FORMAT, signature, side_name), file, protocol=5)
+                pickle.dump(records, file, protocol=5)
+            os.replace(temp_path, path)
+        except Exception as e:
+            logger.warning(f"Could not write binary snapshot of '{collection}': {e}")
+            if side_name is not None and os.path.exists(os.path.join(self.data_dir, side_name)):
+                os.remove(os.path.join(self.data_dir, side_name))
+            return
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        if side_name is not None:
+            self._remove_side_files(collection, keep=side_name)
+
+    # Move the heavy fields of every record into a side file, returns (slim record, offset, length) tuples
+    @staticmethod
+    def _write_side_file(path: str, fields: tuple[str, ...], records: list[dict]) -> list[tuple]:
+        slim_records: list[tuple] = []
+        with open(path, "wb") as file:
+            for record in records:
+                record = full_record(record)
+                slim: dict = {key: value for key, value in record.items() if key not in fields}
+                data: bytes = pickle.dumps(freeze({key: record[key] for key in fields if key in record}), protocol=5)
+                slim_records.append((freeze(slim), file.tell(), len(data)))
+                file.write(data)
+        return slim_records
+
+    # Old side files can't be removed while open on some systems, they go on a later write
+    def _remove_side_files(self, collection: str, keep: str | None):
+        for path in glob.glob(os.path.join(self.data_dir, f"{collection}.*.heavy")):
+            if os.path.basename(path) == keep:
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def signature(self, collection: str) -> tuple | None:
+        return file_signature(self.path(collection))
+
+    # Every write rewrites the file from what was read, so writers in other
+    # processes take turns through data/<file>.lock
+    @contextlib.contextmanager
+    def write_lock(self, collection: str):
+        lock, file_lock = self.write_locks.setdefault(collection, (threading.Lock(), FileLock(self.path(collection) + ".lock")))
+        with lock, file_lock.hold():
+            yield
+
+    def insert(self, collection: str, record: dict):
+        with self.write_lock(collection):
+            records: list[dict] = self._read_json(collection)
+            records.append(record)
+            self.replace(collection, records)
+
+    def update(self, collection: str, record_id: str, data: dict) -> bool:
+        with self.write_lock(collection):
+            records: list[dict] = self._read_json(collection)
+            for record in records:
+                if record.get("id") == str(record_id):
+                    record.update(data)
+                    self.replace(collection, records)
+                    return True
+            return False
+
+    def delete(self, collection: str, record_id: str) -> bool:
+        with self.write_lock(collection):
+            records: list[dict] = self._read_json(collection)
+            remaining: list[dict] = [record for record in records if record.get("id") != str(record_id)]
+            self.replace(collection, remaining)
+            return len(remaining) != len(records)
+
+    # Written to a temp file and swapped in, so readers never see a half written file
+    def replace(self, collection: str, records: list[dict]):
+        path: str = self.path(collection)
+        temp_path: str = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        records = [full_record(record) for record in records]
+        try:
+            with open(temp_path, "w", encoding="utf-8") as file:
+                json.dump(records, file, indent=4, ensure_ascii=False)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_path, path)
+            signature: tuple | None = file_signature(path)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        if self.binary_snapshots:
+            self._write_binary(collection, records, signature)
+
+    # The whole batch costs one file write
+    def apply(self, collection: str, ops: list[tuple], records: list[dict]):
+        self.replace(collection, records)
+
+
+# State of one append-only journal (data/<collection>.journal)
+class _Journal:
+    def __init__(self, path: str):
+        self.path = path
+        self.file = None
+        self.size: int = os.path.getsize(path) if os.path.exists(path) else 0
+        self.written: int = 0
+        self.synced: int = 0
+        self.ids: dict[str, int] | None = None
+        # Journal signature the ID counts are up to date with, see JournalStorage._ids()
+        self.known: tuple | None = None
+        # Append handles of journals another process rotated, fsynced and closed by the next sync
+        self.retired: list = []
+        self.compacting: bool = False
+        self.lock = threading.Lock()
+        self.sync_lock = threading.Lock()
+        # Held by a compaction from start to end and by replace, so a compaction
+        # never publishes a snapshot folded from records a replace threw away
+        self.compact_lock = threading.Lock()
+        # The same for all processes: file_lock with lock (appends, rotation,
+        # loads), compact_file_lock with compact_lock
+        self.file_lock = FileLock(path + ".lock")
+        self.compact_file_lock = FileLock(path + ".compact.lock")
+
+    # The append handle. Another process may have rotated the journal since it
+    # was opened, then the file at path is a new one and is opened instead.
+    # Called with file_lock held.
+    def open(self):
+        if self.file is not None:
+            try:
+                current: int | None = os.stat(self.path).st_ino
+            except FileNotFoundError:
+                current = None
+            if current != os.fstat(self.file.fileno()).st_ino:
+                self.retired.append(self.file)
+                self.file = None
+        if self.file is None:
+            self._truncate_torn_tail()
+            self.file = open(self.path, "ab")
+        return self.file
+
+    # Called with sync_lock and lock held, after everything written was fsynced
+    def close(self):
+        for file in [*self.retired, self.file]:
+            if file is not None:
+                file.close()
+        self.retired = []
+        self.file = None
+
+    # A crash in the middle of an append leaves a partial last line, cut it off
+    # before new lines are written behind it
+    def _truncate_torn_tail(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "rb+") as file:
+            data: bytes = file.read()
+            if data and not data.endswith(b"\n"):
+                file.truncate(data.rfind(b"\n") + 1)
+                self.size = data.rfind(b"\n") + 1
+                logger.warning(f"Truncated incomplete last line of {self.path}.")
+
+
+# JSON engine with journal mode for write-hot collections (orders, contact requests).
+# Every write appends one NDJSON line to data/<collection>.journal instead of rewriting
+# the JSON file, reads replay the JSON snapshot plus the journal, and a background
+# compaction folds the journal into a new snapshot once it passes journal_max_bytes.
+# Worker processes sharing the data directory take the journal's lock files
+# around appends, loads, rotation and publishing (see _Journal).
+class JournalStorage(JsonStorage):
+    name = "json+journal"
+
+    def __init__(self, data_dir: str = DATA_DIR, journaled: list[str] | None = None,
+                 max_bytes: int = DEFAULT_STORAGE_CONFIG["journal_max_bytes"]):
+        super().__init__(data_dir)
+        self.max_bytes = max_bytes
+        self.journals: dict[str, _Journal] = {}
+        for collection in journaled or []:
+            if collection not in COLLECTIONS:
+                logger.error(f"Unknown collection '{collection}' in journal config, ignoring it.")
+                continue
+            self.journals[collection] = _Journal(self.journal_path(collection))
+            self._recover(collection)
+
+    def journal_path(self, collection: str) -> str:
+        return os.path.join(self.data_dir, f"{collection}.journal")
+
+    # Finish a compaction that was interrupted between writing and publishing the snapshot
+    def _recover(self, collection: str):
+        journal: _Journal = self.journals[collection]
+        snapshot_tmp: str = self.path(collection) + ".tmp"
+        applied: str = journal.path + ".applied"
+        # Waits for a compaction another process is running
+        with journal.compact_lock, journal.compact_file_lock.hold(), journal.lock, journal.file_lock.hold():
+            if os.path.exists(applied):
+                if os.path.exists(snapshot_tmp):
+                    os.replace(snapshot_tmp, self.path(collection))
+                os.remove(applied)
+                logger.warning(f"Recovered interrupted compaction of '{collection}'.")
+            elif os.path.exists(snapshot_tmp):
+                os.remove(snapshot_tmp)
+
+    @staticmethod
+    def _replay(records: list[dict], data: bytes) -> list[dict]:
+        lines: list[bytes] = data.splitlines()
+        for number, line in enumerate(lines):
+            try:
+                entry: dict = json.loads(line)
+            except json.JSONDecodeError:
+                # A torn last line is a write that never returned, anything else is corruption
+                if number == len(lines) - 1:
+                    logger.warning("Ignoring incomplete last journal line.")
+                    break
+                raise
+
+            op: str = entry.get("op")
+            if op == "insert":
+                records.append(entry["record"])
+            elif op == "update":
+                # Records may come frozen from the binary snapshot, so updates build new ones
+                for position, record in enumerate(records):
+                    if record.get("id") == entry["id"]:
+                        records[position] = {**full_record(record), **entry["data"]}
+                        break
+            elif op == "delete":
+                records = [record for record in records if record.get("id") != entry["id"]]
+        return records
+
+    @staticmethod
+    def _read(path: str) -> bytes:
+        try:
+            with open(path, "rb") as file:
+                return file.read()
+        except FileNotFoundError:
+            return b""
+
+    def load(self, collection: str) -> list[dict]:
+        journal: _Journal | None = self.journals.get(collection)
+        if journal is None:
+            return super().load(collection)
+
+        # Snapshot and journals are read together so a running compaction can't be seen half done
+        with journal.lock, journal.file_lock.hold(shared=True):
+            records: list[dict] = super().load(collection)
+            known: tuple | None = file_signature(journal.path)
+            pending: bytes = self._read(journal.path + ".compacting") + self._read(journal.path)
+            generation: int = journal.written
+
+        records = self._replay(records, pending)
+        ids: dict[str, int] = {}
+        for record in records:
+            record_id: str = str(record.get("id"))
+            ids[record_id] = ids.get(record_id, 0) + 1
+
+        with journal.lock:
+            # Only keep the ID counts if no write happened in the meantime
+            if journal.written == generation:
+                journal.ids = ids
+                journal.known = known
+        return records
+
+    def signature(self, collection: str) -> tuple | None:
+        if collection not in self.journals:
+            return super().signature(collection)
+        journal_path: str = self.journal_path(collection)
+        return (super().signature(collection), file_signature(journal_path), file_signature(journal_path + ".compacting"))
+
+    # Journal lines are changes, see _Journal for the locks between processes
+    def write_lock(self, collection: str):
+        if collection not in self.journals:
+            return super().write_lock(collection)
+        return contextlib.nullcontext()
+
+    def _ids(self, collection: str) -> dict[str, int]:
+        journal: _Journal = self.journals[collection]
+        # Another process wrote since, its records aren't counted
+        if journal.ids is not None and file_signature(journal.path) != journal.known:
+            journal.ids = None
+        while journal.ids is None:
+            self.load(collection)
+        return journal.ids
+
+    # Append entries and wait until they are on disk. Concurrent writers share fsyncs:
+    # whoever gets the sync lock first flushes everything written so far.
+    def _append(self, collection: str, entries: list[dict]):
+        journal: _Journal = self.journals[collection]
+        data: bytes = "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in entries).encode("utf-8")
+
+        with journal.lock, journal.file_lock.hold():
+            file = journal.open()
+            if file_signature(journal.path) != journal.known:
+                journal.ids = None
+            file.write(data)
+            file.flush()
+            # Other processes append to the same file, the size is the file's
+            journal.size = file.tell()
+            journal.known = file_signature(journal.path)
+            journal.written += 1
+            ticket: int = journal.written
+
+        with journal.sync_lock:
+            if journal.synced < ticket:
+                with journal.lock:
+                    target: int = journal.written
+                    files: list = [*journal.retired, journal.file]
+                    journal.retired = []
+                for file in files:
+                    if file is not None:
+                        os.fsync(file.fileno())
+                for file in files[:-1]:
+                    file.close()
+                journal.synced = target
+
+        if journal.size >= self.max_bytes and not journal.compacting:
+            self.compact(collection, background=True)
+
+    def insert(self, collection: str, record: dict):
+        if collection not in self.journals:
+            return super().insert(collection, record)
+        ids: dict[str, int] = self._ids(collection)
+        self._append(collection, [{"op": "insert", "record": record}])
+        record_id: str = str(record.get("id"))
+        with self.journals[collection].lock:
+            ids[record_id] = ids.get(record_id, 0) + 1
+
+    def update(self, collection: str, record_id: str, data: dict) -> bool:
+        if collection not in self.journals:
+            return super().update(collection, record_id, data)
+        if str(record_id) not in self._ids(collection):
+            return False
+        self._append(collection, [{"op": "update", "id": str(record_id), "data": data}])
+        return True
+
+    def delete(self, collection: str, record_id: str) -> bool:
+        if collection not in self.journals:
+            return super().delete(collection, record_id)
+        ids: dict[str, int] = self._ids(collection)
+        with self.journals[collection].lock:
+            if ids.pop(str(record_id), None) is None:
+                return False
+        self._append(collection, [{"op": "delete", "id": str(record_id)}])
+        return True
+
+    # The whole batch costs one append and one fsync. The collection checked the
+    # IDs already, so the counts are only kept up to date if they are loaded; the
+    # next insert/update/delete call loads them otherwise.
+    def apply(self, collection: str, ops: list[tuple], records: list[dict]):
+        if collection not in self.journals:
+            return super().apply(collection, ops, records)
+
+        entries: list[dict] = []
+        for op in ops:
+            if op[0] == "insert":
+                entries.append({"op": "insert", "record": op[1]})
+            elif op[0] == "update":
+                entries.append({"op": "update", "id": str(op[1]), "data": op[2]})
+            elif op[0] == "delete":
+                entries.append({"op": "delete", "id": str(op[1])})
+        self._append(collection, entries)
+
+        journal: _Journal = self.journals[collection]
+        with journal.lock:
+            ids: dict[str, int] | None = journal.ids
+            if ids is None:
+                return
+            for op in ops:
+                if op[0] == "insert":
+                    record_id: str = str(op[1].get("id"))
+                    ids[record_id] = ids.get(record_id, 0) + 1
+                elif op[0] == "delete":
+                    ids.pop(str(op[1]), None)
+
+    def replace(self, collection: str, records: list[dict]):
+        journal: _Journal | None = self.journals.get(collection)
+        if journal is None:
+            return super().replace(collection, records)
+
+        with journal.compact_lock, journal.compact_file_lock.hold(), journal.sync_lock, journal.lock, journal.file_lock.hold():
+            self._write_snapshot(collection, records)
+            if self.binary_snapshots:
+                self._write_binary(collection, records, file_signature(self.path(collection)))
+            journal.close()
+            for path in (journal.path, journal.path + ".compacting"):
+                if os.path.exists(path):
+                    os.remove(path)
+            journal.size = 0
+            journal.ids = None
+
+    def _write_snapshot(self, collection: str, records: list[dict]):
+        snapshot_tmp: str = self.path(collection) + ".tmp"
+        with open(snapshot_tmp, "w", encoding="utf-8") as file:
+            json.dump([full_record(record) for record in records], file, indent=4, ensure_ascii=False)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(snapshot_tmp, self.path(collection))
+
+    # Fold the journal into a new JSON snapshot
+    def compact(self, collection: str, background: bool = False):
+        journal: _Journal = self.journals[collection]
+        with journal.lock:
+            if journal.compacting or journal.size == 0:
+                return
+            journal.compacting = True
+
+        if background:
+            threading.Thread(target=self._compact, args=(collection,), daemon=True, name=f"compact-{collection}").start()
+        else:
+            self._compact(collection)
+
+    def _compact(self, collection: str):
+        journal: _Journal = self.journals[collection]
+        compacting: str = journal.path + ".compacting"
+        applied: str = journal.path + ".applied"
+        snapshot_tmp: str = self.path(collection) + ".tmp"
+
+        with journal.compact_lock, journal.compact_file_lock.hold():
+            try:
+                # Rotate: new writes go to a fresh journal while the old one is folded in
+                with journal.sync_lock, journal.lock, journal.file_lock.hold():
+                    # A replace or another process's compaction ran while this one waited,
+                    # nothing is left to fold in
+                    if not os.path.exists(journal.path) or os.path.getsize(journal.path) == 0:
+                        journal.size = 0
+                        return
+                    journal.close()
+                    # Other processes may have appended without their fsync done yet
+                    with open(journal.path, "rb") as file:
+                        os.fsync(file.fileno())
+                    journal.synced = journal.written
+                    if os.path.exists(compacting):
+                        # Left over from a failed compaction, fold both journals in this time
+                        with open(compacting, "ab") as file:
+                            file.write(self._read(journal.path))
+                            file.flush()
+                            os.fsync(file.fileno())
+                        os.remove(journal.path)
+                    else:
+                        os.replace(journal.path, compacting)
+                    journal.size = 0
+                    records: list[dict] = JsonStorage.load(self, collection)
+
+                records = self._replay(records, self._read(compacting))
+
+                with open(snapshot_tmp, "w", encoding="utf-8") as file:
+                    json.dump([full_record(record) for record in records], file, indent=4, ensure_ascii=False)
+                    file.flush()
+                    os.fsync(file.fileno())
+
+                # tmp is complete: from here on _recover rolls the compaction forward
+                with journal.lock, journal.file_lock.hold():
+                    os.replace(compacting, applied)
+                    os.replace(snapshot_tmp, self.path(collection))
+                    os.remove(applied)
+                logger.info(f"Compacted journal of '{collection}' ({len(records)} records).")
+            except Exception as e:
+                logger.error(f"Error compacting journal of '{collection}': {e}")
+            finally:
+                journal.compacting = False
+
+
+# SQLite engine in WAL mode: one table per collection, one row per record.
+# Writes only touch the affected rows, so their cost does not grow with the collection.
+class SqliteStorage(StorageBackend):
+    name = "sqlite"
+
+    def __init__(self, path: str = DEFAULT_STORAGE_CONFIG["sqlite_path"]):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as connection:
+            for collection in COLLECTIONS:
+                connection.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{collection}" ('
+                    "seq INTEGER PRIMARY KEY AUTOINCREMENT, id TEXT NOT NULL, data TEXT NOT NULL)"
+                )
+                connection.execute(f'CREATE INDEX IF NOT EXISTS "{collection}_id" ON "{collection}" (id)')
+            # Write counter per collection, bumped in the transaction of every write
+            connection.execute('CREATE TABLE IF NOT EXISTS "_changes" (collection TEXT PRIMARY KEY, counter INTEGER NOT NULL)')
+
+    # Connections can't be shared between waitress threads, so every thread gets its own
+    def _connection(self) -> sqlite3.Connection:
+        connection: sqlite3.Connection | None = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self._local.connection = connection
+        return connection
+
+    # The write counter of the collection, so writes to other collections (orders,
+    # contact requests) don't make it reload. The inode covers a swapped database file.
+    def signature(self, collection: str) -> tuple | None:
+        row = self._connection().execute('SELECT counter FROM "_changes" WHERE collection = ?', (collection,)).fetchone()
+        try:
+            inode: int | None = os.stat(self.path).st_ino
+        except FileNotFoundError:
+            inode = None
+        return (inode, row[0] if row else 0)
+
+    @staticmethod
+    def _changed(connection: sqlite3.Connection, collection: str):
+        connection.execute(
+            'INSERT INTO "_changes" (collection, counter) VALUES (?, 1) '
+            "ON CONFLICT (collection) DO UPDATE SET counter = counter + 1",
+            (collection,),
+        )
+
+    # Records may come lazy or compact from the other backends, the row gets all their fields
+    @staticmethod
+    def _dumps(record: dict) -> str:
+        return json.dumps(full_record(record), ensure_ascii=False)
+
+    @staticmethod
+    def _table(collection: str) -> str:
+        if collection not in COLLECTIONS:
+            raise KeyError(f"Unknown collection: {collection}")
+        return f'"{collection}"'
+
+    def load(self, collection: str) -> list[dict]:
+        rows = self._connection().execute(f"SELECT data FROM {self._table(collection)} ORDER BY seq")
+        return [json.loads(data) for (data,) in rows]
+
+    def insert(self, collection: str, record: dict):
+        with self._connection() as connection:
+            connection.execute(
+                f"INSERT INTO {self._table(collection)} (id, data) VALUES (?, ?)",
+                (str(record.get("id")), self._dumps(record)),
+            )
+            self._changed(connection, collection)
+
+    def update(self, collection: str, record_id: str, data: dict) -> bool:
+        table: str = self._table(collection)
+        with self._connection() as connection:
+            row = connection.execute(
+                f"SELECT seq, data FROM {table} WHERE id = ? ORDER BY seq LIMIT 1", (str(record_id),)
+            ).fetchone()
+            if row is None:
+                return False
+            record: dict = json.loads(row[1])
+            record.update(data)
+            connection.execute(
+                f"UPDATE {table} SET id = ?, data = ? WHERE seq = ?",
+                (str(record.get("id")), self._dumps(record), row[0]),
+            )
+            self._changed(connection, collection)
+        return True
+
+    def delete(self, collection: str, record_id: str) -> bool:
+        with self._connection() as connection:
+            cursor = connection.execute(f"DELETE FROM {self._table(collection)} WHERE id = ?", (str(record_id),))
+            if cursor.rowcount > 0:
+                self._changed(connection, collection)
+        return cursor.rowcount > 0
+
+    # The whole batch is one transaction
+    def apply(self, collection: str, ops: list[tuple], records: list[dict]):
+        table: str = self._table(collection)
+        with self._connection() as connection:
+            for op in ops:
+                if op[0] == "insert":
+                    connection.execute(
+                        f"INSERT INTO {table} (id, data) VALUES (?, ?)",
+                        (str(op[1].get("id")), self._dumps(op[1])),
+                    )
+                elif op[0] == "update":
+                    row = connection.execute(
+                        f"SELECT seq, data FROM {table} WHERE id = ? ORDER BY seq LIMIT 1", (str(op[1]),)
+                    ).fetchone()
+                    if row is not None:
+                        record: dict = json.loads(row[1])
+                        record.update(op[2])
+                        connection.execute(
+                            f"UPDATE {table} SET id = ?, data = ? WHERE seq = ?",
+                            (str(record.get("id")), self._dumps(record), row[0]),
+                        )
+                elif op[0] == "delete":
+                    connection.execute(f"DELETE FROM {table} WHERE id = ?", (str(op[1]),))
+            self._changed(connection, collection)
+
+    def replace(self, collection: str, records: list[dict]):
+        table: str = self._table(collection)
+        with self._connection() as connection:
+            connection.execute(f"DELETE FROM {table}")
+            connection.executemany(
+                f"INSERT INTO {table} (id, data) VALUES (?, ?)",
+                [(str(record.get("id")), self._dumps(record)) for record in records],
+            )
+            self._changed(connection, collection)
+
+
+# =====================================
+# Backend Selection & Import
+# =====================================
+
+# Build the backend described by a storage config block
+def create_storage(config: dict | None = None) -> StorageBackend:
+    config = config or read_storage_config()
+    backend: str = config.get("backend", "json")
+
+    if backend == "sqlite":
+        storage: StorageBackend = SqliteStorage(config.get("sqlite_path", DEFAULT_STORAGE_CONFIG["sqlite_path"]))
+    else:
+        if backend != "json":
+            logger.error(f"Unknown storage backend '{backend}', falling back to JSON.")
+        if config.get("journal"):
+            storage = JournalStorage(
+                config.get("data_dir", DATA_DIR),
+                config["journal"],
+                config.get("journal_max_bytes", DEFAULT_STORAGE_CONFIG["journal_max_bytes"]),
+            )
+        else:
+            storage = JsonStorage(config.get("data_dir", DATA_DIR))
+
+    storage.check_interval = float(config.get("check_interval", DEFAULT_STORAGE_CONFIG["check_interval"]))
+    storage.batch_window = float(config.get("batch_window", DEFAULT_STORAGE_CONFIG["batch_window"]))
+    storage.compact_records = bool(config.get("compact_records", DEFAULT_STORAGE_CONFIG["compact_records"]))
+    if isinstance(storage, JsonStorage):
+        storage.binary_snapshots = bool(config.get("binary_snapshots", DEFAULT_STORAGE_CONFIG["binary_snapshots"]))
+    return storage
+
+
+_storage: StorageBackend | None = None
+_storage_lock = threading.Lock()
+
+
+# Get the active storage backend (created on first use, from settings if the
+# caller already read settings.json)
+def get_storage(settings: dict | None = None) -> StorageBackend:
+    global _storage
+    if _storage is None:
+        with _storage_lock:
+            if _storage is None:
+                _storage = create_storage(read_storage_config(settings))
+                logger.info(f"Storage backend initialised: {_storage}")
+    return _storage
+
+
+# Swap the active storage backend (used by the importer and benchmarks)
+def set_storage(backend: StorageBackend):
+    global _storage
+    with _storage_lock:
+        _storage = backend
+
+
+# One-shot import of the data/*.json files into another backend
+def import_json_data(target: StorageBackend, data_dir: str = DATA_DIR) -> dict[str, int]:
+    source = JsonStorage(data_dir)
+    # Straight from the JSON files: binary snapshots would hand out LazyRecords
+    source.binary_snapshots = False
+    imported: dict[str, int] = {}
+
+    for collection in COLLECTIONS:
+        try:
+            records: list[dict] = source.load(collection)
+        except FileNotFoundError:
+            logger.warning(f"{COLLECTIONS[collection]} not found, skipping import.")
+            continue
+        target.replace(collection, records)
+        imported[collection] = len(records)
+        logger.info(f"Imported {len(records)} records into '{collection}' ({target.name}).")
+
+    return imported